@@ -0,0 +1,233 @@
+"""Нагрузочный прогон страниц приложения posts.
+
+seed() наполняет базу заданными объёмами данных, run() проходит по
+всем маршрутам posts.urls тестовым клиентом и собирает для каждого
+задержку (p50/p95), число SQL-запросов и пиковую память.
+run_profile() повторяет прогон с настройками другого профиля
+(yatube.settings.<name>), savings() сравнивает результаты.
+"""
+import importlib
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from faker import Faker
+from mixer.backend.django import mixer
+
+from posts import counters, feed, search
+from posts.models import Comment, Follow, Group, Post, User
+from posts.urls import app_name, urlpatterns
+
+DEFAULT_VOLUMES = {
+    'users': 200,
+    'groups': 20,
+    'posts': 10000,
+    'comments': 20000,
+    'follows': 2000,
+}
+BATCH_SIZE = 2000
+
+# Запросы, изменяющие данные, отправляются методом POST.
+POST_VIEWS = {'post_create', 'post_edit', 'add_comment'}
+
+# Настройки профиля, которые подменяются на время прогона. База и кеш
+# остаются текущими (кроме CONN_MAX_AGE), чтобы сравнение не требовало
+# отдельных серверов.
+PROFILE_SETTINGS = ('DEBUG', 'TEMPLATES')
+
+
+def _bulk(model, objects):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def seed(volumes, seed_value=0):
+    """Создаёт пользователей, группы, посты, комментарии и подписки."""
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed_value)
+    rnd = random.Random(seed_value)
+    mixer.cycle(volumes['users']).blend(
+        User, username=mixer.sequence('bench_user_{0}'))
+    mixer.cycle(volumes['groups']).blend(
+        Group, slug=mixer.sequence('bench-group-{0}'))
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    group_ids = list(Group.objects.values_list('pk', flat=True)) + [None]
+    # Посты без картинок: bulk_create не считает ссылки на файлы
+    # (ContentAddressedStorage.retain_many), но их здесь и нет.
+    _bulk(Post, (
+        Post(
+            text=fake.text(200),
+            author_id=rnd.choice(user_ids),
+            group_id=rnd.choice(group_ids),
+        )
+        for _ in range(volumes['posts'])
+    ))
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    _bulk(Comment, (
+        Comment(
+            text=fake.sentence(),
+            author_id=rnd.choice(user_ids),
+            post_id=rnd.choice(post_ids),
+        )
+        for _ in range(volumes['comments'])
+    ))
+    _bulk(Follow, (
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in (
+            rnd.sample(user_ids, 2) for _ in range(volumes['follows'])
+        )
+    ))
+    feed.rebuild()
+    counters.recount_all()
+    search.reindex_all()
+
+
+def sample_requests():
+    """Конкретный запрос для каждого маршрута posts.urls."""
+    follow = Follow.objects.select_related('user', 'author').first()
+    user = follow.user if follow else User.objects.first()
+    author = follow.author if follow else user
+    post = Post.objects.filter(author=user).first() or Post.objects.first()
+    kwargs = {
+        'slug': Group.objects.values_list('slug', flat=True).first(),
+        'username': author.username,
+        'post_id': post.pk,
+    }
+    data = {
+        'post_create': {'text': 'Тестовый пост'},
+        'post_edit': {'text': post.text},
+        'add_comment': {'text': 'Тестовый комментарий'},
+        'search': {'q': post.text.split()[0]},
+    }
+    requests = []
+    for pattern in urlpatterns:
+        name = pattern.name
+        url = reverse(f'{app_name}:{name}', kwargs={
+            key: kwargs[key] for key in pattern.pattern.converters
+        })
+        method = 'post' if name in POST_VIEWS else 'get'
+        requests.append((name, method, url, data.get(name, {})))
+    return user, requests
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * len(values))))
+    return values[index]
+
+
+def measure(client, method, url, data, repeat, cold):
+    send = getattr(client, method)
+    timings, queries = [], []
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            response = send(url, data)
+        timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+    # tracemalloc заметно замедляет код, поэтому память меряется
+    # отдельным запросом.
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    send(url, data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'url': url,
+        'method': method.upper(),
+        'status': response.status_code,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(_percentile(timings, 95), 3),
+        'queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+class ServerClient(Client):
+    """Client, который, как WSGI-сервер, закрывает устаревшие соединения
+    с базой до и после запроса. Тестовый Client этого не делает, и
+    CONN_MAX_AGE на него не влияет."""
+
+    def request(self, **request):
+        close_old_connections()
+        try:
+            return super().request(**request)
+        finally:
+            close_old_connections()
+
+
+def run(repeat=20, cold=False, client_class=Client):
+    user, requests = sample_requests()
+    client = client_class()
+    client.force_login(user)
+    return {
+        name: measure(client, method, url, data, repeat, cold)
+        for name, method, url, data in requests
+    }
+
+
+def compare(previous, current):
+    """Строки с изменением p95 и числа запросов относительно прошлого
+    прогона."""
+    lines = []
+    for name, result in current.items():
+        before = previous.get(name)
+        if not before:
+            continue
+        delta = result['p95_ms'] - before['p95_ms']
+        percent = delta / before['p95_ms'] * 100 if before['p95_ms'] else 0
+        lines.append(
+            f'{name}: p95 {before["p95_ms"]} -> {result["p95_ms"]} мс '
+            f'({percent:+.0f}%), запросов {before["queries"]} -> '
+            f'{result["queries"]}')
+    return lines
+
+
+def load_profile(name):
+    """Подменяемые настройки профиля и CONN_MAX_AGE его базы."""
+    module = importlib.import_module(f'yatube.settings.{name}')
+    overrides = {key: getattr(module, key) for key in PROFILE_SETTINGS}
+    return overrides, module.DATABASES['default'].get('CONN_MAX_AGE', 0)
+
+
+def run_profile(overrides, conn_max_age, repeat=20, cold=False):
+    """run() с настройками профиля. Соединение открывается заново, чтобы
+    действовал переданный CONN_MAX_AGE."""
+    previous = connection.settings_dict['CONN_MAX_AGE']
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    try:
+        with override_settings(**overrides):
+            return run(repeat, cold, client_class=ServerClient)
+    finally:
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = previous
+
+
+def savings(current, profile):
+    """Строки с экономией p50 на запрос в профиле относительно текущих
+    настроек."""
+    lines = []
+    for name, result in profile.items():
+        before = current[name]['p50_ms']
+        saved = before - result['p50_ms']
+        percent = saved / before * 100 if before else 0
+        lines.append(
+            f'{name}: p50 {before} -> {result["p50_ms"]} мс, '
+            f'экономия {saved:.3f} мс ({percent:.0f}%)')
+    return lines
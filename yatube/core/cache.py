@@ -0,0 +1,466 @@
+"""Бэкенды кеша для нескольких процессов (воркеров gunicorn).
+
+RedisCache — общий кеш на сервере с протоколом Redis (RESP): Redis,
+Valkey, KeyDB и совместимые. Клиент встроен, сторонние библиотеки не
+нужны.
+
+TieredCache — небольшой LRU в памяти процесса перед общим кешем для
+горячих ключей (фрагменты лент, номер поколения). Перезапись,
+удаление и incr через него увеличивают общий счётчик эпохи и
+записывают под новой эпохой изменённый ключ. Остальные процессы
+сверяются со счётчиком не чаще раза в SYNC_INTERVAL секунд и убирают
+из своего LRU только изменённые ключи; весь LRU очищается, лишь если
+журнал изменений неполон. Так изменение становится видно всем
+воркерам не позже чем через SYNC_INTERVAL. Запись нового ключа
+ничего не рассылает: в чужих LRU его нет.
+"""
+import pickle
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlparse
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+DEFAULT_PORT = 6379
+
+_MISSING = object()
+
+
+class RespError(Exception):
+    """Ответ сервера с ошибкой (-ERR ...)."""
+
+
+class RespConnection:
+    """Одно соединение с сервером: команды и конвейер команд."""
+
+    def __init__(self, host, port, db=0, password=None, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    @staticmethod
+    def _encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Сервер кеша закрыл соединение')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            return RespError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            return self.reader.read(length + 2)[:-2]
+        if kind == b'*':
+            length = int(rest)
+            if length < 0:
+                return None
+            return [self._read() for _ in range(length)]
+        raise ConnectionError(f'Неизвестный ответ сервера: {line!r}')
+
+    def pipeline(self, commands):
+        """Отправляет команды одним пакетом и читает все ответы."""
+        self.sock.sendall(b''.join(self._encode(args) for args in commands))
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+
+class RedisCache(BaseCache):
+    """LOCATION: redis://[:пароль@]хост[:порт][/номер базы].
+
+    Соединение своё у каждого потока и живёт между запросами. Целые
+    числа хранятся как есть (для INCRBY), остальное — pickle.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        url = urlparse(server if '://' in server else f'redis://{server}')
+        options = params.get('OPTIONS', {})
+        self._address = (url.hostname or '127.0.0.1', url.port or DEFAULT_PORT)
+        self._db = int(url.path.strip('/') or 0)
+        self._password = unquote(url.password) if url.password else None
+        self._timeout = options.get('SOCKET_TIMEOUT', 5)
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = RespConnection(
+                *self._address, db=self._db, password=self._password,
+                timeout=self._timeout)
+            self._local.connection = connection
+        return connection
+
+    def _pipeline(self, commands):
+        """Одна повторная попытка, если соединение было разорвано."""
+        try:
+            return self._connection().pipeline(commands)
+        except OSError:
+            self._disconnect()
+            return self._connection().pipeline(commands)
+
+    def _execute(self, *args):
+        return self._pipeline([args])[0]
+
+    def _disconnect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self._local.connection = None
+            try:
+                connection.close()
+            except OSError:
+                pass
+
+    def validate_key(self, key):
+        # Ключи RESP двоичные: ограничения memcached (пробелы,
+        # не-ASCII, длина) здесь не действуют.
+        pass
+
+    def _key(self, key, version):
+        return self.make_key(key, version=version)
+
+    @staticmethod
+    def _dumps(value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(value):
+        try:
+            return int(value)
+        except ValueError:
+            return pickle.loads(value)
+
+    def _expiry(self, timeout):
+        """Аргументы срока жизни для SET; timeout=0 — не сохранять."""
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return []
+        return ['PX', max(int(timeout * 1000), 0)]
+
+    def _set(self, key, value, timeout, *flags):
+        expiry = self._expiry(timeout)
+        if expiry and expiry[1] <= 0:
+            self._execute('DEL', key)
+            return False
+        reply = self._execute('SET', key, self._dumps(value), *expiry, *flags)
+        return reply == 'OK'
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._set(self._key(key, version), value, timeout, 'NX')
+
+    def get(self, key, default=None, version=None):
+        value = self._execute('GET', self._key(key, version))
+        return default if value is None else self._loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set(self._key(key, version), value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if not expiry:
+            return bool(self._pipeline([
+                ('EXISTS', key), ('PERSIST', key)])[0])
+        return bool(self._execute('PEXPIRE', key, max(expiry[1], 1)))
+
+    def delete(self, key, version=None):
+        self._execute('DEL', self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._execute(
+            'MGET', *(self._key(key, version) for key in keys))
+        return {
+            key: self._loads(value)
+            for key, value in zip(keys, values) if value is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expiry = self._expiry(timeout)
+        if expiry and expiry[1] <= 0:
+            self.delete_many(data, version)
+            return []
+        commands = [
+            ('SET', self._key(key, version), self._dumps(value), *expiry)
+            for key, value in data.items()
+        ]
+        if commands:
+            self._pipeline(commands)
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._execute('DEL', *keys)
+
+    def has_key(self, key, version=None):
+        return bool(self._execute('EXISTS', self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        # Между EXISTS и INCRBY ключ может только истечь, тогда
+        # счётчик начнётся заново с delta.
+        try:
+            exists, value = self._pipeline([
+                ('EXISTS', key), ('INCRBY', key, delta)])
+        except RespError as error:
+            raise ValueError(str(error))
+        if not exists:
+            self._execute('DEL', key)
+            raise ValueError("Key '%s' not found" % key)
+        return value
+
+    def clear(self):
+        self._execute('FLUSHDB')
+
+    def close(self, **kwargs):
+        # Django вызывает close() после каждого запроса; соединение
+        # намеренно сохраняется до конца жизни потока.
+        pass
+
+
+# Локальные LRU процесса по LOCATION, как у LocMemCache.
+_stores = {}
+_stores_lock = threading.Lock()
+
+EPOCH_KEY = 'tiered_cache:epoch:{}'
+CHANGE_KEY = 'tiered_cache:change:{}:{}'
+# Сколько изменений процесс разбирает по одному; если пропущено
+# больше, дешевле очистить LRU целиком.
+MAX_CHANGES = 100
+
+
+class _LocalStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = OrderedDict()
+        self.epoch = None
+        self.synced_at = 0.0
+
+
+class TieredCache(BaseCache):
+    """LRU процесса перед общим кешем.
+
+    OPTIONS:
+      SHARED — алиас общего кеша в CACHES (по умолчанию 'shared');
+      MAX_ENTRIES — размер LRU процесса;
+      LOCAL_TIMEOUT — сколько секунд запись живёт в LRU;
+      SYNC_INTERVAL — как часто сверяться с общим счётчиком эпохи.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._name = name or 'default'
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self._sync_interval = options.get('SYNC_INTERVAL', 1.0)
+        self._epoch_key = EPOCH_KEY.format(self._name)
+        # Журнал изменений должен пережить паузу между сверками.
+        self._change_timeout = max(60, self._sync_interval * 10)
+        with _stores_lock:
+            self._store = _stores.setdefault(self._name, _LocalStore())
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def validate_key(self, key):
+        # Ключ проверяет общий кеш.
+        pass
+
+    def _local_key(self, key, version):
+        return self.make_key(key, version=version)
+
+    def _changed_keys(self, since, epoch):
+        """Ключи, изменённые после эпохи since, или None, если
+        журнал неполон."""
+        if since is None or not 0 < epoch - since <= MAX_CHANGES:
+            return None
+        change_keys = [CHANGE_KEY.format(self._name, number)
+                       for number in range(since + 1, epoch + 1)]
+        changes = self.shared.get_many(change_keys)
+        if len(changes) != len(change_keys):
+            # Запись истекла, ещё не сделана или это clear().
+            return None
+        return set(changes.values())
+
+    def _sync(self):
+        """Убирает из LRU ключи, которые изменил другой процесс."""
+        store = self._store
+        now = time.monotonic()
+        if now - store.synced_at < self._sync_interval:
+            return
+        # Пока никто ничего не менял, счётчика нет: эпоха 0.
+        epoch = self.shared.get(self._epoch_key, 0)
+        if epoch == store.epoch:
+            store.synced_at = now
+            return
+        changed = self._changed_keys(store.epoch, epoch)
+        with store.lock:
+            store.synced_at = now
+            if changed is None:
+                store.items.clear()
+            else:
+                for local_key in changed:
+                    store.items.pop(local_key, None)
+            store.epoch = epoch
+
+    def _broadcast(self, local_key=None):
+        """Сообщает остальным процессам об изменении local_key (None —
+        изменилось всё)."""
+        try:
+            epoch = self.shared.incr(self._epoch_key)
+        except ValueError:
+            self.shared.add(self._epoch_key, 0, None)
+            epoch = self.shared.incr(self._epoch_key)
+        if local_key is not None:
+            self.shared.set(CHANGE_KEY.format(self._name, epoch), local_key,
+                            self._change_timeout)
+        store = self._store
+        with store.lock:
+            # Свои записи LRU уже отражает; если между сверками писал
+            # кто-то ещё, его ключи уберёт следующая сверка. До первой
+            # сверки в LRU только собственные записи.
+            if store.epoch is None or epoch == store.epoch + 1:
+                store.epoch = epoch
+
+    def _remember(self, local_key, value, timeout=None):
+        """Положить значение в LRU не дольше его срока в общем кеше."""
+        store = self._store
+        if store.epoch is None:
+            # Эпоха до первой записи в LRU: иначе первая сверка не
+            # отличит чужие изменения и очистит LRU целиком.
+            epoch = self.shared.get(self._epoch_key, 0)
+            with store.lock:
+                if store.epoch is None:
+                    store.epoch = epoch
+        if timeout is None:
+            timeout = self._local_timeout
+        else:
+            timeout = min(timeout, self._local_timeout)
+        expires = time.monotonic() + timeout
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with store.lock:
+            store.items[local_key] = (expires, data)
+            store.items.move_to_end(local_key)
+            while len(store.items) > self._max_entries:
+                store.items.popitem(last=False)
+
+    def _forget(self, local_key):
+        with self._store.lock:
+            self._store.items.pop(local_key, None)
+
+    def _lookup(self, local_key):
+        store = self._store
+        with store.lock:
+            entry = store.items.get(local_key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del store.items[local_key]
+                return None
+            store.items.move_to_end(local_key)
+        return entry[1]
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        self._sync()
+        data = self._lookup(local_key)
+        if data is not None:
+            return pickle.loads(data)
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        self._remember(local_key, value)
+        return value
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Отсутствующие ключи не кешируются локально, рассылать
+        # новую эпоху не нужно.
+        local_key = self._local_key(key, version)
+        timeout = self._timeout(timeout)
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(local_key, value, timeout)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self._local_key(key, version)
+        timeout = self._timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            # Нулевой срок — не хранить, как у остальных бэкендов.
+            self.shared.set(key, value, timeout, version=version)
+            self._forget(local_key)
+            self._broadcast(local_key)
+            return
+        # Нового ключа нет в чужих LRU: рассылать нечего.
+        if not self.shared.add(key, value, timeout, version=version):
+            self.shared.set(key, value, timeout, version=version)
+            self._broadcast(local_key)
+        self._remember(local_key, value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, self._timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        local_key = self._local_key(key, version)
+        self.shared.delete(key, version=version)
+        self._forget(local_key)
+        self._broadcast(local_key)
+
+    def has_key(self, key, version=None):
+        local_key = self._local_key(key, version)
+        self._sync()
+        return (self._lookup(local_key) is not None
+                or self.shared.has_key(key, version=version))
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self._local_key(key, version)
+        value = self.shared.incr(key, delta, version=version)
+        self._remember(local_key, value)
+        self._broadcast(local_key)
+        return value
+
+    def clear(self):
+        self.shared.clear()
+        with self._store.lock:
+            self._store.items.clear()
+        self._broadcast()
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout == DEFAULT_TIMEOUT else timeout
@@ -0,0 +1,99 @@
+"""Чтение с реплик базы данных.
+
+ReplicaRouter отправляет чтение на случайную реплику из
+DATABASE_REPLICAS, запись — в основную базу (default). Реплики
+отстают от основной базы, поэтому чтение идёт в основную базу, если:
+
+* запрос «закреплён» (pinned): это изменяющий запрос или у клиента
+  есть cookie закрепления — её ставит read_your_writes после
+  создания поста, правки, комментария или подписки, и ещё
+  DATABASE_PIN_SECONDS секунд пользователь видит свои изменения;
+* открыта транзакция основной базы — внутри неё читается только что
+  записанное;
+* модель из приложения DATABASE_PRIMARY_APPS (сессии, пользователи,
+  очередь задач), где отставание ломает вход или захват задач.
+
+Кеши страниц хранятся по версиям, поэтому страница, прочитанная с
+реплики вскоре после изменения (replica_may_lag), не кешируется и не
+получает ETag: иначе устаревшая копия жила бы до следующего изменения.
+
+Без DATABASE_REPLICAS маршрутизатор ничего не меняет.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_local = threading.local()
+
+
+def is_pinned():
+    return getattr(_local, 'pinned', 0) > 0
+
+
+def pinned_request(request):
+    """Нужна ли запросу основная база."""
+    return (request.method not in SAFE_METHODS
+            or PIN_COOKIE in request.COOKIES)
+
+
+def replica_may_lag(changed_at):
+    """Может ли реплика, с которой читает текущий поток, ещё не
+    содержать изменение из момента changed_at (time.time()). Тогда
+    прочитанное нельзя кешировать под новой версией."""
+    return (bool(settings.DATABASE_REPLICAS) and not is_pinned()
+            and time.time() - changed_at < settings.DATABASE_PIN_SECONDS)
+
+
+@contextmanager
+def pinned():
+    """Чтение из основной базы внутри блока."""
+    _local.pinned = getattr(_local, 'pinned', 0) + 1
+    try:
+        yield
+    finally:
+        _local.pinned -= 1
+
+
+def read_your_writes(view):
+    """Закрепляет за клиентом основную базу на DATABASE_PIN_SECONDS
+    после изменения: view, меняющие данные, отвечают перенаправлением."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if 300 <= response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.DATABASE_PIN_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or is_pinned()
+                or model._meta.app_label in settings.DATABASE_PRIMARY_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        # Подсказку instance не учитываем: автор из основной базы
+        # отправил бы туда и чтение его постов.
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схему на реплики переносит репликация.
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,106 @@
+import json
+import os
+import platform
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment
+)
+from django.utils import timezone
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт отдельную тестовую базу, наполняет её данными и '
+        'замеряет задержку, число запросов и память каждой страницы.'
+    )
+
+    def add_arguments(self, parser):
+        for name, value in benchmark.DEFAULT_VOLUMES.items():
+            parser.add_argument(f'--{name}', type=int, default=value)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом.')
+        parser.add_argument('--output', help='Файл для результатов JSON.')
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения.')
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу после прогона.')
+        parser.add_argument(
+            '--profile', choices=['dev', 'prod'],
+            help='Повторить прогон с настройками профиля и показать '
+                 'экономию на запрос относительно текущих настроек.')
+
+    def measure(self, volumes, options):
+        """Результаты текущих настроек и профиля (или None)."""
+        profile = None
+        if options['profile']:
+            # Профилю prod без ключа не загрузиться; в прогоне он не
+            # используется.
+            os.environ.setdefault('DJANGO_SECRET_KEY', settings.SECRET_KEY)
+            profile = benchmark.load_profile(options['profile'])
+            if connection.vendor == 'sqlite':
+                # Соединение с базой в памяти не закрывается, и
+                # CONN_MAX_AGE ни на что бы не влиял.
+                connection.settings_dict['TEST']['NAME'] = os.path.join(
+                    tempfile.gettempdir(), 'yatube_benchmark.sqlite3')
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            self.stderr.write(f'Наполнение базы: {volumes}')
+            benchmark.seed(volumes)
+            if profile is None:
+                return benchmark.run(options['repeat'], options['cold']), None
+            current = benchmark.run_profile(
+                {}, connection.settings_dict['CONN_MAX_AGE'],
+                options['repeat'], options['cold'])
+            return current, benchmark.run_profile(
+                *profile, options['repeat'], options['cold'])
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+    def handle(self, *args, **options):
+        volumes = {
+            name: options[name] for name in benchmark.DEFAULT_VOLUMES
+        }
+        results, profile_results = self.measure(volumes, options)
+        report = {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'volumes': volumes,
+            'repeat': options['repeat'],
+            'cold': options['cold'],
+            'views': results,
+        }
+        if profile_results is not None:
+            report['profile'] = options['profile']
+            report['profile_views'] = profile_results
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<18} {result["status"]} '
+                f'p50 {result["p50_ms"]:>8} мс  p95 {result["p95_ms"]:>8} мс  '
+                f'запросов {result["queries"]:>3}  '
+                f'память {result["peak_memory_kb"]} КБ')
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as stream:
+                previous = json.load(stream)['views']
+            for line in benchmark.compare(previous, results):
+                self.stdout.write(line)
+        if profile_results is not None:
+            self.stdout.write(f'Профиль {options["profile"]}:')
+            for line in benchmark.savings(results, profile_results):
+                self.stdout.write(line)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
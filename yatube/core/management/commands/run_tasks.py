@@ -0,0 +1,43 @@
+import signal
+
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils.module_loading import autodiscover_modules
+
+from core import taskqueue
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер очереди фоновых задач. Для нескольких воркеров '
+        'запустите несколько процессов с этой командой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch', type=int, default=10,
+            help='Сколько задач забирать за раз.')
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить накопившиеся задачи и выйти.')
+
+    def handle(self, *args, **options):
+        autodiscover_modules('tasks')
+        stopping = []
+
+        def stop(signum, frame):
+            self.stderr.write('Остановка после текущей задачи...')
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        purged = taskqueue.purge(settings.TASKS_KEEP_DAYS)
+        if purged:
+            self.stderr.write(f'Удалено выполненных задач: {purged}')
+        done = taskqueue.run_worker(
+            batch=options['batch'], sleep=options['sleep'],
+            once=options['once'], should_stop=lambda: bool(stopping))
+        self.stdout.write(f'Выполнено задач: {done}')
@@ -0,0 +1,88 @@
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import db_router, performance, staticfiles
+
+logger = logging.getLogger('core.performance')
+
+
+class PerformanceMiddleware:
+    """Замеряет каждый запрос и пишет в лог запросы сверх бюджета
+    и повторяющиеся SQL-запросы (признак N+1)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        performance.install_template_timing()
+
+    def __call__(self, request):
+        stats = performance.RequestStats()
+        performance.activate(stats)
+        try:
+            with ExitStack() as stack:
+                # Все псевдонимы: с репликами чтение идёт не в default.
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(stats.execute))
+                response = self.get_response(request)
+        finally:
+            performance.deactivate()
+        size = 0 if response.streaming else len(response.content)
+        metrics = stats.finish(size)
+        duplicates = stats.duplicates(settings.PERF_DUPLICATE_THRESHOLD)
+        metrics['duplicates'] = len(duplicates)
+        match = request.resolver_match
+        name = match.view_name if match else 'unresolved'
+        performance.record(name, metrics)
+        if duplicates:
+            logger.warning(
+                '%s: повторяющиеся запросы (N+1?): %s', name,
+                '; '.join(
+                    f'{count}x {sql}' for sql, count in duplicates.items()))
+        if (metrics['wall_ms'] > settings.PERF_BUDGET_MS
+                or metrics['queries'] > settings.PERF_QUERY_BUDGET):
+            logger.warning(
+                '%s %s: %.0f мс, %s запросов (%.0f мс SQL), '
+                'шаблоны %.0f мс, %s байт',
+                request.method, request.path, metrics['wall_ms'],
+                metrics['queries'], metrics['sql_ms'],
+                metrics['template_ms'], metrics['size'])
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """Направляет в основную базу чтение изменяющих запросов и клиентов
+    с cookie закрепления (core.db_router)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not db_router.pinned_request(request):
+            return self.get_response(request)
+        with db_router.pinned():
+            return self.get_response(request)
+
+
+class StaticFilesMiddleware:
+    """Отдаёт статику из STATIC_ROOT со сжатыми копиями и долгим
+    кешированием (core.staticfiles), не доходя до остальных
+    middleware и view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+        self.immutable_names = staticfiles.immutable_names()
+
+    def __call__(self, request):
+        if (request.method in ('GET', 'HEAD')
+                and request.path_info.startswith(self.prefix)):
+            response = staticfiles.serve(
+                request, request.path_info[len(self.prefix):], self.root,
+                self.immutable_names)
+            if response is not None:
+                return response
+        return self.get_response(request)
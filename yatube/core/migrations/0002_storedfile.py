@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:58
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Имя')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+                ('last_used', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='storedfile',
+            index=models.Index(fields=['references', 'last_used'], name='core_stored_referen_490396_idx'),
+        ),
+    ]
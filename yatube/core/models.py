@@ -0,0 +1,59 @@
+from django.db import models
+from django.db.models import Q, UniqueConstraint
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Фоновая задача очереди core.taskqueue."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы', default='{}')
+    key = models.CharField(
+        'Ключ идемпотентности', max_length=255, blank=True)
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField('Запуск не раньше', default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('run_at', 'id')
+        indexes = [models.Index(fields=['status', 'run_at'])]
+        constraints = [
+            # Одинаковая задача стоит в очереди не больше одного раза.
+            UniqueConstraint(
+                fields=['key'],
+                condition=Q(status='queued', key__gt=''),
+                name='unique_queued_task_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} [{self.status}]'
+
+
+class StoredFile(models.Model):
+    """Файл хранилища core.storage и число ссылок на него."""
+    name = models.CharField('Имя', max_length=255, unique=True)
+    references = models.PositiveIntegerField('Ссылок', default=0)
+    last_used = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['references', 'last_used'])]
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
@@ -0,0 +1,121 @@
+"""Сбор метрик производительности запросов.
+
+Для каждого имени маршрута хранится кольцевой буфер последних
+измерений: время ответа, число и суммарное время SQL-запросов, время
+рендеринга шаблонов и размер ответа.
+"""
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.template.backends import django as django_backend
+
+_lock = threading.Lock()
+_records = defaultdict(lambda: deque(maxlen=settings.PERF_BUFFER_SIZE))
+_local = threading.local()
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = Counter()
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries[sql] += 1
+
+    def duplicates(self, threshold):
+        return {
+            sql: count for sql, count in self.queries.items()
+            if count >= threshold
+        }
+
+    def finish(self, response_size):
+        return {
+            'wall_ms': (time.perf_counter() - self.started) * 1000,
+            'queries': sum(self.queries.values()),
+            'sql_ms': self.sql_time * 1000,
+            'template_ms': self.template_time * 1000,
+            'size': response_size,
+        }
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+def activate(stats):
+    _local.stats = stats
+
+
+def deactivate():
+    _local.stats = None
+
+
+def record(name, metrics):
+    with _lock:
+        _records[name].append(metrics)
+
+
+def reset():
+    with _lock:
+        _records.clear()
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    if not values:
+        return 0
+    index = min(len(values) - 1, int(round(percent / 100 * len(values))))
+    return values[index]
+
+
+def summary():
+    """Перцентили по каждому маршруту для страницы /core/perf/."""
+    with _lock:
+        snapshot = {name: list(items) for name, items in _records.items()}
+    rows = []
+    for name, items in sorted(snapshot.items()):
+        wall = [item['wall_ms'] for item in items]
+        rows.append({
+            'name': name,
+            'count': len(items),
+            'p50_ms': percentile(wall, 50),
+            'p95_ms': percentile(wall, 95),
+            'p99_ms': percentile(wall, 99),
+            'queries_avg': sum(i['queries'] for i in items) / len(items),
+            'sql_ms_avg': sum(i['sql_ms'] for i in items) / len(items),
+            'template_ms_avg': sum(
+                i['template_ms'] for i in items) / len(items),
+            'size_avg': sum(i['size'] for i in items) / len(items),
+            'duplicates': sum(1 for i in items if i.get('duplicates')),
+        })
+    return rows
+
+
+_original_render = django_backend.Template.render
+
+
+def _timed_render(self, context=None, request=None):
+    # Оборачивается только рендер шаблона верхнего уровня: include
+    # внутри него рендерятся без этого метода и не считаются дважды.
+    stats = current()
+    if stats is None:
+        return _original_render(self, context, request)
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context, request)
+    finally:
+        stats.template_time += time.perf_counter() - started
+
+
+def install_template_timing():
+    django_backend.Template.render = _timed_render
@@ -0,0 +1,125 @@
+"""Статика с хешем в имени и заранее сжатыми копиями.
+
+CompressedManifestStaticFilesStorage при collectstatic, как и
+ManifestStaticFilesStorage, копирует файлы под именами с хешем
+содержимого (css/bootstrap.min.3f2a….css) и переписывает ссылки на них
+в CSS. Затем рядом с каждым текстовым файлом кладёт .gz и, если
+установлен пакет brotli, .br — сжатые один раз с максимальным уровнем,
+а не в каждом ответе.
+
+serve() (core.middleware.StaticFilesMiddleware) отдаёт из STATIC_ROOT
+сжатую копию под Accept-Encoding клиента. Имя с хешем меняется вместе
+с содержимым, поэтому такие файлы кешируются на год с immutable:
+повторный визит не запрашивает CSS даже для проверки.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import unquote
+
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage)
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.svg', '.ico', '.json', '.map', '.txt', '.xml',
+    '.html', '.eot', '.ttf', '.otf')
+# Сжатая копия, выигрывающая меньше 5%, не нужна.
+MIN_RATIO = 0.95
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Имя без хеша может смениться содержимым в следующем выпуске.
+REVALIDATE = 'public, max-age=60'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+ACCEPT_ENCODING = re.compile(r'([\w*-]+)\s*(?:;\s*q=([\d.]+))?')
+
+
+def _compressors():
+    compressors = [('.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        compressors.append(('.br', brotli.compress))
+    return compressors
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                processed_names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if not dry_run:
+            for name in sorted(processed_names):
+                self.compress(name)
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE):
+            return
+        with self.open(name) as original:
+            data = original.read()
+        for suffix, compress in _compressors():
+            compressed = compress(data)
+            if len(compressed) >= len(data) * MIN_RATIO:
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+
+
+def _accepted(header):
+    accepted = set()
+    for coding, quality in ACCEPT_ENCODING.findall(header or ''):
+        if not quality or float(quality) > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+def immutable_names():
+    # Значения манифеста — имена с хешем; без манифеста их нет.
+    return set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def serve(request, name, document_root, hashed_names):
+    """Ответ с файлом name из document_root или None, если файла нет."""
+    name = posixpath.normpath(unquote(name)).lstrip('/')
+    try:
+        path = safe_join(document_root, name)
+    except SuspiciousFileOperation:
+        return None
+    if not os.path.isfile(path):
+        return None
+    stat = os.stat(path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                              stat.st_mtime, stat.st_size):
+        return HttpResponseNotModified()
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    accepted = _accepted(request.META.get('HTTP_ACCEPT_ENCODING'))
+    served, encoding, compressed = path, None, False
+    for coding, suffix in ENCODINGS:
+        if os.path.isfile(path + suffix):
+            compressed = True
+            if encoding is None and coding in accepted:
+                served, encoding = path + suffix, coding
+    response = FileResponse(open(served, 'rb'), content_type=content_type)
+    # FileResponse подставляет имя файла, у сжатой копии — с .gz.
+    del response['Content-Disposition']
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = (
+        IMMUTABLE if name in hashed_names else REVALIDATE)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if compressed:
+        response['Vary'] = 'Accept-Encoding'
+    return response
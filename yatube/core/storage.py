@@ -0,0 +1,184 @@
+"""Хранилище файлов с адресацией по содержимому.
+
+Файл сохраняется под именем из хеша SHA-256 содержимого в каталоге
+из двух уровней по первым символам хеша (posts/ab/cd/abcd....jpg):
+в каталоге остаётся не больше нескольких сотен файлов даже при
+миллионах картинок. Одинаковое содержимое записывается один раз.
+
+Ссылки на файл считаются в StoredFile: retain() при появлении ссылки,
+release() при удалении; retain_many() — для bulk_create, который не
+шлёт сигналов. collect() удаляет файлы без ссылок, которые
+не использовались MEDIA_GC_GRACE секунд: за это время загрузка,
+нашедшая уже существующий файл, успевает сослаться на него.
+
+Файл пишется в транзакции запроса; если она откатилась, запись
+StoredFile пропадает, а файл остаётся. Полный проход collect() находит
+такие файлы на диске и заводит им запись без ссылок со временем
+изменения файла — дальше они удаляются как обычно.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from .models import StoredFile
+
+CHUNK_SIZE = 64 * 1024
+# Имя файла из hashed_name(): .../ab/cd/abcd<ещё 60 символов хеша>.ext
+HASHED_NAME = re.compile(
+    r'(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}(\.\w+)?$')
+LOOKUP_CHUNK_SIZE = 500
+
+
+def content_digest(content):
+    sha256 = hashlib.sha256()
+    content.seek(0)
+    for chunk in iter(lambda: content.read(CHUNK_SIZE), b''):
+        sha256.update(chunk)
+    content.seek(0)
+    return sha256.hexdigest()
+
+
+def _touch(name):
+    """Отмечает использование файла: запись StoredFile существует, и
+    сборщик не удалит файл ещё MEDIA_GC_GRACE секунд."""
+    now = timezone.now()
+    if not StoredFile.objects.filter(name=name).update(last_used=now):
+        StoredFile.objects.bulk_create(
+            [StoredFile(name=name, last_used=now)], ignore_conflicts=True)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage с именами по хешу содержимого и подсчётом
+    ссылок. Файлы со старыми именами читаются как обычно."""
+
+    def get_available_name(self, name, max_length=None):
+        # Совпадение имени означает то же содержимое.
+        return name
+
+    def hashed_name(self, name, digest):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        parts = [directory, digest[:2], digest[2:4], digest + extension]
+        return '/'.join(part for part in parts if part)
+
+    def _save(self, name, content):
+        # ProcessedImage приходит с уже посчитанным хешем.
+        digest = getattr(content, 'digest', None) or content_digest(content)
+        name = self.hashed_name(name, digest)
+        # Сначала запись StoredFile: сборщик удаляет её в той же
+        # транзакции, что и файл, поэтому после неё файл не пропадёт.
+        _touch(name)
+        if not self.exists(name):
+            self._write(name, content)
+        return name
+
+    def _write(self, name, content):
+        """Пишет во временный файл рядом и переименовывает: параллельная
+        запись того же содержимого не оставит обрезанного файла."""
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(directory, self.directory_permissions_mode)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    output.write(chunk)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def retain(self, name):
+        def increment():
+            return StoredFile.objects.filter(name=name).update(
+                references=F('references') + 1, last_used=timezone.now())
+        if not increment():
+            _touch(name)
+            increment()
+
+    def retain_many(self, names):
+        """retain() для каждого имени из names (пустые пропускаются)
+        запросом на каждое число повторов, а не на каждое имя."""
+        counts = Counter(name for name in names if name)
+        if not counts:
+            return
+        now = timezone.now()
+        with transaction.atomic():
+            # Блокировка не даёт сборщику удалить найденные записи.
+            existing = set(StoredFile.objects.select_for_update().filter(
+                name__in=counts).values_list('name', flat=True))
+            StoredFile.objects.bulk_create([
+                StoredFile(name=name, references=count, last_used=now)
+                for name, count in counts.items() if name not in existing
+            ], ignore_conflicts=True)
+            by_count = defaultdict(list)
+            for name in existing:
+                by_count[counts[name]].append(name)
+            for count, group in by_count.items():
+                StoredFile.objects.filter(name__in=group).update(
+                    references=F('references') + count, last_used=now)
+
+    def release(self, name):
+        StoredFile.objects.filter(name=name, references__gt=0).update(
+            references=F('references') - 1, last_used=timezone.now())
+
+    def _track_untracked(self):
+        """Заводит записи без ссылок файлам с именем по хешу, у которых
+        записи нет (записавшая их транзакция откатилась)."""
+        found = {}
+        for root, _, filenames in os.walk(self.location):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.location).replace(
+                    os.sep, '/')
+                if HASHED_NAME.search(name):
+                    found[name] = os.path.getmtime(path)
+        names = list(found)
+        tracked = set()
+        for start in range(0, len(names), LOOKUP_CHUNK_SIZE):
+            tracked.update(StoredFile.objects.filter(
+                name__in=names[start:start + LOOKUP_CHUNK_SIZE],
+            ).values_list('name', flat=True))
+        # Если файл тем временем сохранили снова, его запись уже есть.
+        StoredFile.objects.bulk_create([
+            StoredFile(name=name, last_used=datetime.fromtimestamp(
+                found[name], timezone.utc))
+            for name in names if name not in tracked
+        ], ignore_conflicts=True)
+
+    def collect(self, names=None, grace=None):
+        """Удаляет файлы без ссылок; names — только из этого списка.
+        Возвращает имена удалённых файлов."""
+        if grace is None:
+            grace = settings.MEDIA_GC_GRACE
+        if names is None:
+            self._track_untracked()
+        border = timezone.now() - timedelta(seconds=grace)
+        orphans = StoredFile.objects.filter(
+            references=0, last_used__lte=border)
+        if names is not None:
+            orphans = orphans.filter(name__in=names)
+        collected = []
+        for pk, name in list(orphans.values_list('pk', 'name')):
+            with transaction.atomic():
+                deleted, _ = StoredFile.objects.filter(
+                    pk=pk, references=0, last_used__lte=border).delete()
+                if deleted:
+                    self.delete(name)
+                    collected.append(name)
+        return collected
@@ -0,0 +1,171 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача — зарегистрированная функция и её аргументы (JSON) в таблице
+core_task. Запись создаётся в транзакции запроса: воркер
+(manage.py run_tasks) увидит её только после фиксации, а откат
+запроса отменяет и задачу. С TASKS_EAGER (разработка, тесты) задача
+выполняется сразу, в вызывающем коде. Отложенная задача (countdown)
+и тогда ставится в очередь: раньше срока её не выполнить, и без
+воркера она ждёт manage.py run_tasks.
+
+Ключ идемпотентности не даёт поставить в очередь вторую такую же
+задачу, пока первая ещё не начала выполняться. Поэтому задачи пишутся
+как «привести в соответствие с текущим состоянием базы», а не как
+«применить изменение».
+"""
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name=None, max_attempts=3, retry_delay=10):
+    """Регистрирует функцию как задачу и добавляет ей .delay()."""
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+
+        @wraps(func)
+        def delay(*args, key='', countdown=0, **kwargs):
+            return enqueue(
+                task_name, args, kwargs, key=key, countdown=countdown)
+
+        func.task_name = task_name
+        func.max_attempts = max_attempts
+        func.retry_delay = retry_delay
+        func.delay = delay
+        _registry[task_name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, key='', countdown=0):
+    """Ставит задачу в очередь (или выполняет сразу при TASKS_EAGER,
+    если она не отложена)."""
+    func = _registry[name]
+    kwargs = kwargs or {}
+    if settings.TASKS_EAGER and countdown <= 0:
+        func(*args, **kwargs)
+        return None
+    task = Task(
+        name=name,
+        payload=json.dumps({'args': list(args), 'kwargs': kwargs}),
+        key=key,
+        max_attempts=func.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=countdown),
+    )
+    Task.objects.bulk_create([task], ignore_conflicts=bool(key))
+    return task
+
+
+def _release_stale(now):
+    """Возвращает в очередь задачи воркеров, которые упали."""
+    stale = now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    for pk in Task.objects.filter(
+            status=Task.RUNNING, locked_at__lt=stale).values_list(
+            'pk', flat=True):
+        try:
+            with transaction.atomic():
+                Task.objects.filter(pk=pk, status=Task.RUNNING).update(
+                    status=Task.QUEUED, locked_by='', locked_at=None)
+        except IntegrityError:
+            # Такая же задача уже снова в очереди.
+            Task.objects.filter(pk=pk).delete()
+
+
+def claim(worker, limit):
+    """Забирает до limit готовых к запуску задач.
+
+    Захват — условный UPDATE по статусу, поэтому несколько воркеров
+    не получат одну задачу ни на SQLite, ни на PostgreSQL.
+    """
+    now = timezone.now()
+    _release_stale(now)
+    candidates = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now).values_list('pk', flat=True)
+    claimed = []
+    for pk in candidates[:limit]:
+        updated = Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_by=worker, locked_at=now,
+            attempts=F('attempts') + 1)
+        if updated:
+            claimed.append(pk)
+    return list(Task.objects.filter(pk__in=claimed))
+
+
+def run_task(task):
+    """Выполняет задачу; при ошибке планирует повтор с паузой,
+    растущей вдвое, пока не исчерпаны попытки."""
+    func = _registry.get(task.name)
+    try:
+        if func is None:
+            raise LookupError(f'Задача {task.name} не зарегистрирована')
+        payload = json.loads(task.payload)
+        with transaction.atomic():
+            func(*payload['args'], **payload['kwargs'])
+    except Exception:
+        logger.exception('Задача %s #%s завершилась ошибкой',
+                         task.name, task.pk)
+        _failed(task, func, traceback.format_exc())
+        return False
+    Task.objects.filter(pk=task.pk).update(
+        status=Task.DONE, finished_at=timezone.now(), last_error='')
+    return True
+
+
+def _failed(task, func, error):
+    now = timezone.now()
+    if task.attempts >= task.max_attempts:
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.FAILED, finished_at=now, last_error=error)
+        return
+    delay = getattr(func, 'retry_delay', 10) * 2 ** (task.attempts - 1)
+    try:
+        with transaction.atomic():
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.QUEUED, locked_by='', locked_at=None,
+                run_at=now + timedelta(seconds=delay), last_error=error)
+    except IntegrityError:
+        # Пока задача выполнялась, такую же поставили заново.
+        Task.objects.filter(pk=task.pk).delete()
+
+
+def purge(days):
+    """Удаляет выполненные задачи старше days дней."""
+    border = timezone.now() - timedelta(days=days)
+    return Task.objects.filter(
+        status=Task.DONE, finished_at__lt=border).delete()[0]
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def run_worker(batch=10, sleep=1.0, once=False, should_stop=None):
+    """Цикл воркера. once — выйти, когда очередь опустеет."""
+    worker = worker_name()
+    done = 0
+    while not (should_stop and should_stop()):
+        tasks = claim(worker, batch)
+        for task in tasks:
+            run_task(task)
+            done += 1
+        if not tasks:
+            if once:
+                break
+            time.sleep(sleep)
+    return done
@@ -0,0 +1,51 @@
+import os
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from http import HTTPStatus
+
+from core import benchmark
+from posts.urls import urlpatterns
+
+
+class BenchmarkTests(TestCase):
+    def test_benchmark_covers_all_post_urls(self):
+        """Бенчмарк проходит по всем маршрутам posts без ошибок."""
+        benchmark.seed({
+            'users': 5, 'groups': 2, 'posts': 30,
+            'comments': 10, 'follows': 5,
+        })
+        results = benchmark.run(repeat=2)
+        self.assertEqual(
+            set(results), {pattern.name for pattern in urlpatterns})
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertLess(result['status'], 500)
+                self.assertGreater(result['queries'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+
+    def test_compare(self):
+        """Сравнение прогонов показывает изменение p95."""
+        previous = {'index': {'p95_ms': 10.0, 'queries': 4}}
+        current = {'index': {'p95_ms': 15.0, 'queries': 4}}
+        self.assertIn('+50%', benchmark.compare(previous, current)[0])
+
+    def test_run_profile(self):
+        """Прогон с настройками профиля восстанавливает CONN_MAX_AGE."""
+        benchmark.seed({
+            'users': 3, 'groups': 1, 'posts': 5,
+            'comments': 2, 'follows': 2,
+        })
+        before = connection.settings_dict['CONN_MAX_AGE']
+        with mock.patch.dict(os.environ, {'DJANGO_SECRET_KEY': 'key'}):
+            overrides, conn_max_age = benchmark.load_profile('prod')
+        self.assertEqual(conn_max_age, 600)
+        results = benchmark.run_profile(overrides, conn_max_age, repeat=1)
+        self.assertEqual(results['index']['status'], HTTPStatus.OK)
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], before)
+
+    def test_savings(self):
+        current = {'index': {'p50_ms': 10.0}}
+        profile = {'index': {'p50_ms': 4.0}}
+        self.assertIn('6.000 мс (60%)', benchmark.savings(current, profile)[0])
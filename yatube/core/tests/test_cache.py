@@ -0,0 +1,367 @@
+import socketserver
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import RedisCache, TieredCache, _LocalStore
+
+
+class FakeRespServer(socketserver.ThreadingTCPServer):
+    """Подставной сервер с протоколом Redis: словарь в памяти и
+    только те команды, которые использует core.cache."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRespHandler)
+        self.data = {}
+        self.lock = threading.Lock()
+        self.commands = []
+        self.clients = set()
+
+    @property
+    def url(self):
+        return 'redis://127.0.0.1:%d/0' % self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.shutdown()
+        self.drop_clients()
+        self.server_close()
+
+    def drop_clients(self):
+        for sock in list(self.clients):
+            sock.close()
+
+    def value(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def run(self, name, args):
+        self.commands.append(name)
+        command = getattr(self, f'command_{name.lower()}', None)
+        if command is None:
+            return ValueError(f'ERR unknown command {name}')
+        return command(*args)
+
+    def command_ok(self, *args):
+        return 'OK'
+
+    command_ping = command_auth = command_select = command_ok
+
+    def command_get(self, key):
+        return self.value(key)
+
+    def command_mget(self, *keys):
+        return [self.value(key) for key in keys]
+
+    def command_exists(self, *keys):
+        return sum(self.value(key) is not None for key in keys)
+
+    def command_del(self, *keys):
+        found = [key for key in keys if self.value(key) is not None]
+        for key in found:
+            del self.data[key]
+        return len(found)
+
+    def command_set(self, key, value, *flags):
+        exists = self.value(key) is not None
+        if b'NX' in flags and exists or b'XX' in flags and not exists:
+            return None
+        expires = None
+        if b'PX' in flags:
+            ttl = int(flags[flags.index(b'PX') + 1]) / 1000
+            expires = time.monotonic() + ttl
+        self.data[key] = (value, expires)
+        return 'OK'
+
+    def command_incrby(self, key, delta):
+        try:
+            number = int(self.value(key) or 0) + int(delta)
+        except ValueError:
+            return ValueError('ERR value is not an integer')
+        expires = self.data.get(key, (None, None))[1]
+        self.data[key] = (str(number).encode(), expires)
+        return number
+
+    def command_pexpire(self, key, ttl=None):
+        value = self.value(key)
+        if value is None:
+            return 0
+        expires = None if ttl is None else time.monotonic() + int(ttl) / 1000
+        self.data[key] = (value, expires)
+        return 1
+
+    command_persist = command_pexpire
+
+    def command_flushdb(self):
+        self.data.clear()
+        return 'OK'
+
+
+class FakeRespHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        self.server.clients.add(self.request)
+        try:
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                args = []
+                for _ in range(int(line[1:])):
+                    length = int(self.rfile.readline()[1:])
+                    args.append(self.rfile.read(length + 2)[:-2])
+                with self.server.lock:
+                    reply = self.server.run(args[0].decode().upper(), args[1:])
+                self.wfile.write(self.encode(reply))
+        except OSError:
+            return
+        finally:
+            self.server.clients.discard(self.request)
+
+    def encode(self, reply):
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, ValueError):
+            return b'-%s\r\n' % str(reply).encode()
+        if isinstance(reply, str):
+            return b'+%s\r\n' % reply.encode()
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, list):
+            return b'*%d\r\n' % len(reply) + b''.join(
+                self.encode(item) for item in reply)
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class FakeServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRespServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.data.clear()
+        self.server.commands.clear()
+
+
+class RedisCacheTests(FakeServerMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = RedisCache(self.server.url, {'KEY_PREFIX': 'test'})
+
+    def test_values_round_trip(self):
+        """Числа хранятся как есть, прочие значения — через pickle."""
+        self.cache.set('number', 42)
+        self.cache.set('data', {'posts': [1, 2]})
+        self.assertEqual(self.cache.get('number'), 42)
+        self.assertEqual(self.cache.get('data'), {'posts': [1, 2]})
+        self.assertEqual(self.server.data[b'test:1:number'][0], b'42')
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+
+    def test_add_and_get_or_set(self):
+        self.assertTrue(self.cache.add('key', 'first'))
+        self.assertFalse(self.cache.add('key', 'second'))
+        self.assertEqual(self.cache.get_or_set('key', 'third'), 'first')
+        self.assertEqual(self.cache.get_or_set('other', lambda: 7), 7)
+
+    def test_timeouts(self):
+        self.cache.set('short', 1, timeout=0.05)
+        self.cache.set('zero', 1, timeout=0)
+        self.cache.set('forever', 1, timeout=None)
+        self.assertFalse(self.cache.has_key('zero'))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('forever'), 1)
+        self.assertTrue(self.cache.touch('forever', 0.05))
+        self.assertFalse(self.cache.touch('missing'))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('forever'))
+
+    def test_incr(self):
+        """incr/decr атомарны на сервере, отсутствующий ключ — ошибка."""
+        self.cache.set('counter', 10)
+        self.assertEqual(self.cache.incr('counter'), 11)
+        self.assertEqual(self.cache.decr('counter', 5), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.assertFalse(self.cache.has_key('missing'))
+        self.cache.set('text', 'abc')
+        with self.assertRaises(ValueError):
+            self.cache.incr('text')
+
+    def test_many(self):
+        self.cache.set_many({'a': 1, 'b': 'два'})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 'два'})
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_clear(self):
+        self.cache.set('key', 1)
+        self.cache.clear()
+        self.assertFalse(self.cache.has_key('key'))
+
+    def test_reconnects(self):
+        """Разорванное сервером соединение открывается заново."""
+        self.cache.set('key', 1)
+        self.server.drop_clients()
+        self.assertEqual(self.cache.get('key'), 1)
+
+
+class TieredCacheTests(FakeServerMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        settings = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'shared': {
+                'BACKEND': 'core.cache.RedisCache',
+                'LOCATION': self.server.url,
+            },
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def make_process(self, **options):
+        """Кеш отдельного процесса: свой LRU, общий сервер."""
+        options.setdefault('SYNC_INTERVAL', 0)
+        cache = TieredCache('tiered', {'OPTIONS': options})
+        cache._store = _LocalStore()
+        return cache
+
+    def test_hot_key_served_locally(self):
+        """Повторное чтение горячего ключа не идёт на сервер, кроме
+        одной сверки эпохи за SYNC_INTERVAL."""
+        cache = self.make_process(SYNC_INTERVAL=60)
+        cache.set('index', '<html>')
+        self.server.commands.clear()
+        for _ in range(5):
+            self.assertEqual(cache.get('index'), '<html>')
+        self.assertEqual(self.server.commands, ['GET'])
+
+    def test_write_is_broadcast(self):
+        """Запись в одном процессе сбрасывает LRU остальных."""
+        first, second = self.make_process(), self.make_process()
+        first.set('key', 'old')
+        self.assertEqual(second.get('key'), 'old')
+        first.set('key', 'new')
+        self.assertEqual(second.get('key'), 'new')
+        first.delete('key')
+        self.assertIsNone(second.get('key'))
+
+    def test_new_key_not_broadcast(self):
+        """Запись нового ключа не трогает LRU остальных процессов."""
+        first, second = self.make_process(), self.make_process()
+        first.set('a', 1)
+        self.assertEqual(second.get('a'), 1)
+        first.set('b', 2)
+        self.server.commands.clear()
+        self.assertEqual(second.get('a'), 1)
+        self.assertEqual(self.server.commands, ['GET'])
+
+    def test_overwrite_drops_only_changed_key(self):
+        first, second = self.make_process(), self.make_process()
+        first.set('a', 'old')
+        first.set('b', 'kept')
+        self.assertEqual(second.get('a'), 'old')
+        self.assertEqual(second.get('b'), 'kept')
+        first.set('a', 'new')
+        self.server.commands.clear()
+        self.assertEqual(second.get('b'), 'kept')
+        self.assertEqual(self.server.commands, ['GET', 'MGET'])
+        self.assertEqual(second.get('a'), 'new')
+
+    def test_lost_change_clears_local_tier(self):
+        """Без записи в журнале изменений LRU очищается целиком."""
+        first, second = self.make_process(), self.make_process()
+        first.set('a', 'old')
+        first.set('b', 'kept')
+        second.get('a'), second.get('b')
+        first.set('a', 'new')
+        for key in list(self.server.data):
+            if b'tiered_cache:change' in key:
+                del self.server.data[key]
+        second.get('a')
+        self.assertNotIn(second.make_key('b'), second._store.items)
+
+    def test_zero_timeout_not_stored(self):
+        cache = self.make_process()
+        cache.set('key', 'value', 0)
+        self.assertIsNone(cache.get('key'))
+
+    def test_local_entry_not_longer_than_shared(self):
+        """Запись в LRU живёт не дольше, чем ключ в общем кеше."""
+        cache = self.make_process(LOCAL_TIMEOUT=60)
+        cache.set('set', 'value', 5)
+        cache.add('add', 'value', 5)
+        cache.set('long', 'value', 3600)
+        items = cache._store.items
+        now = time.monotonic()
+        self.assertLessEqual(items[cache.make_key('set')][0] - now, 5)
+        self.assertLessEqual(items[cache.make_key('add')][0] - now, 5)
+        self.assertGreater(items[cache.make_key('long')][0] - now, 5)
+
+    def test_incr_is_broadcast(self):
+        first, second = self.make_process(), self.make_process()
+        first.set('generation', 1)
+        self.assertEqual(second.get('generation'), 1)
+        self.assertEqual(first.incr('generation'), 2)
+        self.assertEqual(second.get('generation'), 2)
+
+    def test_stale_until_sync_interval(self):
+        """Между сверками процесс может отдать прежнее значение."""
+        first = self.make_process()
+        second = self.make_process(SYNC_INTERVAL=60)
+        first.set('key', 'old')
+        self.assertEqual(second.get('key'), 'old')
+        first.set('key', 'new')
+        self.assertEqual(second.get('key'), 'old')
+        second._store.synced_at = 0
+        self.assertEqual(second.get('key'), 'new')
+
+    def test_local_tier_is_bounded(self):
+        cache = self.make_process(MAX_ENTRIES=2, SYNC_INTERVAL=60)
+        for key in 'abc':
+            cache.set(key, key)
+        self.assertEqual(list(cache._store.items), [
+            cache.make_key('b'), cache.make_key('c')])
+        self.assertEqual(cache.get('a'), 'a')
+
+    def test_site_works_on_tiered_cache(self):
+        """Кеш фрагментов лент работает поверх общего сервера."""
+        with self.settings(CACHES={
+            'default': {
+                'BACKEND': 'core.cache.TieredCache',
+                'LOCATION': 'site',
+            },
+            'shared': {
+                'BACKEND': 'core.cache.RedisCache',
+                'LOCATION': self.server.url,
+            },
+        }):
+            caches['default'].clear()
+            from posts import listing_cache
+            generation = listing_cache.generation()
+            listing_cache.bump_generation()
+            self.assertEqual(listing_cache.generation(), generation + 1)
@@ -0,0 +1,113 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection, connections, router, transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import db_router
+from core.models import Task
+from posts import counters
+from posts.models import Post, User
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TransactionTestCase):
+    """Реплика — файл SQLite, который replicate() перезаписывает копией
+    основной (тестовой) базы; между копиями реплика отстаёт."""
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.replica_path = os.path.join(cls.directory, 'replica.sqlite3')
+        connections.databases['replica'] = {
+            **connections.databases['default'],
+            'NAME': cls.replica_path,
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections.databases['replica']
+        del connections._connections.replica
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def replicate(self):
+        connections['replica'].close()
+        connection.ensure_connection()
+        target = sqlite3.connect(self.replica_path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.replicate()
+
+    def test_reads_go_to_replica(self):
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertEqual(
+            Client().get(reverse('posts:index')).context['page_obj']
+            .paginator.count, 0)
+        self.replicate()
+        self.assertTrue(Post.objects.filter(pk=post.pk).exists())
+
+    def test_primary_reads(self):
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        with transaction.atomic():
+            self.assertTrue(Post.objects.filter(pk=post.pk).exists())
+        with db_router.pinned():
+            self.assertTrue(Post.objects.filter(pk=post.pk).exists())
+        self.assertEqual(router.db_for_read(User), 'default')
+        self.assertEqual(router.db_for_read(Task), 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
+
+    def test_recount_reads_primary(self):
+        """Пересчёт счётчиков не переносит в основную базу данные
+        отстающей реплики."""
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(counters.recount_user(self.author.pk).posts_count, 1)
+
+    def test_post_create_pins_author(self):
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'})
+        self.assertEqual(
+            response.cookies[db_router.PIN_COOKIE]['max-age'], 10)
+        url = reverse('posts:profile', args=['author'])
+        # Страница с отстающей реплики не попадает в кеш фрагментов.
+        self.assertNotContains(Client().get(url), 'Свежий пост')
+        self.assertContains(self.client.get(url), 'Свежий пост')
+
+    def test_lagging_pages_have_no_etag(self):
+        url = reverse('posts:profile', args=['author'])
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(Client().get(url).has_header('ETag'))
+        with override_settings(DATABASE_PIN_SECONDS=0):
+            self.assertTrue(Client().get(url).has_header('ETag'))
+
+    def test_follow_pins_follower(self):
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:profile', args=['author'])
+        response = client.get(
+            reverse('posts:profile_follow', args=['author']))
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+        self.assertTrue(client.get(url).context['following'])
+        client.cookies.pop(db_router.PIN_COOKIE)
+        self.assertFalse(client.get(url).context['following'])
+
+    def test_invalid_form_does_not_pin(self):
+        response = self.client.post(reverse('posts:post_create'), {})
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
@@ -0,0 +1,58 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+from http import HTTPStatus
+
+from core import performance
+from posts.models import User
+
+
+class PerformanceTests(TestCase):
+    def setUp(self):
+        performance.reset()
+        self.staff = User.objects.create_user(
+            username='staff', is_staff=True)
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_requests_are_recorded(self):
+        """Каждый запрос попадает в статистику своего маршрута."""
+        for _ in range(3):
+            self.client.get(reverse('posts:index'))
+        rows = {row['name']: row for row in performance.summary()}
+        row = rows['posts:index']
+        self.assertEqual(row['count'], 3)
+        self.assertGreater(row['queries_avg'], 0)
+        self.assertGreater(row['template_ms_avg'], 0)
+        self.assertGreater(row['size_avg'], 0)
+
+    def test_buffer_is_bounded(self):
+        """Буфер маршрута хранит ограниченное число измерений."""
+        with self.settings(PERF_BUFFER_SIZE=2):
+            performance.reset()
+            for _ in range(5):
+                self.client.get(reverse('posts:index'))
+        rows = {row['name']: row for row in performance.summary()}
+        self.assertEqual(rows['posts:index']['count'], 2)
+
+    def test_duplicate_queries(self):
+        """Повторяющийся SQL определяется как N+1."""
+        stats = performance.RequestStats()
+        for _ in range(3):
+            stats.execute(lambda *args: None, 'SELECT %s', [1], False, {})
+        self.assertEqual(stats.duplicates(3), {'SELECT %s': 3})
+
+    def test_over_budget_is_logged(self):
+        """Запрос сверх бюджета пишется в лог."""
+        with self.settings(PERF_QUERY_BUDGET=0):
+            with self.assertLogs('core.performance', 'WARNING'):
+                self.client.get(reverse('posts:index'))
+
+    def test_perf_page_is_staff_only(self):
+        """Страница /core/perf/ доступна только персоналу."""
+        url = reverse('core:performance')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.client.get(reverse('posts:index'))
+        response = self.staff_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'posts:index')
@@ -0,0 +1,64 @@
+import importlib
+import os
+import sys
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+
+class SettingsProfileTests(SimpleTestCase):
+    def load(self, name, **environ):
+        module = f'yatube.settings.{name}'
+        sys.modules.pop(module, None)
+        try:
+            with mock.patch.dict(os.environ, environ):
+                return importlib.import_module(module)
+        finally:
+            sys.modules.pop(module, None)
+
+    def test_prod_requires_secret_key(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('DJANGO_SECRET_KEY', None)
+            with self.assertRaises(ImproperlyConfigured):
+                self.load('prod')
+
+    def test_prod_profile(self):
+        prod = self.load('prod', DJANGO_SECRET_KEY='key')
+        self.assertFalse(prod.DEBUG)
+        self.assertEqual(prod.DATABASES['default']['CONN_MAX_AGE'], 600)
+        self.assertFalse(prod.TEMPLATES[0]['APP_DIRS'])
+        loader, _ = prod.TEMPLATES[0]['OPTIONS']['loaders'][0]
+        self.assertEqual(loader, 'django.template.loaders.cached.Loader')
+        self.assertEqual(
+            prod.CACHES['default']['BACKEND'], 'core.cache.TieredCache')
+        self.assertIn('Manifest', prod.STATICFILES_STORAGE)
+        security = prod.MIDDLEWARE.index(
+            'django.middleware.security.SecurityMiddleware')
+        self.assertEqual(
+            prod.MIDDLEWARE[security + 1],
+            'core.middleware.StaticFilesMiddleware')
+        # Общие настройки base не изменились.
+        base = importlib.import_module('yatube.settings.base')
+        self.assertTrue(base.TEMPLATES[0]['APP_DIRS'])
+        self.assertNotIn('core.middleware.StaticFilesMiddleware',
+                         base.MIDDLEWARE)
+        self.assertFalse(base.DATABASES['default'].get('CONN_MAX_AGE'))
+
+    def test_prod_postgres(self):
+        prod = self.load(
+            'prod', DJANGO_SECRET_KEY='key', POSTGRES_DB='yatube',
+            DB_HOST='db', DB_CONN_MAX_AGE='60')
+        database = prod.DATABASES['default']
+        self.assertEqual(
+            database['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(database['HOST'], 'db')
+        self.assertEqual(database['CONN_MAX_AGE'], 60)
+        self.assertEqual(
+            prod.POSTS_SEARCH_BACKEND, 'posts.search.SimpleSearchBackend')
+
+    def test_dev_profile(self):
+        dev = self.load('dev', TASKS_EAGER='0')
+        self.assertTrue(dev.DEBUG)
+        self.assertTrue(dev.SECRET_KEY)
+        self.assertFalse(dev.TASKS_EAGER)
@@ -0,0 +1,73 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from http import HTTPStatus
+
+from core import staticfiles
+
+
+class StaticFilesTests(SimpleTestCase):
+    CSS = 'body { background: url("../img/logo.png"); }\n' * 100
+
+    def setUp(self):
+        source = tempfile.mkdtemp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        for name, content in (('css/site.css', self.CSS.encode()),
+                              ('img/logo.png', b'\x89PNG' * 100)):
+            path = os.path.join(source, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(content)
+        self.root = root
+        storage = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+        middleware = ['core.middleware.StaticFilesMiddleware']
+        overrides = override_settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=root,
+            STATICFILES_STORAGE=storage, MIDDLEWARE=middleware)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        self.hashed_css = staticfiles_storage.stored_name('css/site.css')
+
+    def test_collectstatic_writes_compressed_siblings(self):
+        self.assertRegex(self.hashed_css, r'^css/site\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root, self.hashed_css)
+        with open(path, 'rb') as original, open(path + '.gz', 'rb') as gz:
+            self.assertEqual(gzip.decompress(gz.read()), original.read())
+        # PNG не сжимается.
+        self.assertFalse(any(
+            name.endswith('.gz')
+            for name in os.listdir(os.path.join(self.root, 'img'))))
+
+    def test_hashed_file_served_compressed_and_immutable(self):
+        response = self.client.get(
+            f'/static/{self.hashed_css}', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], staticfiles.IMMUTABLE)
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertIn(b'logo.', body)
+
+    def test_plain_response_without_accept_encoding(self):
+        response = self.client.get(f'/static/{self.hashed_css}')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_unhashed_name_revalidated(self):
+        response = self.client.get('/static/css/site.css')
+        self.assertEqual(response['Cache-Control'], staticfiles.REVALIDATE)
+
+    def test_missing_and_outside_files_passed_on(self):
+        request = RequestFactory().get('/static/')
+        for name in ('css/missing.css', '../settings.py', 'css'):
+            self.assertIsNone(
+                staticfiles.serve(request, name, self.root, set()))
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import TestCase
+
+from core.models import StoredFile
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def test_same_content_saved_once(self):
+        first = self.storage.save('posts/a.txt', ContentFile(b'data'))
+        second = self.storage.save('posts/b.TXT', ContentFile(b'data'))
+        other = self.storage.save('posts/c.txt', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        directory, shard1, shard2, name = first.split('/')
+        self.assertEqual(directory, 'posts')
+        self.assertEqual(name[:4], shard1 + shard2)
+        self.assertTrue(name.endswith('.txt'))
+        with self.storage.open(first) as stored:
+            self.assertEqual(stored.read(), b'data')
+        self.assertEqual(StoredFile.objects.count(), 2)
+
+    def test_collect_only_unreferenced_after_grace(self):
+        name = self.storage.save('posts/a.txt', ContentFile(b'data'))
+        self.storage.retain(name)
+        self.storage.retain(name)
+        self.storage.release(name)
+        self.assertEqual(self.storage.collect(grace=0), [])
+        self.storage.release(name)
+        # Файл только что использовали: ждём grace.
+        self.assertEqual(self.storage.collect(grace=60), [])
+        self.assertEqual(self.storage.collect(grace=0), [name])
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_collect_filters_names(self):
+        kept = self.storage.save('posts/a.txt', ContentFile(b'a'))
+        removed = self.storage.save('posts/b.txt', ContentFile(b'b'))
+        self.assertEqual(
+            self.storage.collect(names=[removed], grace=0), [removed])
+        self.assertTrue(self.storage.exists(kept))
+
+    def test_collect_files_of_rolled_back_saves(self):
+        """Файл, сохранённый в откаченной транзакции, удаляется
+        полным проходом сборщика после grace."""
+        # Файлы со старыми именами и чужие каталоги сборщик не трогает.
+        legacy = 'posts/legacy.txt'
+        os.makedirs(self.storage.path('posts'))
+        with open(self.storage.path(legacy), 'wb') as file:
+            file.write(b'old')
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            name = self.storage.save('posts/a.txt', ContentFile(b'data'))
+            raise RuntimeError
+        self.assertTrue(self.storage.exists(name))
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertEqual(self.storage.collect(grace=60), [])
+        self.assertEqual(self.storage.collect(grace=0), [name])
+        self.assertFalse(self.storage.exists(name))
+        self.assertTrue(self.storage.exists(legacy))
+
+    def test_retain_many(self):
+        kept = self.storage.save('posts/a.txt', ContentFile(b'a'))
+        self.storage.retain(kept)
+        self.storage.retain_many([kept, 'posts/b.txt', '', 'posts/b.txt'])
+        self.assertEqual(dict(StoredFile.objects.values_list(
+            'name', 'references')), {kept: 2, 'posts/b.txt': 2})
+        self.assertEqual(self.storage.collect(grace=0), [])
+
+    def test_release_does_not_go_negative(self):
+        name = self.storage.save('posts/a.txt', ContentFile(b'data'))
+        self.storage.release(name)
+        self.storage.retain(name)
+        self.assertEqual(
+            StoredFile.objects.get(name=name).references, 1)
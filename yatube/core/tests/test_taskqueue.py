@@ -0,0 +1,141 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import taskqueue
+from core.models import Task
+from posts.models import FeedEntry, Follow, Post, User
+
+
+CALLS = []
+
+
+@taskqueue.task(name='core.tests.test_taskqueue.record')
+def record(value):
+    CALLS.append(value)
+
+
+@taskqueue.task(
+    name='core.tests.test_taskqueue.broken', max_attempts=2, retry_delay=60)
+def broken():
+    raise RuntimeError('сбой')
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_eager_mode_runs_immediately(self):
+        with self.settings(TASKS_EAGER=True):
+            record.delay(1)
+        self.assertEqual(CALLS, [1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_eager_mode_keeps_countdown(self):
+        """Отложенная задача ждёт срока и при TASKS_EAGER."""
+        with self.settings(TASKS_EAGER=True):
+            record.delay(1, countdown=60)
+        self.assertEqual(CALLS, [])
+        self.assertEqual(taskqueue.run_worker(once=True), 0)
+        Task.objects.update(run_at=timezone.now())
+        taskqueue.run_worker(once=True)
+        self.assertEqual(CALLS, [1])
+
+    def test_worker_runs_queued_tasks(self):
+        """Задача выполняется воркером, а не при постановке."""
+        record.delay(1)
+        record.delay(2)
+        self.assertEqual(CALLS, [])
+        self.assertEqual(taskqueue.run_worker(once=True), 2)
+        self.assertEqual(CALLS, [1, 2])
+        self.assertEqual(
+            set(Task.objects.values_list('status', flat=True)), {Task.DONE})
+
+    def test_idempotency_key(self):
+        """Пока задача в очереди, дубликат с тем же ключом не ставится."""
+        record.delay(1, key='same')
+        record.delay(1, key='same')
+        self.assertEqual(Task.objects.count(), 1)
+        taskqueue.claim('worker', 10)
+        record.delay(1, key='same')
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_claim_is_exclusive(self):
+        record.delay(1)
+        self.assertEqual(len(taskqueue.claim('first', 10)), 1)
+        self.assertEqual(taskqueue.claim('second', 10), [])
+
+    def test_retries_with_backoff(self):
+        broken.delay()
+        with self.assertLogs('core.taskqueue', 'ERROR'):
+            taskqueue.run_worker(once=True)
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.QUEUED)
+        self.assertEqual(task.attempts, 1)
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn('сбой', task.last_error)
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.taskqueue', 'ERROR'):
+            taskqueue.run_worker(once=True)
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+
+    def test_stale_tasks_are_released(self):
+        """Задача упавшего воркера возвращается в очередь."""
+        record.delay(1)
+        taskqueue.claim('dead', 10)
+        Task.objects.update(locked_at=timezone.now() - timedelta(days=1))
+        taskqueue.run_worker(once=True)
+        self.assertEqual(CALLS, [1])
+
+    def test_rollback_cancels_task(self):
+        try:
+            with transaction.atomic():
+                record.delay(1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(Task.objects.exists())
+
+    def test_post_side_effects_are_queued(self):
+        """Лента подписчика заполняется воркером после создания поста."""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        taskqueue.run_worker(once=True)
+        Post.objects.create(author=author, text='Пост')
+        self.assertFalse(FeedEntry.objects.exists())
+        call_command('run_tasks', once=True, stdout=StringIO())
+        self.assertEqual(FeedEntry.objects.filter(user=reader).count(), 1)
+
+    def test_follow_page_refreshed_after_worker(self):
+        """Лента, закешированная до работы воркера, не остаётся
+        без нового поста."""
+        cache.clear()
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        taskqueue.run_worker(once=True)
+        client = Client()
+        client.force_login(reader)
+        Post.objects.create(author=author, text='Новый пост автора')
+        response = client.get(reverse('posts:follow_index'))
+        self.assertNotContains(response, 'Новый пост автора')
+        taskqueue.run_worker(once=True)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Новый пост автора')
+
+    def test_purge(self):
+        record.delay(1)
+        taskqueue.run_worker(once=True)
+        self.assertEqual(taskqueue.purge(days=1), 0)
+        Task.objects.update(finished_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(taskqueue.purge(days=1), 1)
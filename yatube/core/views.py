@@ -1,5 +1,8 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 
+from . import performance
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -7,3 +10,9 @@ def page_not_found(request, exception):
 
 def permission_denied(request, reason=''):
     return render(request, 'core/403.html')
+
+
+@staff_member_required
+def performance_summary(request):
+    context = {'rows': performance.summary()}
+    return render(request, 'core/perf.html', context)
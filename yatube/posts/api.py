@@ -0,0 +1,446 @@
+"""JSON API для мобильных клиентов.
+
+Те же данные, что и в шаблонах posts.views, но без рендеринга HTML.
+Списки отдаются курсорными страницами и потоком, ?fields= ограничивает
+и поля ответа, и колонки в SELECT. Запись проходит через PostForm и
+CommentForm. Аутентификация — сессия сайта, изменяющие запросы, как и
+формы, требуют CSRF-токен. Большие картинки можно загрузить частями
+(/uploads/, posts.uploads) и передать в поле upload.
+"""
+import json
+from functools import wraps
+
+from django import forms
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import (
+    Http404, HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse)
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import condition
+
+from core.db_router import pinned
+
+from . import thumbnails, uploads, versions
+from .forms import CommentForm, PostForm, UploadForm
+from .models import Comment, FeedEntry, Follow, Group, Post, Upload, User
+from .paginators import CursorPaginator
+
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+
+class ApiError(Exception):
+    def __init__(self, status, errors):
+        super().__init__(errors)
+        self.status = status
+        self.errors = errors
+
+
+class Resource:
+    """Поля ресурса: имя -> (колонки для only(), значение в ответе).
+
+    Колонки указываются путями only(); связь из пути вида
+    'author__username' попадает в select_related.
+    """
+
+    def __init__(self, fields, required=('pk',)):
+        self.fields = fields
+        self.required = required
+
+    def parse_fields(self, request):
+        raw = request.GET.get('fields')
+        if not raw:
+            return list(self.fields)
+        names = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(400, {
+                'fields': [f'Неизвестные поля: {", ".join(unknown)}.']})
+        return names
+
+    def select(self, queryset, names):
+        columns = set(self.required)
+        for name in names:
+            columns.update(self.fields[name][0])
+        related = {
+            column.rsplit('__', 1)[0]
+            for column in columns if '__' in column
+        }
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
+
+    def serialize(self, obj, names, request):
+        return {
+            name: self.fields[name][1](obj, request) for name in names
+        }
+
+
+def _image_url(post, request):
+    return request.build_absolute_uri(post.image.url) if post.image else None
+
+
+POST_RESOURCE = Resource({
+    'id': ((), lambda post, request: post.pk),
+    'text': (('text',), lambda post, request: post.text),
+    'pub_date': (('pub_date',), lambda post, request: post.pub_date),
+    'author': (
+        ('author', 'author__username'),
+        lambda post, request: post.author.username),
+    'group': (
+        ('group', 'group__slug'),
+        lambda post, request: post.group.slug if post.group_id else None),
+    'image': (('image',), _image_url),
+    'comments_count': (
+        ('comments_count',), lambda post, request: post.comments_count),
+}, required=('pk', 'pub_date'))
+
+COMMENT_RESOURCE = Resource({
+    'id': ((), lambda comment, request: comment.pk),
+    'post': (('post',), lambda comment, request: comment.post_id),
+    'author': (
+        ('author', 'author__username'),
+        lambda comment, request: comment.author.username),
+    'text': (('text',), lambda comment, request: comment.text),
+    'created': (('created',), lambda comment, request: comment.created),
+}, required=('pk', 'created'))
+
+GROUP_RESOURCE = Resource({
+    'id': ((), lambda group, request: group.pk),
+    'title': (('title',), lambda group, request: group.title),
+    'slug': (('slug',), lambda group, request: group.slug),
+    'description': (
+        ('description',), lambda group, request: group.description),
+}, required=('pk', 'title'))
+
+UPLOAD_RESOURCE = Resource({
+    'id': ((), lambda upload, request: upload.pk),
+    'filename': (('filename',), lambda upload, request: upload.filename),
+    'size': (('size',), lambda upload, request: upload.size),
+    'offset': (('offset',), lambda upload, request: upload.offset),
+    'complete': (
+        ('offset', 'size'), lambda upload, request: upload.complete),
+})
+
+FOLLOW_RESOURCE = Resource({
+    'id': ((), lambda follow, request: follow.pk),
+    'author': (
+        ('author', 'author__username'),
+        lambda follow, request: follow.author.username),
+})
+
+
+class ApiPostForm(PostForm):
+    """PostForm, в которой группа задаётся slug, как и в ответах API."""
+    group = forms.ModelChoiceField(
+        Group.objects.all(), to_field_name='slug', required=False)
+
+
+def api_view(*methods):
+    """Ограничивает методы и превращает ошибки в JSON-ответы."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = _error(405, {'method': [
+                    f'Метод {request.method} не поддерживается.']})
+                response['Allow'] = ', '.join(methods)
+                return response
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                return _error(error.status, error.errors)
+            except Http404:
+                return _error(404, {'detail': ['Не найдено.']})
+        return wrapper
+    return decorator
+
+
+def _error(status, errors):
+    return JsonResponse(
+        {'errors': errors}, status=status,
+        json_dumps_params={'ensure_ascii': False})
+
+
+def _json(data, status=200):
+    return JsonResponse(
+        data, status=status, encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False})
+
+
+def _require_user(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, {'detail': ['Требуется авторизация.']})
+    return request.user
+
+
+def _request_data(request):
+    """Тело запроса: JSON, form-urlencoded или multipart."""
+    content_type = request.content_type
+    if content_type == 'application/json':
+        try:
+            payload = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ApiError(400, {'detail': ['Некорректный JSON.']})
+        if not isinstance(payload, dict):
+            raise ApiError(400, {'detail': ['Ожидается JSON-объект.']})
+        return payload, {}
+    if request.method == 'POST':
+        return request.POST, request.FILES
+    if content_type == 'multipart/form-data':
+        return request.parse_file_upload(request.META, request)
+    return QueryDict(request.body), {}
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError(400, {'limit': ['Ожидается целое число.']})
+    return max(1, min(size, API_MAX_PAGE_SIZE))
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def _stream(request, page, serialize):
+    """Страница отдаётся по одному объекту, без сборки всего JSON."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    meta = encoder.encode({
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.previous_cursor),
+    })
+    yield meta[:-1] + ', "results": ['
+    for i, obj in enumerate(page):
+        yield (', ' if i else '') + encoder.encode(serialize(obj))
+    yield ']}'
+
+
+def _listing(request, queryset, resource, ordering=None):
+    names = resource.parse_fields(request)
+    queryset = resource.select(queryset, names)
+    page = CursorPaginator(
+        queryset, _page_size(request), ordering).get_page(
+        request.GET.get('cursor'))
+    return StreamingHttpResponse(
+        _stream(request, page, lambda obj: resource.serialize(
+            obj, names, request)),
+        content_type='application/json')
+
+
+def _detail(request, obj, resource, status=200):
+    names = resource.parse_fields(request)
+    return _json(resource.serialize(obj, names, request), status)
+
+
+def _get_post(request, post_id):
+    names = POST_RESOURCE.parse_fields(request)
+    return get_object_or_404(
+        POST_RESOURCE.select(Post.objects.all(), names), pk=post_id)
+
+
+@api_view('GET', 'POST')
+def post_list(request):
+    if request.method == 'POST':
+        return _create_post(request)
+    posts = Post.objects.all()
+    if request.GET.get('group'):
+        posts = posts.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        posts = posts.filter(author__username=request.GET['author'])
+    return _listing(request, posts, POST_RESOURCE)
+
+
+@transaction.atomic
+def _create_post(request):
+    user = _require_user(request)
+    data, files = _request_data(request)
+    form = ApiPostForm(data, files=files or None, user=user)
+    if not form.is_valid():
+        raise ApiError(400, form.errors)
+    form.instance.author = user
+    post = form.save()
+    thumbnails.schedule_presets(post.image)
+    response = _detail(request, post, POST_RESOURCE, status=201)
+    response['Location'] = reverse('api:post_detail', args=(post.pk,))
+    return response
+
+
+@api_view('GET', 'PUT', 'PATCH', 'DELETE')
+@condition(**versions.condition_kwargs('post', 'post_id'))
+def post_detail(request, post_id):
+    if request.method == 'GET':
+        return _detail(request, _get_post(request, post_id), POST_RESOURCE)
+    return _change_post(request, post_id)
+
+
+@transaction.atomic
+def _change_post(request, post_id):
+    user = _require_user(request)
+    post = get_object_or_404(
+        Post.objects.select_related('group'), pk=post_id)
+    if post.author_id != user.pk:
+        raise ApiError(403, {'detail': ['Можно менять только свои посты.']})
+    if request.method == 'DELETE':
+        post.delete()
+        return HttpResponse(status=204)
+    data, files = _request_data(request)
+    if request.method == 'PATCH':
+        current = {
+            'text': post.text,
+            'group': post.group.slug if post.group_id else '',
+        }
+        current.update(data.items())
+        data = current
+    form = ApiPostForm(
+        data, files=files or None, instance=post, user=user)
+    if not form.is_valid():
+        raise ApiError(400, form.errors)
+    form.save()
+    if form.image_changed:
+        thumbnails.schedule_presets(post.image)
+    return _detail(request, post, POST_RESOURCE)
+
+
+@api_view('GET', 'POST')
+def comment_list(request, post_id):
+    if request.method == 'POST':
+        return _create_comment(request, post_id)
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = Comment.objects.filter(post_id=post_id)
+    return _listing(request, comments, COMMENT_RESOURCE)
+
+
+@transaction.atomic
+def _create_comment(request, post_id):
+    user = _require_user(request)
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    data, _ = _request_data(request)
+    form = CommentForm(data)
+    if not form.is_valid():
+        raise ApiError(400, form.errors)
+    comment = form.save(commit=False)
+    comment.author = user
+    comment.post = post
+    comment.save()
+    return _detail(request, comment, COMMENT_RESOURCE, status=201)
+
+
+@api_view('GET')
+def group_list(request):
+    return _listing(
+        request, Group.objects.all(), GROUP_RESOURCE, ordering=('title',))
+
+
+@api_view('GET')
+def group_detail(request, slug):
+    names = GROUP_RESOURCE.parse_fields(request)
+    group = get_object_or_404(
+        GROUP_RESOURCE.select(Group.objects.all(), names), slug=slug)
+    return _detail(request, group, GROUP_RESOURCE)
+
+
+@api_view('GET')
+def feed(request):
+    """Лента подписок: страница FeedEntry, затем посты одним запросом."""
+    user = _require_user(request)
+    names = POST_RESOURCE.parse_fields(request)
+    page = CursorPaginator(
+        FeedEntry.objects.filter(user=user).only('post_id', 'pub_date'),
+        _page_size(request)).get_page(request.GET.get('cursor'))
+    posts = POST_RESOURCE.select(Post.objects.all(), names).in_bulk(
+        [entry.post_id for entry in page])
+    page.object_list = [
+        posts[entry.post_id] for entry in page if entry.post_id in posts]
+    return StreamingHttpResponse(
+        _stream(request, page, lambda post: POST_RESOURCE.serialize(
+            post, names, request)),
+        content_type='application/json')
+
+
+@api_view('GET', 'POST')
+def follow_list(request):
+    user = _require_user(request)
+    if request.method == 'POST':
+        return _create_follow(request, user)
+    return _listing(
+        request, Follow.objects.filter(user=user), FOLLOW_RESOURCE,
+        ordering=('-id',))
+
+
+@transaction.atomic
+def _create_follow(request, user):
+    data, _ = _request_data(request)
+    author = User.objects.filter(username=data.get('author') or '').first()
+    if author is None:
+        raise ApiError(400, {'author': ['Пользователь не найден.']})
+    if author == user:
+        raise ApiError(400, {'author': ['Нельзя подписаться на себя.']})
+    follow, created = Follow.objects.get_or_create(user=user, author=author)
+    return _detail(
+        request, follow, FOLLOW_RESOURCE, status=201 if created else 200)
+
+
+@api_view('DELETE')
+@transaction.atomic
+def follow_detail(request, username):
+    user = _require_user(request)
+    follow = get_object_or_404(
+        Follow, user=user, author__username=username)
+    follow.delete()
+    return HttpResponse(status=204)
+
+
+@api_view('POST')
+def upload_list(request):
+    user = _require_user(request)
+    data, _ = _request_data(request)
+    form = UploadForm(data)
+    if not form.is_valid():
+        raise ApiError(400, form.errors)
+    upload = uploads.create(
+        user, form.cleaned_data['filename'], form.cleaned_data['size'])
+    response = _detail(request, upload, UPLOAD_RESOURCE, status=201)
+    response['Location'] = reverse('api:upload_detail', args=(upload.pk,))
+    return response
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+@pinned()
+def upload_detail(request, upload_id):
+    """GET — сколько байт принято, PATCH — следующая часть файла,
+    DELETE — отменить загрузку. offset читается из основной базы:
+    с отстающей реплики клиент начал бы часть не с того байта."""
+    user = _require_user(request)
+    upload = get_object_or_404(Upload, pk=upload_id, user=user)
+    if request.method == 'DELETE':
+        uploads.discard(upload)
+        return HttpResponse(status=204)
+    if request.method == 'PATCH':
+        _append_part(request, upload)
+    return _detail(request, upload, UPLOAD_RESOURCE)
+
+
+def _append_part(request, upload):
+    try:
+        start, length = uploads.parse_range(
+            request.META.get('HTTP_CONTENT_RANGE'), upload)
+    except forms.ValidationError as error:
+        raise ApiError(400, {'detail': error.messages})
+    if int(request.META.get('CONTENT_LENGTH') or 0) != length:
+        raise ApiError(400, {'detail': [
+            'Content-Length не совпадает с Content-Range.']})
+    try:
+        # Тело читается потоком, без request.body.
+        uploads.append(upload, request, start, length)
+    except uploads.OffsetMismatch as error:
+        raise ApiError(409, {
+            'detail': [f'Ожидается часть с байта {error.offset}.'],
+            'offset': error.offset})
@@ -0,0 +1,30 @@
+from django.urls import path
+
+from posts import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', api.post_list, name='post_list'),
+    path('posts/<int:post_id>/', api.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        api.comment_list,
+        name='comment_list'
+    ),
+    path('groups/', api.group_list, name='group_list'),
+    path('groups/<slug:slug>/', api.group_detail, name='group_detail'),
+    path('feed/', api.feed, name='feed'),
+    path('uploads/', api.upload_list, name='upload_list'),
+    path(
+        'uploads/<uuid:upload_id>/',
+        api.upload_detail,
+        name='upload_detail'
+    ),
+    path('follows/', api.follow_list, name='follow_list'),
+    path(
+        'follows/<str:username>/',
+        api.follow_detail,
+        name='follow_detail'
+    ),
+]
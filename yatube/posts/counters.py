@@ -0,0 +1,112 @@
+"""Денормализованные счётчики постов, комментариев и подписчиков.
+
+Счётчики меняются атомарным UPDATE ... SET x = x + 1 в той же
+транзакции, что и изменение данных. Если строки статистики ещё нет,
+она создаётся пересчётом по текущему состоянию базы.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.db_router import pinned
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+# Пересчёт записывается в основную базу, поэтому и читает из неё.
+@pinned()
+def recount_user(user_id):
+    counts = {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'comments_count': Comment.objects.filter(
+            author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(
+            author_id=user_id).count(),
+    }
+    try:
+        with transaction.atomic():
+            stats, _ = UserStats.objects.update_or_create(
+                user_id=user_id, defaults=counts)
+    except IntegrityError:
+        stats = UserStats.objects.get(user_id=user_id)
+    return stats
+
+
+def stats_for(user):
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        return recount_user(user.pk)
+
+
+def change_user(user_id, field, delta):
+    with transaction.atomic():
+        updated = UserStats.objects.filter(user_id=user_id).update(
+            **{field: F(field) + delta})
+        # При уменьшении строку не создаём: это может быть каскадное
+        # удаление самого пользователя. Её пересчитает первое чтение.
+        if not updated and delta > 0:
+            recount_user(user_id)
+
+
+def change_post_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta)
+
+
+def recount_all(batch_size=1000):
+    """Исправляет расхождения счётчиков с фактическими данными."""
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by()
+    comments = comments.values('post').annotate(
+        total=Count('pk')).values('total')
+    Post.objects.update(comments_count=Coalesce(Subquery(comments), 0))
+    user_ids = User.objects.values_list('pk', flat=True).order_by('pk')
+    batch = []
+    for user_id in user_ids.iterator():
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            recount_users(batch)
+            batch = []
+    if batch:
+        recount_users(batch)
+
+
+def recount_users(user_ids):
+    """Пересчитывает статистику пачки пользователей."""
+    def totals(queryset, field):
+        rows = queryset.filter(**{f'{field}__in': user_ids}).order_by()
+        rows = rows.values(field).annotate(total=Count('pk'))
+        return {row[field]: row['total'] for row in rows}
+
+    posts = totals(Post.objects.all(), 'author_id')
+    comments = totals(Comment.objects.all(), 'author_id')
+    followers = totals(Follow.objects.all(), 'author_id')
+    with transaction.atomic():
+        existing = {
+            row[0]: row[1:]
+            for row in UserStats.objects.filter(
+                user_id__in=user_ids).values_list(
+                    'user_id', 'posts_count', 'comments_count',
+                    'followers_count')
+        }
+        missing = []
+        for user_id in user_ids:
+            counts = (
+                posts.get(user_id, 0),
+                comments.get(user_id, 0),
+                followers.get(user_id, 0),
+            )
+            if user_id not in existing:
+                missing.append(UserStats(
+                    user_id=user_id,
+                    posts_count=counts[0],
+                    comments_count=counts[1],
+                    followers_count=counts[2],
+                ))
+            elif existing[user_id] != counts:
+                UserStats.objects.filter(user_id=user_id).update(
+                    posts_count=counts[0],
+                    comments_count=counts[1],
+                    followers_count=counts[2],
+                )
+        UserStats.objects.bulk_create(missing)
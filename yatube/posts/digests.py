@@ -0,0 +1,176 @@
+"""Дайджесты новых постов для подписчиков.
+
+Вместо письма на каждый пост каждому подписчику прогон обходит связи
+Follow пачками в порядке (user_id, author_id), собирает посты авторов,
+вышедшие после прошлого дайджеста подписчика, и отправляет по одному
+письму через одно открытое соединение EMAIL_BACKEND.
+
+После каждой пачки сохраняется контрольная точка (DigestRun), поэтому
+прерванный прогон продолжается с того же места. В памяти одновременно
+только пачка связей, не больше DIGEST_POSTS_PER_AUTHOR постов на автора
+пачки и не больше DIGEST_MAX_POSTS постов на подписчика.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import timezone
+
+from core.db_router import pinned
+
+from .models import DigestRun, DigestState, Follow, Post, User
+
+DIGEST_BATCH_SIZE = 500
+DIGEST_POSTS_PER_AUTHOR = 5
+DIGEST_MAX_POSTS = 20
+# Первый дайджест подписчика охватывает только последние сутки.
+DIGEST_FIRST_WINDOW = timedelta(days=1)
+DIGEST_SUBJECT = 'Новые записи ваших авторов'
+
+
+def _edges(after_user, after_author, batch_size):
+    """Следующая пачка связей после позиции (after_user, after_author);
+    after_author=None — начать со следующего пользователя."""
+    position = Q(user_id__gt=after_user)
+    if after_author is not None:
+        position |= Q(user_id=after_user, author_id__gt=after_author)
+    return list(
+        Follow.objects.filter(position)
+        .order_by('user_id', 'author_id')
+        .values_list('user_id', 'author_id')[:batch_size])
+
+
+def _since(user_ids, cutoff):
+    """С какого момента собирать посты; None — дайджест этого прогона
+    пользователю уже отправлен."""
+    sent = dict(DigestState.objects.filter(
+        user_id__in=user_ids).values_list('user_id', 'sent_until'))
+    since = {}
+    for user_id in user_ids:
+        sent_until = sent.get(user_id)
+        if sent_until is None:
+            since[user_id] = cutoff - DIGEST_FIRST_WINDOW
+        elif sent_until < cutoff:
+            since[user_id] = sent_until
+        else:
+            since[user_id] = None
+    return since
+
+
+def _recent_posts(author_ids, since, cutoff):
+    """Последние посты авторов из окна (since, cutoff]."""
+    posts = {}
+    rows = Post.objects.filter(
+        author_id__in=author_ids, pub_date__gt=since, pub_date__lte=cutoff,
+    ).order_by('author_id', '-pub_date').values(
+        'pk', 'author_id', 'author__username', 'pub_date', 'text')
+    for row in rows.iterator():
+        bucket = posts.setdefault(row['author_id'], [])
+        if len(bucket) < DIGEST_POSTS_PER_AUTHOR:
+            row['url'] = settings.SITE_URL + reverse(
+                'posts:post_detail', args=(row['pk'],))
+            bucket.append(row)
+    return posts
+
+
+def _messages(digests):
+    users = User.objects.filter(
+        pk__in=[user_id for user_id, posts in digests if posts]
+    ).exclude(email='').only(
+        'username', 'first_name', 'last_name', 'email').in_bulk()
+    # Шаблон и ссылка на ленту — один раз на пачку, а не на письмо.
+    template = get_template('posts/email/digest.txt')
+    feed_url = settings.SITE_URL + reverse('posts:follow_index')
+    messages = []
+    for user_id, posts in digests:
+        user = users.get(user_id)
+        if user is None or not posts:
+            continue
+        body = template.render({
+            'user': user,
+            'posts': posts,
+            'feed_url': feed_url,
+        })
+        messages.append(EmailMessage(
+            DIGEST_SUBJECT, body, settings.DEFAULT_FROM_EMAIL, [user.email]))
+    return messages
+
+
+def _mark_sent(user_ids, cutoff):
+    DigestState.objects.filter(user_id__in=user_ids).update(
+        sent_until=cutoff)
+    DigestState.objects.bulk_create(
+        [DigestState(user_id=user_id, sent_until=cutoff)
+         for user_id in user_ids],
+        ignore_conflicts=True)
+
+
+def _collect(edges, since, posts, current, finished):
+    """Раскладывает посты пачки по подписчикам. current — подписчик,
+    чьи связи могут продолжиться в следующей пачке."""
+    user_id, collected = current
+    for follower, author in edges:
+        if follower != user_id:
+            if user_id is not None:
+                finished.append((user_id, collected))
+            user_id, collected = follower, []
+        start = since.get(follower)
+        if start is None:
+            continue
+        fresh = [post for post in posts.get(author, ())
+                 if post['pub_date'] > start]
+        collected = heapq.nlargest(
+            DIGEST_MAX_POSTS, collected + fresh,
+            key=lambda post: (post['pub_date'], post['pk']))
+    return user_id, collected
+
+
+@pinned()
+def send_digests(batch_size=DIGEST_BATCH_SIZE, restart=False):
+    """Рассылает дайджесты, продолжая незавершённый прогон. Контрольные
+    точки читаются из основной базы: с отстающей реплики прогон
+    разослал бы письма повторно."""
+    run = None
+    if not restart:
+        run = DigestRun.objects.filter(
+            finished_at__isnull=True).order_by('-pk').first()
+    if run is None:
+        run = DigestRun.objects.create(cutoff=timezone.now())
+    position = (run.last_user_id, None)
+    current = (None, [])
+    connection = get_connection()
+    connection.open()
+    try:
+        while True:
+            edges = _edges(*position, batch_size)
+            last_batch = len(edges) < batch_size
+            since = _since({user_id for user_id, _ in edges}, run.cutoff)
+            active = [value for value in since.values() if value]
+            posts = {}
+            if active:
+                posts = _recent_posts(
+                    {author for user, author in edges if since[user]},
+                    min(active), run.cutoff)
+            finished = []
+            current = _collect(edges, since, posts, current, finished)
+            if last_batch and current[0] is not None:
+                finished.append(current)
+            if finished:
+                messages = _messages(finished)
+                if messages:
+                    run.sent += connection.send_messages(messages) or 0
+                _mark_sent([user_id for user_id, _ in finished], run.cutoff)
+                run.last_user_id = finished[-1][0]
+                run.save(update_fields=['last_user_id', 'sent'])
+            if last_batch:
+                break
+            position = edges[-1]
+    finally:
+        connection.close()
+    run.finished_at = timezone.now()
+    run.save(update_fields=['finished_at'])
+    return run
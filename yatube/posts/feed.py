@@ -0,0 +1,105 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Каждый пост автора раскладывается в ленты его подписчиков в момент
+сохранения, поэтому follow_index читает готовый список id постов
+из FeedEntry без join по Follow.
+"""
+from .models import FeedEntry, Follow, Post
+
+FEED_BATCH_SIZE = 500
+
+
+def _bulk_insert(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= FEED_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Добавляет пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    _bulk_insert(
+        FeedEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def fan_out_posts(posts):
+    """Раскладывает пачку постов (например, после импорта)."""
+    author_ids = {post.author_id for post in posts}
+    followers = {}
+    for user_id, author_id in Follow.objects.filter(
+            author_id__in=author_ids).values_list('user_id', 'author_id'):
+        followers.setdefault(author_id, []).append(user_id)
+    _bulk_insert(
+        FeedEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for post in posts
+        for user_id in followers.get(post.author_id, ())
+    )
+
+
+def sync_post(post):
+    """Приводит записи ленты в соответствие с отредактированным постом."""
+    FeedEntry.objects.filter(post_id=post.pk).exclude(
+        pub_date=post.pub_date, author_id=post.author_id
+    ).update(pub_date=post.pub_date, author_id=post.author_id)
+
+
+def add_author(user_id, author_id):
+    """Заполняет ленту пользователя постами нового автора."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date')
+    _bulk_insert(
+        FeedEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты пользователя посты автора после отписки."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(user_ids=None):
+    """Перестраивает ленты с нуля по текущим подпискам."""
+    follows = Follow.objects.all()
+    entries = FeedEntry.objects.all()
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+    entries.delete()
+    for user_id, author_id in follows.values_list(
+            'user_id', 'author_id').iterator():
+        add_author(user_id, author_id)
+
+
+def feed_entries(user):
+    return FeedEntry.objects.filter(user=user).only('post_id', 'pub_date')
+
+
+def posts_for_entries(entries):
+    """Возвращает посты в порядке записей ленты."""
+    ids = [entry.post_id for entry in entries]
+    posts = Post.objects.for_listing().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,153 @@
+"""RSS и Atom для главной, групп и авторов.
+
+Готовый документ кешируется по версии ленты (versions, вид 'feed'),
+которую сигналы обновляют при сохранении и удалении постов. Пока
+версия не изменилась, повторный опрос с If-Modified-Since или
+If-None-Match получает 304, не доходя ни до базы, ни до кеша документов.
+"""
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.http import condition
+
+from core.db_router import replica_may_lag
+
+from . import versions
+from .models import Group, Post, User
+
+FEED_SIZE = 20
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+FEED_CACHE_KEY = 'posts:feed:{}:{}'
+
+
+class CachedFeed(Feed):
+    """Feed с кешем документа и условными GET-запросами."""
+    scope = None
+    scope_kwarg = None
+
+    def version_key(self, kwargs):
+        if self.scope_kwarg is None:
+            return self.scope
+        return f'{self.scope}:{kwargs[self.scope_kwarg]}'
+
+    def __call__(self, request, *args, **kwargs):
+        view = condition(
+            etag_func=lambda request, *args, **kwargs: versions.etag(
+                request, 'feed', self.version_key(kwargs), personal=False),
+            last_modified_func=lambda request, *args, **kwargs: (
+                versions.last_modified('feed', self.version_key(kwargs))),
+        )(self.render)
+        return view(request, *args, **kwargs)
+
+    def render(self, request, *args, **kwargs):
+        version = versions.changed_at('feed', self.version_key(kwargs))
+        # Документ не зависит от параметров адреса (utm_* и т.п.).
+        key = FEED_CACHE_KEY.format(request.path, version)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = super().__call__(request, *args, **kwargs)
+        # Last-Modified выставит condition по версии ленты: дата
+        # последнего поста не меняется при удалении.
+        del response['Last-Modified']
+        if not replica_may_lag(version):
+            cache.set(
+                key, (response.content, response['Content-Type']),
+                FEED_CACHE_TIMEOUT)
+        return response
+
+    def item_title(self, item):
+        return str(item)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=(item.pk,))
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_author_link(self, item):
+        return reverse('posts:profile', args=(item.author.username,))
+
+    def item_categories(self, item):
+        return (item.group.title,) if item.group_id else ()
+
+
+class LatestPostsFeed(CachedFeed):
+    scope = 'index'
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+    subtitle = description
+
+    def link(self):
+        return reverse('posts:index')
+
+    def items(self):
+        return Post.objects.for_listing()[:FEED_SIZE]
+
+
+class GroupPostsFeed(CachedFeed):
+    scope = 'group'
+    scope_kwarg = 'slug'
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def subtitle(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', args=(group.slug,))
+
+    def items(self, group):
+        return group.posts.for_listing()[:FEED_SIZE]
+
+
+class AuthorPostsFeed(CachedFeed):
+    scope = 'author'
+    scope_kwarg = 'username'
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}'
+
+    def subtitle(self, author):
+        return self.description(author)
+
+    def link(self, author):
+        return reverse('posts:profile', args=(author.username,))
+
+    def items(self, author):
+        return author.posts.for_listing()[:FEED_SIZE]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
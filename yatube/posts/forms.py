@@ -1,12 +1,22 @@
+import uuid
+
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import UploadedFile
 
-from .models import Post, Comment
+from . import images, uploads
+from .models import Post, Comment, Upload
 
 user = get_user_model()
 
 
 class PostForm(forms.ModelForm):
+    """Картинку можно передать файлом или id готовой загрузки частями
+    (posts.uploads) в параметре upload. upload — не поле формы: набор
+    полей формы поста фиксирован."""
+    UPLOAD_PARAM = 'upload'
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -17,12 +27,83 @@ class PostForm(forms.ModelForm):
                       'group': 'Выберите группу',
                       'image': 'Вставьте картинку'}
 
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        self._upload = None
+
+    @property
+    def image_changed(self):
+        return 'image' in self.changed_data or self._upload is not None
+
     def clean_text(self):
         data = self.cleaned_data['text']
         if data.lower() == '':
             raise forms.ValidationError('Поле обязательно нужно заполнить')
         return data
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return images.process(image)
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload_id = self.data.get(self.UPLOAD_PARAM) if self.data else None
+        # Файл в самом запросе важнее загрузки.
+        if upload_id and 'image' not in self.changed_data:
+            image = self._uploaded_image(upload_id)
+            if image is not None:
+                cleaned_data['image'] = image
+        return cleaned_data
+
+    def _uploaded_image(self, upload_id):
+        upload = None
+        try:
+            upload_id = uuid.UUID(str(upload_id))
+        except ValueError:
+            pass
+        else:
+            if self.user is not None and self.user.is_authenticated:
+                upload = Upload.objects.filter(
+                    pk=upload_id, user=self.user).first()
+        if upload is None or not upload.complete:
+            self.add_error(
+                'image', 'Загрузка не найдена или не завершена.')
+            return None
+        with uploads.open_complete(upload) as file:
+            try:
+                image = images.process(file)
+            except forms.ValidationError as error:
+                self.add_error('image', error)
+                return None
+        self._upload = upload
+        return image
+
+    def save(self, commit=True):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, images.ProcessedImage):
+            self.instance.image = images.store(image)
+            image.close()
+        post = super().save(commit)
+        if commit and self._upload is not None:
+            uploads.discard(self._upload)
+        return post
+
+
+class UploadForm(forms.Form):
+    """Начало загрузки частями: имя и размер всего файла."""
+    filename = forms.CharField(max_length=255)
+    size = forms.IntegerField(min_value=1)
+
+    def clean_size(self):
+        size = self.cleaned_data['size']
+        if size > settings.POSTS_IMAGE_MAX_UPLOAD_SIZE:
+            limit = settings.POSTS_IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)
+            raise forms.ValidationError(f'Файл больше {limit} МБ.')
+        return size
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
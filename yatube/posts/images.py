@@ -0,0 +1,104 @@
+"""Обработка загруженных картинок постов.
+
+Перед сохранением картинка проверяется по размеру файла и числу
+пикселей (до декодирования), поворачивается по EXIF, уменьшается до
+POSTS_IMAGE_MAX_SIZE по длинной стороне и перекодируется без
+метаданных: непрозрачная — в JPEG, с прозрачностью — в PNG.
+Анимированный GIF сохраняется как есть: перекодирование потеряло бы
+кадры, а метаданных EXIF в GIF нет.
+
+Имя файла — хеш SHA-256 результата (core.storage), поэтому
+одинаковые картинки хранятся один раз, и миниатюры sorl для них тоже
+создаются один раз.
+"""
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps
+
+from core.storage import content_digest
+
+from .models import Post
+
+UPLOAD_DIR = 'posts'
+CHUNK_SIZE = 64 * 1024
+# Сколько результата держать в памяти до записи во временный файл
+SPOOL_SIZE = 1024 * 1024
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+
+
+class ProcessedImage(File):
+    """Перекодированная картинка во временном файле; digest — хеш
+    содержимого, из него хранилище составит имя файла."""
+
+    def __init__(self, file, digest, extension):
+        super().__init__(file, f'{UPLOAD_DIR}/{digest}.{extension}')
+        self.digest = digest
+
+
+def _check_limits(upload, image):
+    if upload.size > settings.POSTS_IMAGE_MAX_UPLOAD_SIZE:
+        limit = settings.POSTS_IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)
+        raise ValidationError(
+            f'Файл больше {limit} МБ.', code='file_too_large')
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            'Поддерживаются JPEG, PNG, GIF и WebP.', code='invalid_format')
+    width, height = image.size
+    if width * height > settings.POSTS_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Слишком большое разрешение картинки.', code='too_many_pixels')
+
+
+def _encode(image, output):
+    """Записывает картинку без метаданных, возвращает расширение."""
+    max_size = settings.POSTS_IMAGE_MAX_SIZE
+    if image.format == 'JPEG':
+        # libjpeg сразу декодирует в уменьшенном масштабе (1/2 .. 1/8):
+        # фотография с телефона не разворачивается целиком в память.
+        image.draft('RGB', (max_size, max_size))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    transparent = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if transparent else 'RGB')
+    # convert() копирует info, а запись PNG берёт оттуда EXIF и ICC.
+    image.info = {}
+    if transparent:
+        image.save(output, 'PNG', optimize=True)
+        return 'png'
+    image.save(
+        output, 'JPEG', quality=settings.POSTS_IMAGE_QUALITY,
+        optimize=True, progressive=True)
+    return 'jpg'
+
+
+def process(upload):
+    """Проверяет и перекодирует загруженный файл в ProcessedImage."""
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Файл не является картинкой.', code='invalid_image')
+    _check_limits(upload, image)
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    if image.format == 'GIF' and getattr(image, 'is_animated', False):
+        upload.seek(0)
+        for chunk in upload.chunks(CHUNK_SIZE):
+            output.write(chunk)
+        extension = 'gif'
+    else:
+        try:
+            extension = _encode(image, output)
+        except (OSError, ValueError):
+            raise ValidationError(
+                'Не удалось прочитать картинку.', code='invalid_image')
+    return ProcessedImage(output, content_digest(output), extension)
+
+
+def store(processed):
+    """Сохраняет картинку в хранилище Post.image; возвращает имя."""
+    return Post.image.field.storage.save(processed.name, processed)
@@ -0,0 +1,61 @@
+"""Кеш фрагментов лент постов.
+
+Ключ фрагмента состоит из области ленты (главная, группа, профиль,
+подписки), параметров страницы и номера поколения. Любое изменение
+постов, комментариев, групп или подписок увеличивает поколение, поэтому
+фрагменты можно хранить долго, не показывая устаревших страниц.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.db_router import replica_may_lag
+
+LISTING_CACHE_TIMEOUT = 60 * 60 * 24
+GENERATION_KEY = 'posts:listing_generation'
+GENERATION_CHANGED_KEY = 'posts:listing_generation_changed'
+
+
+def _new_generation():
+    # Начальное значение от времени, чтобы после вытеснения ключа
+    # поколение не совпало с одним из старых.
+    return int(time.time() * 1000)
+
+
+def generation():
+    return cache.get_or_set(GENERATION_KEY, _new_generation, None)
+
+
+def bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, _new_generation(), None)
+    cache.set(GENERATION_CHANGED_KEY, time.time(), None)
+
+
+def page_key(request):
+    """Часть ключа по странице ленты: только параметры, от которых
+    зависит paginate(). Посторонние (utm_*, fbclid) не плодят копий
+    фрагмента. Пустой cursor — первая страница курсорной пагинации, а
+    не номерной, поэтому учитывается само его наличие."""
+    cursor = request.GET.get('cursor')
+    if cursor is not None:
+        return f'cursor:{cursor}'
+    return f'page:{request.GET.get("page", "")}'
+
+
+def listing_context(scope, request):
+    """Параметры для {% cache %} в шаблонах лент. Фрагмент,
+    прочитанный с отстающей реплики, не сохраняется (timeout 0)."""
+    timeout = LISTING_CACHE_TIMEOUT
+    if settings.DATABASE_REPLICAS and replica_may_lag(
+            cache.get(GENERATION_CHANGED_KEY, 0)):
+        timeout = 0
+    return {
+        'timeout': timeout,
+        'scope': scope,
+        'page': page_key(request),
+        'generation': generation(),
+    }
@@ -0,0 +1,83 @@
+"""Общие части команд import_posts и export_posts."""
+import csv
+import json
+import os
+import sys
+import time
+
+FIELDS = ('text', 'pub_date', 'author', 'group', 'image')
+FORMATS = ('jsonl', 'csv')
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path or '')[1].lstrip('.').lower()
+    return 'csv' if ext == 'csv' else 'jsonl'
+
+
+def open_input(path):
+    if path == '-':
+        return sys.stdin
+    return open(path, encoding='utf-8', newline='')
+
+
+def open_output(path):
+    if path == '-':
+        return sys.stdout
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def read_rows(stream, fmt):
+    """Построчно читает записи, не загружая файл целиком."""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+class RowWriter:
+    def __init__(self, stream, fmt):
+        self.fmt = fmt
+        self.stream = stream
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(stream, fieldnames=FIELDS)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == 'csv':
+            self.writer.writerow(row)
+        else:
+            self.stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Progress:
+    """Печатает число обработанных записей и скорость."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.started = time.monotonic()
+        self.done = 0
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed else 0
+
+    def advance(self, count):
+        self.done += count
+        self.stream.write(f'{self.done} постов, {self.rate:.0f} пост/с\n')
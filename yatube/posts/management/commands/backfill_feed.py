@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import feed
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', type=int, dest='user_ids',
+            help='id пользователя; можно указать несколько раз.')
+
+    def handle(self, *args, user_ids=None, **options):
+        with transaction.atomic():
+            feed.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS('Ленты подписок перестроены.'))
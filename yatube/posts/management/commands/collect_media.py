@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов, на которые не осталось ссылок. '
+        'Нужна, если задачи удаления были потеряны.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=None,
+            help='Не трогать файлы, использованные за столько секунд '
+                 '(по умолчанию MEDIA_GC_GRACE).')
+
+    def handle(self, *args, **options):
+        collected = Post.image.field.storage.collect(grace=options['grace'])
+        self.stdout.write(f'Удалено файлов: {len(collected)}')
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+from ._transfer import (
+    FORMATS, Progress, RowWriter, detect_format, open_output
+)
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты в JSONL или CSV потоково.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл назначения, по умолчанию stdout.')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, path, format, batch_size, **options):
+        fmt = detect_format(path, format)
+        rows = Post.objects.order_by('pk').values_list(
+            'text', 'pub_date', 'author__username', 'group__slug', 'image')
+        progress = Progress(self.stderr)
+        stream = open_output(path)
+        try:
+            writer = RowWriter(stream, fmt)
+            written = 0
+            for text, pub_date, author, group, image in rows.iterator(
+                    chunk_size=batch_size):
+                writer.write({
+                    'text': text,
+                    'pub_date': pub_date.isoformat(),
+                    'author': author,
+                    'group': group or '',
+                    'image': image or '',
+                })
+                written += 1
+                if written == batch_size:
+                    progress.advance(written)
+                    written = 0
+            progress.advance(written)
+        finally:
+            if path != '-':
+                stream.close()
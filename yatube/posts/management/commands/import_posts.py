@@ -0,0 +1,143 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+
+from posts import counters, feed, listing_cache, search
+from posts.models import Group, Post, User
+
+from ._transfer import (
+    FORMATS, Progress, batched, detect_format, open_input, read_rows
+)
+
+
+# Строк в одном UPDATE с датами: параметров меньше предела SQLite (999).
+DATES_CHUNK_SIZE = 300
+
+
+def restore_pub_dates(posts, dates):
+    """auto_now_add в bulk_create ставит текущее время; даты из файла
+    возвращаются пачками UPDATE ... CASE, не меняя поле модели."""
+    for post, pub_date in zip(posts, dates):
+        post.pub_date = pub_date
+    for start in range(0, len(posts), DATES_CHUNK_SIZE):
+        chunk = posts[start:start + DATES_CHUNK_SIZE]
+        Post.objects.filter(pk__in=[post.pk for post in chunk]).update(
+            pub_date=Case(
+                *(When(pk=post.pk, then=Value(post.pub_date))
+                  for post in chunk),
+                output_field=DateTimeField()))
+
+
+class LookupCache:
+    """Кеш id по естественному ключу; промахи пачки добираются
+    одним запросом."""
+
+    def __init__(self, queryset, key):
+        self.queryset = queryset
+        self.key = key
+        self.ids = {}
+
+    def load(self, keys):
+        missing = {key for key in keys if key and key not in self.ids}
+        if missing:
+            self.ids.update(self.queryset.filter(
+                **{f'{self.key}__in': missing}
+            ).values_list(self.key, 'pk'))
+
+    def get(self, key):
+        return self.ids.get(key)
+
+
+class Command(BaseCommand):
+    help = 'Загружает посты из JSONL или CSV пачками через bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл с постами, по умолчанию stdin.')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, path, format, batch_size, **options):
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        fmt = detect_format(path, format)
+        self.authors = LookupCache(User.objects.all(), 'username')
+        self.groups = LookupCache(Group.objects.all(), 'slug')
+        self.skipped = 0
+        author_ids = set()
+        progress = Progress(self.stderr)
+        stream = open_input(path)
+        try:
+            for rows in batched(read_rows(stream, fmt), batch_size):
+                posts = self.import_batch(rows)
+                author_ids.update(post.author_id for post in posts)
+                progress.advance(len(posts))
+        finally:
+            if path != '-':
+                stream.close()
+            # Пачки до ошибки в файле уже зафиксированы: статистика
+            # авторов и ленты обновляются и при обрыве импорта.
+            self.finish(author_ids, batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено постов: {progress.done}, '
+            f'пропущено: {self.skipped}, '
+            f'{progress.rate:.0f} пост/с.'))
+
+    def finish(self, author_ids, batch_size):
+        for user_ids in batched(sorted(author_ids), batch_size):
+            counters.recount_users(user_ids)
+        if author_ids:
+            listing_cache.bump_generation()
+
+    def build_post(self, row):
+        author_id = self.authors.get(row.get('author'))
+        group_slug = row.get('group') or None
+        group_id = self.groups.get(group_slug) if group_slug else None
+        if author_id is None or (group_slug and group_id is None):
+            self.skipped += 1
+            return None
+        pub_date = parse_datetime(row.get('pub_date') or '')
+        if pub_date is None:
+            pub_date = timezone.now()
+        elif timezone.is_naive(pub_date):
+            pub_date = timezone.make_aware(pub_date)
+        return Post(
+            text=row['text'],
+            pub_date=pub_date,
+            author_id=author_id,
+            group_id=group_id,
+            image=row.get('image') or '',
+        )
+
+    def import_batch(self, rows):
+        self.authors.load(row.get('author') for row in rows)
+        self.groups.load(row.get('group') for row in rows)
+        posts = [post for post in map(self.build_post, rows) if post]
+        if not posts:
+            return []
+        dates = [post.pub_date for post in posts]
+        with transaction.atomic():
+            if connection.features.can_return_ids_from_bulk_insert:
+                Post.objects.bulk_create(posts)
+            else:
+                # Без RETURNING (SQLite) id новых строк берём после
+                # вставки: первый INSERT держит блокировку записи базы
+                # до конца транзакции, а AUTOINCREMENT только растёт,
+                # поэтому последние len(posts) id — строки этой пачки,
+                # а не чужие, вставленные параллельно.
+                Post.objects.bulk_create(posts)
+                ids = Post.objects.order_by('-pk').values_list(
+                    'pk', flat=True)[:len(posts)]
+                for post, pk in zip(posts, reversed(ids)):
+                    post.pk = pk
+            restore_pub_dates(posts, dates)
+            # bulk_create не шлёт post_save: ссылки на картинки
+            # считаются здесь, иначе collect_media удалит файлы.
+            Post.image.field.storage.retain_many(
+                post.image.name for post in posts)
+            feed.fan_out_posts(posts)
+            search.get_backend().index_many(posts)
+        return posts
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import uploads
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет брошенные загрузки частями, не менявшиеся '
+        'POSTS_UPLOAD_EXPIRE секунд.'
+    )
+
+    def handle(self, *args, **options):
+        purged = uploads.purge()
+        self.stdout.write(f'Удалено загрузок: {purged}')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import digests
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассылает подписчикам дайджесты новых постов. Прерванный '
+        'прогон продолжается с контрольной точки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=digests.DIGEST_BATCH_SIZE,
+            help='Сколько связей Follow обрабатывать за раз.')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать новый прогон, не продолжая незавершённый.')
+
+    def handle(self, *args, **options):
+        run = digests.send_digests(
+            batch_size=options['batch_size'], restart=options['restart'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Отправлено писем: {run.sent} (посты до {run.cutoff}).'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import tasks, thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заранее создаёт миниатюры всех размеров из шаблонов и '
+        'недостающие варианты для srcset.'
+    )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').order_by().only(
+            'image', 'image_variants')
+        count = 0
+        for post in posts.iterator():
+            thumbnails.warm(post.image)
+            if not post.image_variants:
+                tasks.make_image_variants(post.image.name)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры созданы для {count} изображений.'))
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:58
+
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_image_references(apps, schema_editor):
+    # Картинки со старыми именами тоже учитываются: после правки или
+    # удаления поста их уберёт сборщик.
+    Post = apps.get_model('posts', 'Post')
+    StoredFile = apps.get_model('core', 'StoredFile')
+    rows = Post.objects.exclude(image='').order_by().values(
+        'image').annotate(total=Count('pk'))
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=row['image'], references=row['total'])
+         for row in rows.iterator()],
+        batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_storedfile'),
+        ('posts', '0011_digests'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(
+            count_image_references, migrations.RunPython.noop),
+    ]
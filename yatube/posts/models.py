@@ -1,7 +1,11 @@
+import uuid
+
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models import UniqueConstraint
 
+from core.storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -14,6 +18,22 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Посты для лент: автор и группа одним запросом,
+        без неиспользуемых колонок."""
+        return self.select_related('author', 'group').defer(
+            'author__password',
+            'author__last_login',
+            'author__is_superuser',
+            'author__is_staff',
+            'author__is_active',
+            'author__email',
+            'author__date_joined',
+            'group__description',
+        ).order_by(*self.model._meta.ordering)
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
@@ -31,12 +51,25 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    # Готовые варианты для srcset (posts.variants), например
+    # «480.jpg 960.jpg».
+    image_variants = models.CharField(
+        max_length=255, blank=True, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         default_related_name = 'posts'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id']),
+            models.Index(fields=['author', '-pub_date']),
+            models.Index(fields=['group', '-pub_date']),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -59,6 +92,7 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created"]
+        indexes = [models.Index(fields=['post', '-created'])]
 
     def __str__(self):
         return self.text
@@ -77,3 +111,86 @@ class Follow(models.Model):
     class Meta:
         constraints = [
             UniqueConstraint(fields=['user', 'author'], name='unique_follow')]
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats')
+    posts_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'Статистика {self.user}'
+
+
+class FeedEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date', '-post_id')
+        indexes = [models.Index(fields=['user', '-pub_date'])]
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'post'], name='unique_feed_entry')]
+
+
+class DigestState(models.Model):
+    """До какого момента подписчику уже отправлены новые посты."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='digest_state')
+    sent_until = models.DateTimeField()
+
+
+class DigestRun(models.Model):
+    """Контрольная точка рассылки дайджестов.
+
+    Незавершённый прогон продолжается с пользователя после
+    last_user_id с тем же cutoff.
+    """
+    started = models.DateTimeField(auto_now_add=True)
+    cutoff = models.DateTimeField()
+    last_user_id = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Дайджест до {self.cutoff:%Y-%m-%d %H:%M}'
+
+
+class Upload(models.Model):
+    """Картинка, загружаемая частями (posts.uploads); offset — сколько
+    байт уже принято."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveIntegerField()
+    offset = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
+
+    @property
+    def complete(self):
+        return self.offset == self.size
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.size})'
@@ -0,0 +1,146 @@
+"""Курсорная (keyset) пагинация.
+
+Страница выбирается условием по ключу сортировки вместо OFFSET, поэтому
+N-я страница стоит столько же, сколько первая, а COUNT(*) не выполняется.
+"""
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+COUNT_CACHE_TIMEOUT = 60 * 5
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of %s objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Пагинатор по ключу (поля сортировки модели + pk).
+
+    Все поля сортировки должны идти в одном направлении, как в
+    Post.Meta.ordering. Для однозначности к ним добавляется pk.
+    """
+    is_cursor = True
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.per_page = per_page
+        model = queryset.model
+        ordering = list(
+            ordering
+            or queryset.query.order_by
+            or model._meta.ordering
+        )
+        self.descending = ordering[0].startswith('-')
+        names = [name.lstrip('-') for name in ordering]
+        if 'pk' not in names and model._meta.pk.name not in names:
+            names.append('pk')
+        self.fields = [
+            model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            for name in names
+        ]
+        self.queryset = queryset.order_by(*(
+            ('-' if self.descending else '') + field.attname
+            for field in self.fields
+        ))
+
+    @property
+    def count(self):
+        """Приблизительное число объектов, кешируется на несколько минут."""
+        query = str(self.queryset.query).encode()
+        key = 'cursor_count:' + hashlib.md5(query).hexdigest()
+        return cache.get_or_set(
+            key, self.queryset.count, COUNT_CACHE_TIMEOUT)
+
+    def encode_cursor(self, obj, backwards=False):
+        values = [
+            field.value_to_string(obj) for field in self.fields
+        ]
+        raw = json.dumps([backwards, values]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """(backwards, значения ключа) или None, если курсор испорчен:
+        тогда отдаётся первая страница."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            backwards, values = json.loads(raw.decode())
+        except (TypeError, ValueError):
+            return None
+        if (not isinstance(backwards, bool)
+                or not isinstance(values, list)
+                or len(values) != len(self.fields)
+                or not all(isinstance(value, str) for value in values)):
+            return None
+        try:
+            values = [
+                field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            return None
+        if any(value is None for value in values):
+            return None
+        return backwards, values
+
+    def _after(self, values, backwards):
+        """Условие «строго после ключа» в направлении обхода."""
+        lookup = 'lt' if self.descending != backwards else 'gt'
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            step = Q(**{f'{field.attname}__{lookup}': values[i]})
+            for prev_field, prev_value in zip(self.fields[:i], values):
+                step &= Q(**{prev_field.attname: prev_value})
+            condition |= step
+        return condition
+
+    def get_page(self, cursor=None):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        queryset = self.queryset
+        backwards = False
+        if decoded is not None:
+            backwards, values = decoded
+            queryset = queryset.filter(self._after(values, backwards))
+            if backwards:
+                queryset = queryset.reverse()
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        has_next = has_more if not backwards else True
+        has_previous = decoded is not None if not backwards else has_more
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1])
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], backwards=True)
+        return CursorPage(rows, self, next_cursor, previous_cursor)
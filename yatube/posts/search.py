@@ -0,0 +1,186 @@
+"""Полнотекстовый поиск по постам.
+
+Бэкенд выбирается настройкой POSTS_SEARCH_BACKEND. По умолчанию
+используется индекс SQLite FTS5 (таблица создаётся миграцией), для
+остальных баз есть простой бэкенд на LIKE.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+INDEX_BATCH_SIZE = 1000
+FTS_TABLE = 'posts_post_fts'
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchResults:
+    """Ленивый результат поиска для Paginator: count() и срезы
+    выполняют отдельные запросы к индексу, посты подгружаются
+    только для текущей страницы."""
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+
+    @cached_property
+    def _count(self):
+        return self.backend.count(self.query)
+
+    def count(self):
+        return self._count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        ids = self.backend.ranked_ids(
+            self.query, start, index.stop - start)
+        posts = Post.objects.for_listing().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+class BaseSearchBackend:
+    def index(self, post):
+        raise NotImplementedError
+
+    def remove(self, post_id):
+        raise NotImplementedError
+
+    def index_many(self, posts):
+        for post in posts:
+            self.index(post)
+
+    def reindex(self, posts):
+        raise NotImplementedError
+
+    def count(self, query):
+        raise NotImplementedError
+
+    def ranked_ids(self, query, offset, limit):
+        raise NotImplementedError
+
+    def search(self, query):
+        return SearchResults(self, query)
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Поиск без индекса: LIKE по тексту, новые посты первыми."""
+
+    def _queryset(self, query):
+        return Post.objects.filter(text__icontains=query).order_by(
+            '-pub_date', '-pk')
+
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def reindex(self, posts):
+        pass
+
+    def count(self, query):
+        return self._queryset(query).count()
+
+    def ranked_ids(self, query, offset, limit):
+        return list(self._queryset(query).values_list(
+            'pk', flat=True)[offset:offset + limit])
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Инвертированный индекс SQLite FTS5, ранжирование по bm25."""
+
+    @staticmethod
+    def match_expression(query):
+        # Каждое слово берётся в кавычки, чтобы пользовательский ввод
+        # не интерпретировался как синтаксис FTS; последнее — префикс.
+        words = WORD_RE.findall(query)
+        terms = ['"%s"' % word for word in words]
+        if terms:
+            terms[-1] += '*'
+        return ' '.join(terms)
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text])
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+    def index_many(self, posts):
+        with connection.cursor() as cursor:
+            self._insert(cursor, [(post.pk, post.text) for post in posts])
+
+    def reindex(self, posts):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            batch = []
+            for row in posts:
+                batch.append(row)
+                if len(batch) >= INDEX_BATCH_SIZE:
+                    self._insert(cursor, batch)
+                    batch = []
+            if batch:
+                self._insert(cursor, batch)
+
+    @staticmethod
+    def _insert(cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)', rows)
+
+    def count(self, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s', [expression])
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, offset, limit):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [expression, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+
+def get_backend():
+    return import_string(settings.POSTS_SEARCH_BACKEND)()
+
+
+def index_post(post):
+    get_backend().index(post)
+
+
+def remove_post(post_id):
+    get_backend().remove(post_id)
+
+
+def reindex_all():
+    posts = Post.objects.order_by().values_list('pk', 'text')
+    get_backend().reindex(posts.iterator())
+
+
+def search(query):
+    return get_backend().search(query)
@@ -0,0 +1,187 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, listing_cache, tasks, versions
+from .models import Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        tasks.fan_out_post.delay(
+            instance.pk, key=f'fan_out_post:{instance.pk}')
+    else:
+        tasks.sync_feed_post.delay(
+            instance.pk, key=f'sync_feed_post:{instance.pk}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tasks.sync_follow.delay(
+            instance.user_id, instance.author_id,
+            key=f'sync_follow:{instance.user_id}:{instance.author_id}')
+
+
+@receiver(post_save, sender=Post)
+def count_post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_post_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.author_id, 'comments_count', 1)
+        if instance.post_id:
+            counters.change_post_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'comments_count', -1)
+    if instance.post_id:
+        counters.change_post_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_follow_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tasks.sync_search.delay(
+            instance.pk, key=f'sync_search:{instance.pk}')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_listings(sender, **kwargs):
+    listing_cache.bump_generation()
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, raw=False, **kwargs):
+    # Группа могла смениться при редактировании: старую тоже помечаем.
+    # Картинка тоже: на старую становится одной ссылкой меньше.
+    instance._previous_group_id = None
+    instance._previous_image = ''
+    if instance.pk and not raw:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image').first()
+        if previous:
+            instance._previous_group_id, instance._previous_image = previous
+
+
+def _release_image(name):
+    if not name:
+        return
+    Post.image.field.storage.release(name)
+    # Пока файл не удалён, его может подхватить такая же загрузка.
+    tasks.collect_image.delay(
+        name, key=f'collect_image:{name}',
+        countdown=settings.MEDIA_GC_GRACE)
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_image', '')
+    current = instance.image.name or ''
+    if current != previous:
+        if instance.image_variants:
+            # Варианты прежней картинки.
+            instance.image_variants = ''
+            Post.objects.filter(pk=instance.pk).update(image_variants='')
+        if current:
+            Post.image.field.storage.retain(current)
+            tasks.make_image_variants.delay(
+                current, key=f'make_image_variants:{current}')
+        _release_image(previous)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_image(sender, instance, **kwargs):
+    _release_image(instance.image.name)
+
+
+def _touch_groups(*group_ids, feeds=False):
+    slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk]).values_list('slug', flat=True)
+    for slug in slugs:
+        versions.touch('group', slug)
+        if feeds:
+            versions.touch('feed', f'group:{slug}')
+
+
+def _touch_profile(user_id, feeds=False):
+    username = User.objects.filter(pk=user_id).values_list(
+        'username', flat=True).first()
+    if username:
+        versions.touch('profile', username)
+        if feeds:
+            versions.touch('feed', f'author:{username}')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def touch_post_pages(sender, instance, **kwargs):
+    versions.touch('post', instance.pk)
+    # Число постов автора на страницах его других постов.
+    versions.touch('author', instance.author_id)
+    versions.remember_author(instance)
+    versions.touch('feed', 'index')
+    _touch_groups(
+        instance.group_id, getattr(instance, '_previous_group_id', None),
+        feeds=True)
+    _touch_profile(instance.author_id, feeds=True)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_comment_post(sender, instance, **kwargs):
+    # Число комментариев видно и в лентах группы и профиля.
+    post = Post.objects.filter(pk=instance.post_id).values_list(
+        'group_id', 'author_id').first()
+    if post:
+        versions.touch('post', instance.post_id)
+        _touch_groups(post[0])
+        _touch_profile(post[1])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def touch_group(sender, instance, **kwargs):
+    versions.touch('group', instance.slug)
+    versions.touch('feed', f'group:{instance.slug}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def touch_followed_profile(sender, instance, **kwargs):
+    _touch_profile(instance.author_id)
@@ -0,0 +1,101 @@
+"""Фоновые задачи постов: лента подписок, поисковый индекс, варианты
+картинок для srcset, миниатюры, удаление картинок без ссылок.
+
+Задачи сверяются с текущим состоянием базы, поэтому повтор или
+задача, поставленная после удаления поста, ничего не портят.
+"""
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.helpers import get_module_class
+from sorl.thumbnail.images import ImageFile
+
+from core.taskqueue import task
+
+from . import digests, feed, listing_cache, search, signals, variants
+from .models import Follow, Post
+
+
+@task()
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        feed.fan_out_post(post)
+        # Сигнал поста сменил поколение до записи лент: фрагмент
+        # ленты подписок, закешированный в этом промежутке, устарел.
+        listing_cache.bump_generation()
+
+
+@task()
+def sync_feed_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        feed.sync_post(post)
+        listing_cache.bump_generation()
+
+
+@task()
+def sync_follow(user_id, author_id):
+    """Добавляет посты автора в ленту подписчика или убирает их."""
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        feed.add_author(user_id, author_id)
+    else:
+        feed.remove_author(user_id, author_id)
+    listing_cache.bump_generation()
+
+
+@task()
+def sync_search(post_id):
+    post = Post.objects.filter(pk=post_id).only('pk', 'text').first()
+    if post is None:
+        search.remove_post(post_id)
+    else:
+        search.index_post(post)
+
+
+@task(max_attempts=5, retry_delay=60)
+def send_digests():
+    """Повтор продолжает прогон с контрольной точки."""
+    digests.send_digests()
+
+
+@task()
+def collect_image(name):
+    """Удаляет картинку и её миниатюры, если на неё не осталось ссылок."""
+    storage = Post.image.field.storage
+    for collected in storage.collect(names=[name]):
+        default.kvstore.delete(ImageFile(collected, storage))
+        variants.delete(collected)
+
+
+def _refresh_pages(posts):
+    for post in posts:
+        signals.touch_post_pages(Post, post)
+    signals.invalidate_listings(Post)
+
+
+@task()
+def make_thumbnail(name, storage, geometry, options):
+    """Миниатюра sorl-thumbnail; storage — путь к классу хранилища."""
+    source = ImageFile(name, get_module_class(storage)())
+    ThumbnailBackend().get_thumbnail(source, geometry, **options)
+    posts = list(Post.objects.filter(image=name).only(
+        'pk', 'author', 'group'))
+    # Страницы этих постов закешированы с исходной картинкой.
+    if posts:
+        _refresh_pages(posts)
+
+
+@task()
+def make_image_variants(name):
+    """Создаёт варианты картинки и записывает их постам с ней."""
+    posts = list(Post.objects.filter(image=name).exclude(
+        image_variants__gt='').only('pk', 'author', 'group'))
+    if not posts:
+        return
+    tokens = variants.generate(name, Post.image.field.storage)
+    if not tokens:
+        return
+    Post.objects.filter(
+        pk__in=[post.pk for post in posts]).update(image_variants=tokens)
+    # Страницы этих постов закешированы без srcset.
+    _refresh_pages(posts)
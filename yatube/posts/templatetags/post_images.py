@@ -0,0 +1,35 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from posts import variants
+
+register = template.Library()
+
+# Ширина картинки в вёрстке: колонка col-md-9 контейнера Bootstrap.
+DEFAULT_SIZES = '(min-width: 1200px) 825px, (min-width: 768px) 75vw, 100vw'
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post, sizes=DEFAULT_SIZES, css_class='card-img my-2'):
+    """Картинка поста: <picture> со srcset по готовым вариантам, пока
+    их нет — миниатюра sorl."""
+    sources = {}
+    for width, extension, token in variants.parse(post.image_variants):
+        url = default_storage.url(
+            variants.variant_name(post.image.name, token))
+        sources.setdefault(extension, []).append((width, url))
+    context = {'post': post, 'sizes': sizes, 'css_class': css_class}
+    if not sources:
+        return context
+    # WebP — дополнительный <source>, в <img> исходный формат.
+    base = next(extension for extension in sources if extension != 'webp')
+    context['sources'] = [
+        (variants.MIME_TYPES[extension], _srcset(urls))
+        for extension, urls in sources.items() if extension != base]
+    context['srcset'] = _srcset(sources[base])
+    context['src'] = max(sources[base])[1]
+    return context
+
+
+def _srcset(urls):
+    return ', '.join(f'{url} {width}w' for width, url in sorted(urls))
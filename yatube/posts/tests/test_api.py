@@ -0,0 +1,240 @@
+import json
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.test_queries import QueryBudgetMixin
+from posts.tests.utils import TempMediaMixin, make_upload
+
+POSTS_COUNT = 25
+
+
+def read(response):
+    return json.loads(b''.join(response.streaming_content))
+
+
+class ApiReadTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for i in range(POSTS_COUNT):
+            Post.objects.create(
+                author=cls.author, text=f'Пост {i}',
+                group=None if i % 2 else cls.group)
+        cls.post = Post.objects.latest('pub_date', 'id')
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_post_list_walks_all_pages_by_cursor(self):
+        url = reverse('api:post_list')
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertTrue(response.streaming)
+            data = read(response)
+            seen.extend(post['id'] for post in data['results'])
+            url = data['next']
+        self.assertEqual(
+            seen, list(Post.objects.values_list('id', flat=True).order_by(
+                '-pub_date', '-id')))
+
+    def test_post_fields(self):
+        data = read(self.client.get(reverse('api:post_list')))
+        first = data['results'][0]
+        self.assertEqual(first['id'], self.post.pk)
+        self.assertEqual(first['author'], 'author')
+        self.assertEqual(first['group'], 'group')
+        self.assertEqual(first['comments_count'], 1)
+        self.assertIsNone(first['image'])
+
+    def test_sparse_fieldset_limits_columns(self):
+        url = reverse('api:post_list') + '?fields=id,text'
+        with CaptureQueriesContext(connection) as queries:
+            data = read(self.client.get(url))
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+        self.assertNotIn('"comments_count"', queries[0]['sql'])
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse('api:post_list') + '?fields=foo')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('fields', response.json()['errors'])
+
+    def test_filters(self):
+        data = read(self.client.get(
+            reverse('api:post_list') + '?group=group&limit=100'))
+        self.assertEqual(len(data['results']), (POSTS_COUNT + 1) // 2)
+        data = read(self.client.get(
+            reverse('api:post_list') + '?author=reader'))
+        self.assertEqual(data['results'], [])
+
+    def test_query_budgets(self):
+        budgets = {
+            reverse('api:post_list'): 1,
+            reverse('api:post_detail', args=[self.post.pk]): 1,
+            reverse('api:comment_list', args=[self.post.pk]): 2,
+            reverse('api:group_list'): 1,
+            reverse('api:group_detail', args=[self.group.slug]): 1,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                self.assertQueriesAtMost(budget, url)
+        self.client = self.reader_client
+        for url, budget in {
+            reverse('api:feed'): 4,
+            reverse('api:follow_list'): 3,
+        }.items():
+            with self.subTest(url=url):
+                self.assertQueriesAtMost(budget, url)
+
+    def test_feed(self):
+        data = read(self.reader_client.get(
+            reverse('api:feed') + '?limit=5'))
+        self.assertEqual(
+            [post['id'] for post in data['results']],
+            list(self.author.posts.values_list('id', flat=True).order_by(
+                '-pub_date', '-id')[:5]))
+        self.assertIsNotNone(data['next'])
+
+    def test_detail_and_errors(self):
+        response = self.client.get(
+            reverse('api:post_detail', args=[self.post.pk]))
+        self.assertEqual(response.json()['text'], self.post.text)
+        response = self.client.get(reverse('api:post_detail', args=[0]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        response = self.client.get(reverse('api:feed'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        response = self.client.put(reverse('api:group_list'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+    def test_post_detail_not_modified(self):
+        url = reverse('api:post_detail', args=[self.post.pk])
+        response = self.client.get(url)
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+
+class ApiWriteTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.other = User.objects.create_user(username='other')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='-')
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def send(self, method, url, data):
+        return getattr(self.client, method)(
+            url, json.dumps(data), content_type='application/json')
+
+    def test_create_post_json(self):
+        response = self.send('post', reverse('api:post_list'), {
+            'text': 'Новый пост', 'group': 'group'})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        post = Post.objects.get()
+        self.assertEqual(response['Location'], reverse(
+            'api:post_detail', args=[post.pk]))
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.author, self.author)
+
+    def test_create_post_multipart_with_image(self):
+        image = make_upload('api.gif', fmt='GIF')
+        response = self.client.post(reverse('api:post_list'), {
+            'text': 'С картинкой', 'image': image})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertRegex(
+            response.json()['image'],
+            r'/media/posts/\w\w/\w\w/[0-9a-f]{64}\.jpg$')
+
+    def test_create_post_validation(self):
+        response = self.send('post', reverse('api:post_list'), {
+            'text': '', 'group': 'missing'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(
+            set(response.json()['errors']), {'text', 'group'})
+        self.assertFalse(Post.objects.exists())
+
+    def test_anonymous_cannot_write(self):
+        response = Client().post(reverse('api:post_list'), {'text': 'x'})
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_patch_keeps_other_fields(self):
+        post = Post.objects.create(
+            author=self.author, text='Было', group=self.group)
+        url = reverse('api:post_detail', args=[post.pk])
+        response = self.send('patch', url, {'text': 'Стало'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Стало')
+        self.assertEqual(post.group, self.group)
+        response = self.send('put', url, {'text': 'Без группы'})
+        post.refresh_from_db()
+        self.assertIsNone(post.group)
+
+    def test_only_author_changes_post(self):
+        post = Post.objects.create(author=self.other, text='Чужой')
+        url = reverse('api:post_detail', args=[post.pk])
+        response = self.send('patch', url, {'text': 'Мой'})
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.assertTrue(Post.objects.filter(pk=post.pk).exists())
+
+    def test_delete_post(self):
+        post = Post.objects.create(author=self.author, text='Удалить')
+        response = self.client.delete(
+            reverse('api:post_detail', args=[post.pk]))
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Post.objects.exists())
+
+    def test_comments(self):
+        post = Post.objects.create(author=self.other, text='Пост')
+        url = reverse('api:comment_list', args=[post.pk])
+        response = self.send('post', url, {'text': ''})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        response = self.send('post', url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertEqual(response.json()['author'], 'author')
+        data = read(self.client.get(url))
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Комментарий'])
+        self.assertEqual(
+            self.client.get(reverse('api:comment_list', args=[0])
+                            ).status_code, HTTPStatus.NOT_FOUND)
+
+    def test_follows(self):
+        url = reverse('api:follow_list')
+        response = self.send('post', url, {'author': 'author'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        response = self.send('post', url, {'author': 'other'})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        response = self.send('post', url, {'author': 'other'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        data = read(self.client.get(url))
+        self.assertEqual(
+            [follow['author'] for follow in data['results']], ['other'])
+        response = self.client.delete(
+            reverse('api:follow_detail', args=['other']))
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Follow.objects.exists())
@@ -0,0 +1,82 @@
+import json
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Post, User
+from posts.tests.test_queries import QueryBudgetMixin
+from posts.views import NUM_OF_SHOWED_COMMENTS
+
+COMMENTS_COUNT = NUM_OF_SHOWED_COMMENTS + 5
+
+
+class CommentPaginationTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        authors = [
+            User.objects.create_user(username=f'user{i}') for i in range(5)]
+        cls.post = Post.objects.create(author=authors[0], text='Пост')
+        now = timezone.now()
+        comments = Comment.objects.bulk_create([
+            Comment(post=cls.post, author=authors[i % 5],
+                    text=f'Комментарий {i}')
+            for i in range(COMMENTS_COUNT)
+        ])
+        # Разное время, чтобы порядок был однозначным.
+        for i, comment in enumerate(comments):
+            Comment.objects.filter(pk=comment.pk).update(
+                created=now + timedelta(seconds=i))
+        cls.detail_url = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.list_url = reverse('posts:comment_list', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def texts(self, page):
+        return [comment.text for comment in page]
+
+    def test_post_detail_shows_first_page(self):
+        response = self.client.get(self.detail_url)
+        comments = response.context['comments']
+        self.assertEqual(
+            self.texts(comments),
+            [f'Комментарий {i}' for i in range(
+                COMMENTS_COUNT - 1,
+                COMMENTS_COUNT - NUM_OF_SHOWED_COMMENTS - 1, -1)])
+        self.assertContains(response, 'data-load-comments')
+
+    def test_load_more_fragment(self):
+        first = self.client.get(self.detail_url).context['comments']
+        response = self.client.get(
+            self.list_url, {'cursor': first.next_cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            self.texts(response.context['comments']),
+            [f'Комментарий {i}' for i in range(4, -1, -1)])
+        self.assertNotContains(response, 'data-load-comments')
+
+    def test_load_more_json(self):
+        response = self.client.get(self.list_url, {'format': 'json'})
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['results'][0]['text'], 'Комментарий 24')
+        self.assertIn('format=json', data['next'])
+        response = self.client.get(
+            reverse('posts:comment_list', args=[0]), {'format': 'json'})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_query_budgets(self):
+        """Авторы комментариев загружаются вместе с ними."""
+        self.assertQueriesAtMost(3, self.detail_url)
+        self.assertQueriesAtMost(1, self.list_url)
+
+    def test_fragment_not_modified(self):
+        response = self.client.get(self.list_url)
+        response = self.client.get(
+            self.list_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
@@ -0,0 +1,143 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from posts import versions
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='-')
+        self.post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group)
+        self.client = Client()
+        self.urls = {
+            'post': reverse('posts:post_detail', args=[self.post.pk]),
+            'group': reverse('posts:group_list', args=[self.group.slug]),
+            'profile': reverse('posts:profile', args=[self.author.username]),
+        }
+
+    def revalidate(self, url, response):
+        headers = {'HTTP_IF_NONE_MATCH': response['ETag']}
+        if response.has_header('Last-Modified'):
+            headers['HTTP_IF_MODIFIED_SINCE'] = response['Last-Modified']
+        return self.client.get(url, **headers)
+
+    def clock(self, now):
+        """Часы versions, показывающие now."""
+        clock = mock.Mock()
+        clock.time.return_value = now
+        return mock.patch.object(versions, 'time', clock), clock
+
+    def test_unchanged_pages_return_304(self):
+        """Неизменённые страницы отдают 304 по ETag."""
+        patcher, _ = self.clock(time.time() + 2)
+        with patcher:
+            for name, url in self.urls.items():
+                with self.subTest(page=name):
+                    response = self.client.get(url)
+                    self.assertIn('ETag', response)
+                    self.assertIn('Last-Modified', response)
+                    response = self.revalidate(url, response)
+                    self.assertEqual(
+                        response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_changes_invalidate_pages(self):
+        """Изменения связанных объектов меняют ETag страницы."""
+        changes = {
+            'post': lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'),
+            'group': lambda: Post.objects.create(
+                author=self.reader, text='Ещё пост', group=self.group),
+            'profile': lambda: Follow.objects.create(
+                user=self.reader, author=self.author),
+        }
+        for name, change in changes.items():
+            with self.subTest(page=name):
+                url = self.urls[name]
+                response = self.client.get(url)
+                change()
+                response = self.revalidate(url, response)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_moving_post_invalidates_old_group(self):
+        """Перенос поста в другую группу меняет страницу старой."""
+        url = self.urls['group']
+        response = self.client.get(url)
+        self.post.group = Group.objects.create(
+            title='Другая', slug='other', description='-')
+        self.post.save()
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_depends_on_user(self):
+        """У разных пользователей разные ETag."""
+        url = self.urls['profile']
+        anonymous = self.client.get(url)
+        self.client.force_login(self.reader)
+        response = self.revalidate(url, anonymous)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_author_post_invalidates_older_post(self):
+        """Новый пост автора меняет число постов на странице старого."""
+        url = self.urls['post']
+        response = self.client.get(url)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.context['post_count'], 2)
+
+    def test_missing_objects_leave_expiring_keys(self):
+        """Запросы к несуществующим страницам не создают вечных ключей."""
+        pages = {
+            'profile': reverse('posts:profile', args=['nobody']),
+            'group': reverse('posts:group_list', args=['nothing']),
+        }
+        for kind, url in pages.items():
+            with self.subTest(page=kind):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                key = cache.make_key(versions.VERSION_KEY.format(
+                    kind, url.rstrip('/').rsplit('/', 1)[-1]))
+                self.assertIsNotNone(cache._expire_info[key])
+
+    def test_change_in_same_second(self):
+        """Изменение в ту же секунду не получает 304 по дате."""
+        url = self.urls['profile']
+        patcher, clock = self.clock(1000.2)
+        with patcher:
+            versions.touch('profile', self.author.username)
+            clock.time.return_value = 1000.5
+            response = self.client.get(url)
+            self.assertFalse(response.has_header('Last-Modified'))
+            clock.time.return_value = 1001.5
+            response = self.client.get(url)
+            self.assertEqual(response['Last-Modified'], http_date(1001))
+            clock.time.return_value = 1001.6
+            Follow.objects.create(user=self.reader, author=self.author)
+            clock.time.return_value = 1001.8
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=http_date(1001))
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_last_modified_not_shared_between_users(self):
+        """Дата ответа анониму не даёт 304 вошедшему пользователю."""
+        url = self.urls['profile']
+        patcher, _ = self.clock(time.time() + 2)
+        with patcher:
+            anonymous = self.client.get(url)
+            self.client.force_login(self.reader)
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=anonymous['Last-Modified'])
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertFalse(response.has_header('Last-Modified'))
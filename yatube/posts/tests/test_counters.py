@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, User, UserStats
+
+
+class CountersTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_count(self):
+        """Счётчик постов меняется при создании и удалении поста."""
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_comment_counts(self):
+        """Комментарий увеличивает счётчики поста и его автора."""
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            data={'text': 'Комментарий'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.stats(self.reader).comments_count, 1)
+        Comment.objects.get().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.stats(self.reader).comments_count, 0)
+
+    def test_follower_count(self):
+        """Подписка и отписка меняют счётчик подписчиков."""
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_counters_in_context(self):
+        """Страницы профиля и поста берут счётчики из статистики."""
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username]))
+        self.assertEqual(response.context['stats'].posts_count, 1)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        self.assertEqual(response.context['post_count'], 1)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет рассинхронизацию счётчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.filter(user=self.author).update(
+            posts_count=10, followers_count=0)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('recount', stdout=StringIO())
+        stats = self.stats(self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_user_delete(self):
+        """Удаление пользователя не ломается на счётчиках."""
+        self.author.delete()
+        self.assertFalse(UserStats.objects.filter(
+            user_id=self.author.pk).exists())
@@ -0,0 +1,111 @@
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import digests
+from posts.models import DigestRun, Follow, Post, User
+
+
+class DigestTests(TestCase):
+    def setUp(self):
+        self.authors = [
+            User.objects.create_user(username=f'author{i}')
+            for i in range(3)
+        ]
+        self.readers = [
+            User.objects.create_user(
+                username=f'reader{i}', email=f'reader{i}@example.com')
+            for i in range(4)
+        ]
+        for reader in self.readers:
+            for author in self.authors:
+                Follow.objects.create(user=reader, author=author)
+        self.posts = [
+            Post.objects.create(author=author, text=f'Пост {author}')
+            for author in self.authors
+        ]
+
+    def test_one_digest_per_follower(self):
+        run = digests.send_digests()
+        self.assertEqual(run.sent, len(self.readers))
+        self.assertEqual(len(mail.outbox), len(self.readers))
+        body = mail.outbox[0].body
+        for post in self.posts:
+            self.assertIn(post.text, body)
+            self.assertIn(f'/posts/{post.pk}/', body)
+        self.assertIsNotNone(run.finished_at)
+
+    def test_only_new_posts_in_next_digest(self):
+        digests.send_digests()
+        mail.outbox.clear()
+        digests.send_digests()
+        self.assertEqual(mail.outbox, [])
+        post = Post.objects.create(author=self.authors[0], text='Свежий пост')
+        digests.send_digests()
+        self.assertEqual(len(mail.outbox), len(self.readers))
+        self.assertIn(post.text, mail.outbox[0].body)
+        self.assertNotIn(self.posts[1].text, mail.outbox[0].body)
+
+    def test_follows_across_batches(self):
+        """Связи подписчика из разных пачек попадают в одно письмо."""
+        digests.send_digests(batch_size=2)
+        self.assertEqual(len(mail.outbox), len(self.readers))
+        for message in mail.outbox:
+            for post in self.posts:
+                self.assertIn(post.text, message.body)
+
+    def test_users_without_email_or_posts_are_skipped(self):
+        silent = User.objects.create_user(username='silent')
+        Follow.objects.create(user=silent, author=self.authors[0])
+        lonely = User.objects.create_user(
+            username='lonely', email='lonely@example.com')
+        Follow.objects.create(user=lonely, author=self.readers[0])
+        digests.send_digests()
+        recipients = {message.to[0] for message in mail.outbox}
+        self.assertNotIn('lonely@example.com', recipients)
+        self.assertEqual(len(recipients), len(self.readers))
+
+    def test_digest_is_capped(self):
+        for i in range(digests.DIGEST_POSTS_PER_AUTHOR + 2):
+            Post.objects.create(author=self.authors[0], text=f'Ещё {i}')
+        with mock.patch.object(digests, 'DIGEST_MAX_POSTS', 4):
+            digests.send_digests()
+        self.assertEqual(mail.outbox[0].body.count('/posts/'), 4)
+
+    def test_resumes_from_checkpoint(self):
+        """После сбоя прогон продолжается, письма не дублируются."""
+        calls = []
+
+        def flaky_send(backend, messages):
+            calls.append(len(messages))
+            if len(calls) == 2:
+                raise ConnectionError('SMTP недоступен')
+            return original(backend, messages)
+
+        original = EmailBackend.send_messages
+        with mock.patch.object(EmailBackend, 'send_messages', flaky_send):
+            with self.assertRaises(ConnectionError):
+                digests.send_digests(batch_size=3)
+        run = DigestRun.objects.get()
+        self.assertIsNone(run.finished_at)
+        self.assertGreater(run.last_user_id, 0)
+        call_command('send_digests', batch_size=3, stdout=StringIO())
+        self.assertEqual(DigestRun.objects.get().pk, run.pk)
+        recipients = [message.to[0] for message in mail.outbox]
+        self.assertEqual(
+            sorted(recipients),
+            sorted(reader.email for reader in self.readers))
+
+    def test_queries_grow_with_batches(self):
+        """Число запросов зависит от числа пачек, а не подписчиков."""
+        for i in range(20):
+            reader = User.objects.create_user(
+                username=f'more{i}', email=f'more{i}@example.com')
+            Follow.objects.create(user=reader, author=self.authors[0])
+        with self.assertNumQueries(10):
+            digests.send_digests(batch_size=100)
+        self.assertEqual(len(mail.outbox), len(self.readers) + 20)
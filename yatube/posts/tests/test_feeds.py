@@ -0,0 +1,152 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+
+from posts import versions
+from posts.models import Comment, Group, Post, User
+
+
+def later(seconds):
+    """Часы versions, опережающие настоящие на seconds: Last-Modified
+    отдаётся только после окончания секунды версии."""
+    clock = mock.Mock()
+    clock.time.return_value = time.time() + seconds
+    return mock.patch.object(versions, 'time', clock)
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.post = Post.objects.create(
+            author=self.author, text='Первый пост', group=self.group)
+        self.client = Client()
+        self.urls = {
+            'index_rss': reverse('posts:index_rss'),
+            'index_atom': reverse('posts:index_atom'),
+            'group_rss': reverse('posts:group_rss', args=['group']),
+            'group_atom': reverse('posts:group_atom', args=['group']),
+            'profile_rss': reverse('posts:profile_rss', args=['author']),
+            'profile_atom': reverse('posts:profile_atom', args=['author']),
+        }
+
+    def test_feeds_list_posts(self):
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn('Первый пост', response.content.decode())
+                kind = 'atom' if name.endswith('atom') else 'rss'
+                self.assertIn(kind, response['Content-Type'])
+
+    def test_unknown_object(self):
+        for url in (
+            reverse('posts:group_rss', args=['missing']),
+            reverse('posts:profile_atom', args=['missing']),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_not_modified_without_queries(self):
+        for name, url in self.urls.items():
+            with self.subTest(name=name), later(2):
+                response = self.client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    again = self.client.get(
+                        url,
+                        HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(again.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(len(queries), 0)
+                again = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(again.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_document_cached(self):
+        url = self.urls['group_atom']
+        first = self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(first.content, second.content)
+
+    def test_query_string_shares_document(self):
+        """Параметры адреса не создают новых записей в кеше."""
+        url = self.urls['index_rss']
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'utm_source': 'reader'})
+        self.assertEqual(len(queries), 0)
+        self.assertIn('Первый пост', response.content.decode())
+
+    def test_poller_sees_change_in_same_second(self):
+        """Опрос только с If-Modified-Since видит пост, опубликованный
+        в ту же секунду, что и прошлый ответ."""
+        url = self.urls['index_rss']
+        clock = mock.Mock()
+        with mock.patch.object(versions, 'time', clock):
+            clock.time.return_value = 1000.2
+            versions.touch('feed', 'index')
+            clock.time.return_value = 1000.5
+            response = self.client.get(url)
+            clock.time.return_value = 1000.7
+            Post.objects.create(author=self.author, text='Второй пост')
+            clock.time.return_value = 1002.5
+            headers = {}
+            if response.has_header('Last-Modified'):
+                headers['HTTP_IF_MODIFIED_SINCE'] = response['Last-Modified']
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('Второй пост', response.content.decode())
+        self.assertEqual(response['Last-Modified'], http_date(1001))
+
+    def test_post_changes_invalidate_feeds(self):
+        with later(2):
+            responses = {
+                name: self.client.get(url)
+                for name, url in self.urls.items()}
+        with later(3):
+            Post.objects.create(
+                author=self.author, text='Второй пост', group=self.group)
+        for name, url in self.urls.items():
+            with self.subTest(name=name), later(5):
+                response = self.client.get(
+                    url,
+                    HTTP_IF_MODIFIED_SINCE=responses[name]['Last-Modified'])
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn('Второй пост', response.content.decode())
+
+    def test_delete_invalidates_feed(self):
+        url = self.urls['index_rss']
+        self.client.get(url)
+        self.post.delete()
+        self.assertNotIn('Первый пост', self.client.get(url).content.decode())
+
+    def test_comment_keeps_feed_version(self):
+        response = self.client.get(self.urls['profile_rss'])
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий')
+        response = self.client.get(
+            self.urls['profile_rss'], HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_pages_link_feeds(self):
+        pages = {
+            reverse('posts:index'): self.urls['index_atom'],
+            reverse('posts:group_list', args=['group']):
+                self.urls['group_atom'],
+            reverse('posts:profile', args=['author']):
+                self.urls['profile_atom'],
+        }
+        for page, feed_url in pages.items():
+            with self.subTest(page=page):
+                self.assertContains(self.client.get(page), feed_url)
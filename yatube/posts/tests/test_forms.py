@@ -65,10 +65,10 @@ class PostCreateFormTests(TestCase):
             reverse('posts:profile', kwargs={'username': self.user.username})
         )
         self.assertEqual(Post.objects.count(), posts_cnt + 1)
-        self.assertTrue(Post.objects.filter(
-            text='Текст из формы',
-            image='posts/new.gif'
-        ).exists())
+        # Картинка перекодирована и названа по хешу содержимого.
+        post = Post.objects.get(text='Текст из формы')
+        self.assertRegex(
+            post.image.name, r'^posts/(\w\w)/(\w\w)/\1\2[0-9a-f]{60}\.jpg$')
         self.assertEqual(response.status_code, HTTPStatus.OK)
 
     def test_edit_post_form(self):
@@ -0,0 +1,150 @@
+import os
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, PngImagePlugin
+
+from posts import images
+from core.models import StoredFile
+from posts.models import Post, User
+from posts.tests.utils import TempMediaMixin, make_upload
+
+# Тег EXIF Orientation: 6 — повернуть на 90° по часовой стрелке.
+ORIENTATION = 0x0112
+
+
+class ImageProcessingTests(TempMediaMixin, TestCase):
+    def open(self, processed):
+        processed.seek(0)
+        return Image.open(BytesIO(processed.read()))
+
+    def test_exif_stripped_and_applied(self):
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        exif[0x010F] = 'Phone maker'
+        processed = images.process(make_upload(exif=exif.tobytes()))
+        image = self.open(processed)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (20, 40))
+        self.assertNotIn('exif', image.info)
+
+    @override_settings(POSTS_IMAGE_MAX_SIZE=100)
+    def test_resized_to_max_size(self):
+        processed = images.process(
+            make_upload('big.png', size=(600, 300), fmt='PNG'))
+        image = self.open(processed)
+        self.assertEqual(image.size, (100, 50))
+        self.assertTrue(processed.name.endswith('.jpg'))
+
+    def test_transparency_kept_as_png(self):
+        processed = images.process(
+            make_upload('alpha.png', mode='RGBA', fmt='PNG'))
+        self.assertEqual(self.open(processed).format, 'PNG')
+
+    def test_png_metadata_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Phone maker'
+        pnginfo = PngImagePlugin.PngInfo()
+        pnginfo.add_text('Comment', 'secret')
+        processed = images.process(make_upload(
+            'alpha.png', mode='RGBA', fmt='PNG', exif=exif.tobytes(),
+            pnginfo=pnginfo))
+        processed.seek(0)
+        data = processed.read()
+        self.assertNotIn(b'Phone maker', data)
+        self.assertNotIn(b'secret', data)
+        image = self.open(processed)
+        self.assertEqual(image.format, 'PNG')
+        self.assertNotIn('exif', image.info)
+
+    def test_animated_gif_kept(self):
+        buffer = BytesIO()
+        frames = [Image.new('P', (4, 4), color) for color in (1, 2)]
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:])
+        upload = SimpleUploadedFile('anim.gif', buffer.getvalue())
+        processed = images.process(upload)
+        processed.seek(0)
+        self.assertEqual(processed.read(), buffer.getvalue())
+        self.assertTrue(processed.name.endswith('.gif'))
+
+    def test_limits(self):
+        with override_settings(POSTS_IMAGE_MAX_UPLOAD_SIZE=10):
+            with self.assertRaises(ValidationError):
+                images.process(make_upload())
+        with override_settings(POSTS_IMAGE_MAX_PIXELS=100):
+            with self.assertRaises(ValidationError):
+                images.process(make_upload())
+        with self.assertRaises(ValidationError):
+            images.process(make_upload('image.bmp', fmt='BMP'))
+
+    def test_identical_images_stored_once(self):
+        user = User.objects.create_user(username='author')
+        client = Client()
+        client.force_login(user)
+        for name in ('first.jpg', 'second.jpg'):
+            client.post(reverse('posts:post_create'), {
+                'text': name, 'image': make_upload(name)})
+        first, second = Post.objects.order_by('pk')
+        self.assertEqual(first.image.name, second.image.name)
+        stored = [
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(
+                os.path.join(settings.MEDIA_ROOT, 'posts'))
+            for name in names]
+        self.assertEqual(
+            stored, [os.path.join(settings.MEDIA_ROOT, first.image.name)])
+
+
+@override_settings(MEDIA_GC_GRACE=0)
+class ImageReferenceTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+        self.client.force_login(self.user)
+
+    def create(self, text, upload):
+        self.client.post(reverse('posts:post_create'), {
+            'text': text, 'image': upload})
+        return Post.objects.get(text=text)
+
+    def references(self, name):
+        return StoredFile.objects.get(name=name).references
+
+    def test_shared_image_kept_until_last_post(self):
+        first = self.create('first', make_upload())
+        second = self.create('second', make_upload())
+        name = first.image.name
+        self.assertEqual(self.references(name), 2)
+        first.delete()
+        self.assertEqual(self.references(name), 1)
+        self.assertTrue(first.image.storage.exists(name))
+        second.delete()
+        self.assertFalse(first.image.storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_replaced_image_collected(self):
+        post = self.create('post', make_upload())
+        old = post.image.name
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'post', 'image': make_upload(size=(30, 30))})
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old)
+        self.assertEqual(self.references(post.image.name), 1)
+        self.assertFalse(post.image.storage.exists(old))
+
+    def test_collect_media_command(self):
+        post = self.create('post', make_upload())
+        name = post.image.name
+        # Ссылка пропала без сигнала, например при удалении через SQL.
+        Post.objects.filter(pk=post.pk).update(image='')
+        StoredFile.objects.filter(name=name).update(references=0)
+        out = StringIO()
+        call_command('collect_media', grace=0, stdout=out)
+        self.assertIn('Удалено файлов: 1', out.getvalue())
+        self.assertFalse(post.image.storage.exists(name))
@@ -0,0 +1,62 @@
+import re
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?\w+$')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-')
+        for i in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author, text=f'Пост {i}', group=cls.group)
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_listing_queries_use_indexes(self):
+        """Запросы страниц не сканируют таблицы целиком."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ]
+        cursor_urls = [url + '?cursor=' for url in urls[:4]]
+        for url in urls + cursor_urls:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                plan = self.plan(sql)
+                with self.subTest(url=url, sql=sql, plan=plan):
+                    for line in plan:
+                        self.assertIsNone(FULL_SCAN.search(line))
+                        self.assertNotIn(TEMP_SORT, line)
@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+POSTS_COUNT = 15
+
+
+class QueryBudgetMixin:
+    def assertQueriesAtMost(self, budget, url):
+        """Страница укладывается в заданное число SQL-запросов."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertLessEqual(
+            len(queries), budget,
+            '\n'.join(query['sql'] for query in queries))
+        return response
+
+
+class ListingQueryCountTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='author', first_name='Имя', last_name='Фамилия')
+        for i in range(POSTS_COUNT):
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-')
+            post = Post.objects.create(
+                author=cls.author, text=f'Пост {i}', group=group)
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Комментарий')
+        cls.group = group
+        cls.post = post
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_listing_query_budgets(self):
+        """Число запросов лент не зависит от числа постов на странице."""
+        budgets = {
+            reverse('posts:index'): 4,
+            reverse('posts:group_list', args=[self.group.slug]): 5,
+            reverse('posts:profile', args=[self.author.username]): 7,
+            reverse('posts:follow_index'): 5,
+            reverse('posts:post_detail', args=[self.post.pk]): 5,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                self.assertQueriesAtMost(budget, url)
+
+    def test_listing_comment_count(self):
+        """В ленте у поста есть число комментариев."""
+        response = self.client.get(reverse('posts:index'))
+        for post in response.context['page_obj']:
+            with self.subTest(post=post.pk):
+                self.assertEqual(post.comments_count, 1)
+
+    def test_post_detail_uses_listing_queryset(self):
+        """Страница поста не загружает неиспользуемые колонки автора."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        deferred = response.context['post'].author.get_deferred_fields()
+        self.assertIn('password', deferred)
@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.search import FTS_TABLE
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+        self.cats = Post.objects.create(
+            author=self.user, text='Коты любят спать на солнце')
+        self.dogs = Post.objects.create(
+            author=self.user, text='Собаки любят гулять, коты любят коты')
+        Post.objects.create(author=self.user, text='Совсем другой текст')
+        self.client = Client()
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return list(response.context['page_obj'])
+
+    def test_search_finds_posts(self):
+        """Поиск находит посты по словам из текста."""
+        self.assertEqual(set(self.search('любят')), {self.cats, self.dogs})
+        self.assertEqual(self.search('солнце'), [self.cats])
+
+    def test_search_is_ranked(self):
+        """Более релевантный пост идёт первым."""
+        self.assertEqual(self.search('коты')[0], self.dogs)
+
+    def test_search_prefix_and_syntax(self):
+        """Последнее слово ищется по префиксу, синтаксис FTS не ломает
+        запрос."""
+        self.assertEqual(self.search('солн'), [self.cats])
+        self.assertEqual(self.search('солнце" ('), [self.cats])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        self.cats.text = 'Теперь про погоду'
+        self.cats.save()
+        self.assertEqual(self.search('солнце'), [])
+        self.assertEqual(self.search('погоду'), [self.cats])
+        self.cats.delete()
+        self.assertEqual(self.search('погоду'), [])
+
+    def test_empty_query(self):
+        """Пустой запрос отдаёт пустую страницу."""
+        self.assertEqual(self.search(''), [])
+
+    def test_reindex_command(self):
+        """Команда reindex_posts восстанавливает индекс."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        self.assertEqual(self.search('солнце'), [])
+        call_command('reindex_posts', stdout=StringIO())
+        self.assertEqual(self.search('солнце'), [self.cats])
+
+    @override_settings(POSTS_SEARCH_BACKEND='posts.search.SimpleSearchBackend')
+    def test_simple_backend(self):
+        """Запасной бэкенд ищет по вхождению подстроки."""
+        self.assertEqual(self.search('солнце'), [self.cats])
+
+    def test_pagination_keeps_query(self):
+        """Ссылки пагинации сохраняют поисковый запрос."""
+        for i in range(12):
+            Post.objects.create(author=self.user, text=f'Повтор {i}')
+        response = self.client.get(reverse('posts:search'), {'q': 'повтор'})
+        self.assertContains(
+            response, '?q=%D0%BF%D0%BE%D0%B2%D1%82%D0%BE%D1%80&amp;page=2')
+        self.assertEqual(len(self.search('повтор', page=2)), 2)
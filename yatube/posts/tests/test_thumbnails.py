@@ -0,0 +1,78 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from core import taskqueue
+from core.models import Task
+from posts import listing_cache, thumbnails, versions
+from posts.models import Post, User
+from posts.tests.utils import TempMediaMixin, make_upload
+
+
+class ThumbnailTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_missing_thumbnail_falls_back_to_original(self):
+        """Без готовой миниатюры отдаётся оригинал, а генерация
+        ставится в очередь."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_upload(fmt='PNG'))
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            thumbnail = get_thumbnail(
+                post.image, '960x339', crop='center', upscale=True)
+        self.assertEqual(thumbnail.name, post.image.name)
+        schedule.assert_called_once()
+
+    @override_settings(TASKS_EAGER=False)
+    def test_worker_generates_thumbnail(self):
+        """Миниатюру создаёт воркер очереди задач, повторный показ
+        не ставит её второй раз."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_upload(fmt='PNG'))
+        Task.objects.all().delete()
+        for _ in range(2):
+            thumbnail = get_thumbnail(
+                post.image, '960x339', crop='center', upscale=True)
+            self.assertEqual(thumbnail.name, post.image.name)
+        self.assertEqual(Task.objects.get().name, 'posts.tasks.make_thumbnail')
+        version = versions.changed_at('post', post.pk)
+        generation = listing_cache.generation()
+        taskqueue.run_worker(once=True)
+        # Страницы с исходной картинкой вместо миниатюры устарели.
+        self.assertGreater(versions.changed_at('post', post.pk), version)
+        self.assertNotEqual(listing_cache.generation(), generation)
+        backend = thumbnails.DeferredThumbnailBackend()
+        self.assertIsNotNone(backend.get_cached(
+            post.image, '960x339', {'crop': 'center', 'upscale': True}))
+
+    def test_post_create_schedules_presets(self):
+        """Создание поста с картинкой запускает генерацию миниатюр."""
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            self.client.post(
+                reverse('posts:post_create'),
+                data={'text': 'Пост', 'image': make_upload(fmt='PNG')})
+        self.assertEqual(
+            schedule.call_count, len(thumbnails.THUMBNAIL_PRESETS))
+
+    def test_warm_thumbnails_command(self):
+        """После прогрева шаблоны получают готовую миниатюру."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_upload(fmt='PNG'))
+        call_command('warm_thumbnails', stdout=StringIO())
+        backend = thumbnails.DeferredThumbnailBackend()
+        cached = backend.get_cached(
+            post.image, '960x339', {'crop': 'center', 'upscale': True})
+        self.assertIsNotNone(cached)
+        self.assertEqual(
+            get_thumbnail(
+                post.image, '960x339', crop='center', upscale=True).name,
+            cached.name)
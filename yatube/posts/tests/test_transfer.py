@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import StoredFile
+from posts import feed, listing_cache
+from posts.models import FeedEntry, Follow, Group, Post, User, UserStats
+
+
+class TransferCommandsTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='-')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def write_jsonl(self, name, rows):
+        with open(self.path(name), 'w', encoding='utf-8') as stream:
+            for row in rows:
+                stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return self.path(name)
+
+    def call(self, *args):
+        call_command(*args, stdout=StringIO(), stderr=StringIO())
+
+    def test_import_jsonl(self):
+        """Импорт создаёт посты с датами, группами и лентами."""
+        path = self.write_jsonl('posts.jsonl', [
+            {'text': f'Пост {i}', 'author': 'author', 'group': 'group',
+             'pub_date': f'2020-01-0{i + 1}T10:00:00+00:00'}
+            for i in range(5)
+        ] + [{'text': 'Чужой', 'author': 'nobody'}])
+        self.call('import_posts', path, '--batch-size', '2')
+        posts = Post.objects.filter(author=self.author)
+        self.assertEqual(posts.count(), 5)
+        self.assertEqual(posts.filter(group=self.group).count(), 5)
+        self.assertEqual(posts.first().pub_date.year, 2020)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 5)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 5)
+
+    def test_broken_row_keeps_committed_batches_consistent(self):
+        """Ошибка в файле не оставляет устаревших счётчиков и лент."""
+        path = self.write_jsonl('posts.jsonl', [
+            {'text': f'Пост {i}', 'author': 'author'} for i in range(2)
+        ] + [{'author': 'author'}])
+        generation = listing_cache.generation()
+        with self.assertRaises(KeyError):
+            self.call('import_posts', path, '--batch-size', '2')
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 2)
+        self.assertNotEqual(listing_cache.generation(), generation)
+
+    def test_import_keeps_auto_now_add(self):
+        """Пока идёт импорт, посты, созданные как обычно, получают дату."""
+        created = []
+
+        def create_post(posts):
+            created.append(Post.objects.create(
+                author=self.reader, text='Во время импорта'))
+
+        path = self.write_jsonl('posts.jsonl', [
+            {'text': 'Старый', 'author': 'author',
+             'pub_date': '2020-01-01T10:00:00+00:00'}])
+        with mock.patch.object(feed, 'fan_out_posts', create_post):
+            self.call('import_posts', path)
+        self.assertIsNotNone(created[0].pub_date)
+        self.assertEqual(
+            Post.objects.get(text='Старый').pub_date.isoformat(),
+            '2020-01-01T10:00:00+00:00')
+
+    def test_concurrent_post_not_taken_for_imported(self):
+        """Пост, вставленный параллельно до пачки, не считается
+        импортированным."""
+        bulk_create = Post.objects.bulk_create
+
+        def concurrent_insert(posts):
+            Post.objects.create(author=self.reader, text='Параллельный')
+            return bulk_create(posts)
+
+        path = self.write_jsonl('posts.jsonl', [
+            {'text': f'Пост {i}', 'author': 'author'} for i in range(3)])
+        with mock.patch.object(
+                Post.objects, 'bulk_create', concurrent_insert), \
+                mock.patch.object(feed, 'fan_out_posts') as fan_out:
+            self.call('import_posts', path)
+        imported = fan_out.call_args[0][0]
+        self.assertEqual(
+            [post.text for post in imported],
+            list(Post.objects.filter(
+                pk__in=[post.pk for post in imported]).order_by(
+                    'pk').values_list('text', flat=True)))
+        self.assertNotIn('Параллельный', [post.text for post in imported])
+
+    def test_import_retains_images(self):
+        """Импорт считает ссылки на картинки: сборщик их не удалит."""
+        storage = Post.image.field.storage
+        with override_settings(MEDIA_ROOT=self.tmp):
+            name = storage.save('posts/a.jpg', ContentFile(b'image'))
+            path = self.write_jsonl('posts.jsonl', [
+                {'text': f'Пост {i}', 'author': 'author', 'image': name}
+                for i in range(3)
+            ])
+            self.call('import_posts', path)
+            self.assertEqual(
+                StoredFile.objects.get(name=name).references, 3)
+            self.assertEqual(storage.collect(grace=0), [])
+            self.assertTrue(storage.exists(name))
+
+    def test_export_import_csv_round_trip(self):
+        """Экспорт в CSV и обратный импорт сохраняют посты."""
+        for i in range(3):
+            Post.objects.create(
+                author=self.author, text=f'Текст, "с кавычками" {i}',
+                group=self.group)
+        expected = list(Post.objects.order_by('pk').values_list(
+            'text', 'pub_date', 'group__slug'))
+        path = self.path('posts.csv')
+        self.call('export_posts', path)
+        Post.objects.all().delete()
+        self.call('import_posts', path)
+        self.assertEqual(list(Post.objects.order_by('pk').values_list(
+            'text', 'pub_date', 'group__slug')), expected)
+
+    def test_export_jsonl(self):
+        """Экспорт в JSONL пишет по одной записи в строке."""
+        Post.objects.create(author=self.author, text='Пост')
+        path = self.path('posts.jsonl')
+        self.call('export_posts', path)
+        with open(path, encoding='utf-8') as stream:
+            rows = [json.loads(line) for line in stream]
+        self.assertEqual(rows[0]['text'], 'Пост')
+        self.assertEqual(rows[0]['author'], 'author')
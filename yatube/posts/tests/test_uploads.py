@@ -0,0 +1,162 @@
+import os
+from http import HTTPStatus
+from io import BytesIO
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import uploads
+from posts.models import Post, Upload, User
+from posts.tests.utils import TempMediaMixin, image_bytes
+
+
+class LimitedReader(BytesIO):
+    """Тело запроса, которое запоминает размер кусков и может
+    оборваться после limit байт."""
+
+    def __init__(self, data, limit=None):
+        super().__init__(data if limit is None else data[:limit])
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+class UploadApiTests(TempMediaMixin, TestCase):
+    temp_dirs = ('MEDIA_ROOT', 'POSTS_UPLOAD_DIR')
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+        self.client.force_login(self.user)
+
+    def start(self, data, filename='photo.jpg'):
+        response = self.client.post(
+            reverse('api:upload_list'),
+            {'filename': filename, 'size': len(data)},
+            content_type='application/json')
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        return response.json()['id'], response['Location']
+
+    def send(self, url, data, start, end):
+        return self.client.patch(
+            url, data[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(data)}')
+
+    def upload(self, data, part_size=1000):
+        upload_id, url = self.start(data)
+        for start in range(0, len(data), part_size):
+            end = min(start + part_size, len(data)) - 1
+            response = self.send(url, data, start, end)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+        return upload_id
+
+    def test_parts_assembled_into_post_image(self):
+        data = image_bytes(size=(300, 200))
+        upload_id = self.upload(data)
+        upload = Upload.objects.get(pk=upload_id)
+        self.assertTrue(upload.complete)
+        with open(uploads.part_path(upload), 'rb') as part:
+            self.assertEqual(part.read(), data)
+        with mock.patch.object(
+                uploads.transaction, 'on_commit', lambda func: func()):
+            self.client.post(reverse('posts:post_create'), {
+                'text': 'Пост', 'upload': upload_id})
+        post = Post.objects.get(text='Пост')
+        self.assertRegex(post.image.name, r'^posts/.+\.jpg$')
+        self.assertFalse(Upload.objects.exists())
+        self.assertFalse(os.path.exists(uploads.part_path(upload)))
+
+    def test_upload_attached_through_api(self):
+        upload_id = self.upload(image_bytes(size=(300, 200)))
+        upload = Upload.objects.get(pk=upload_id)
+        with mock.patch.object(
+                uploads.transaction, 'on_commit', lambda func: func()):
+            response = self.client.post(
+                reverse('api:post_list'),
+                {'text': 'Пост из API', 'upload': upload_id},
+                content_type='application/json')
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        post = Post.objects.get(text='Пост из API')
+        self.assertEqual(post.author, self.user)
+        self.assertRegex(post.image.name, r'^posts/.+\.jpg$')
+        self.assertFalse(Upload.objects.exists())
+        self.assertFalse(os.path.exists(uploads.part_path(upload)))
+
+    def test_resume_after_interrupted_part(self):
+        data = image_bytes(size=(300, 200))
+        upload_id, url = self.start(data)
+        upload = Upload.objects.get(pk=upload_id)
+        # Соединение оборвалось на середине части.
+        uploads.append(upload, LimitedReader(data, limit=700), 0, len(data))
+        state = self.client.get(url).json()
+        self.assertEqual(state['offset'], 700)
+        self.assertFalse(state['complete'])
+        response = self.send(url, data, 700, len(data) - 1)
+        self.assertTrue(response.json()['complete'])
+        with open(uploads.part_path(upload), 'rb') as part:
+            self.assertEqual(part.read(), data)
+
+    def test_wrong_offset_conflict(self):
+        data = image_bytes(size=(300, 200))
+        upload_id, url = self.start(data)
+        self.send(url, data, 0, 99)
+        response = self.send(url, data, 0, 99)
+        self.assertEqual(response.status_code, HTTPStatus.CONFLICT)
+        self.assertEqual(response.json()['errors']['offset'], 100)
+
+    def test_part_written_in_small_pieces(self):
+        data = os.urandom(uploads.CHUNK_SIZE * 3 + 10)
+        upload_id, url = self.start(data)
+        upload = Upload.objects.get(pk=upload_id)
+        body = LimitedReader(data)
+        uploads.append(upload, body, 0, len(data))
+        self.assertLessEqual(max(body.reads), uploads.CHUNK_SIZE)
+        self.assertTrue(upload.complete)
+
+    def test_invalid_requests(self):
+        with override_settings(POSTS_IMAGE_MAX_UPLOAD_SIZE=10):
+            response = self.client.post(
+                reverse('api:upload_list'),
+                {'filename': 'big.jpg', 'size': 11},
+                content_type='application/json')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        data = image_bytes(size=(300, 200))
+        _, url = self.start(data)
+        response = self.client.patch(
+            url, data[:10], content_type='application/octet-stream')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        response = self.send(url, data, 0, len(data))
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_other_user_upload(self):
+        upload_id = self.upload(image_bytes(size=(300, 200)))
+        other = User.objects.create_user(username='other')
+        self.client.force_login(other)
+        response = self.client.get(
+            reverse('api:upload_detail', args=(upload_id,)))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': 'Чужая картинка', 'upload': upload_id})
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+    def test_incomplete_upload_rejected(self):
+        data = image_bytes(size=(300, 200))
+        upload_id, url = self.start(data)
+        self.send(url, data, 0, 99)
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост', 'upload': upload_id})
+        self.assertTrue(response.context['form'].errors['image'])
+
+    def test_delete_and_purge(self):
+        upload_id, url = self.start(image_bytes(size=(300, 200)))
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Upload.objects.filter(pk=upload_id).exists())
+        upload_id, _ = self.start(image_bytes(size=(300, 200)))
+        with override_settings(POSTS_UPLOAD_EXPIRE=-1):
+            self.assertEqual(uploads.purge(), 1)
+        self.assertFalse(Upload.objects.exists())
@@ -0,0 +1,108 @@
+from io import BytesIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, features
+
+from posts import variants
+from posts.models import Post, User
+from posts.tests.utils import TempMediaMixin, make_upload
+
+SIZE = (2000, 1000)
+
+
+@override_settings(
+    MEDIA_GC_GRACE=0, POSTS_IMAGE_VARIANT_WIDTHS=(320, 640, 960))
+class ImageVariantTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author')
+        self.client.force_login(self.user)
+
+    def create(self, upload, text='Пост'):
+        self.client.post(reverse('posts:post_create'), {
+            'text': text, 'image': upload})
+        return Post.objects.get(text=text)
+
+    def open_variant(self, post, token):
+        return Image.open(default_storage.open(
+            variants.variant_name(post.image.name, token)))
+
+    def test_variants_created_on_upload(self):
+        post = self.create(make_upload(size=SIZE))
+        widths = [width for width, extension, _ in
+                  variants.parse(post.image_variants)
+                  if extension == 'jpg']
+        self.assertEqual(widths, [320, 640, 960])
+        with self.open_variant(post, '640.jpg') as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (640, 226))
+
+    def test_page_has_srcset(self):
+        post = self.create(make_upload(size=SIZE))
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,)))
+        url = default_storage.url(
+            variants.variant_name(post.image.name, '320.jpg'))
+        self.assertContains(response, f'{url} 320w')
+        self.assertContains(response, 'sizes="')
+
+    def test_transparent_image_keeps_alpha(self):
+        post = self.create(make_upload(size=SIZE, mode='RGBA', fmt='PNG'))
+        self.assertIn('960.png', post.image_variants)
+        with self.open_variant(post, '960.png') as image:
+            self.assertEqual(image.mode, 'RGBA')
+
+    def test_variants_without_metadata(self):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Phone maker'
+        Image.new('RGBA', (1000, 500)).save(buffer, 'PNG', exif=exif)
+        default_storage.save(
+            'posts/legacy.png', ContentFile(buffer.getvalue()))
+        tokens = variants.generate('posts/legacy.png', default_storage)
+        for _, _, token in variants.parse(tokens):
+            with default_storage.open(
+                    variants.variant_name('posts/legacy.png', token)) as file:
+                self.assertNotIn(b'Phone maker', file.read())
+
+    def test_narrow_image_not_upscaled(self):
+        post = self.create(make_upload(size=(200, 100)))
+        self.assertEqual(post.image_variants, '200.jpg')
+
+    def test_animated_gif_uses_thumbnail(self):
+        frames = [Image.new('P', (40, 20), color) for color in (1, 2)]
+        buffer = BytesIO()
+        frames[0].save(buffer, 'GIF', save_all=True,
+                       append_images=frames[1:])
+        post = self.create(SimpleUploadedFile('a.gif', buffer.getvalue()))
+        self.assertEqual(post.image_variants, '')
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,)))
+        self.assertNotContains(response, 'srcset')
+
+    def test_variants_replaced_and_collected(self):
+        post = self.create(make_upload(size=SIZE))
+        old = post.image.name
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'Пост', 'image': make_upload(size=(1000, 500))})
+        post.refresh_from_db()
+        self.assertIn('960.jpg', post.image_variants)
+        self.assertFalse(default_storage.exists(variants.variant_dir(old)))
+        post.delete()
+        self.assertFalse(
+            default_storage.exists(variants.variant_dir(post.image.name)))
+
+    @skipUnless(features.check('webp'), 'Pillow без libwebp')
+    def test_webp_source(self):
+        post = self.create(make_upload(size=SIZE))
+        self.assertIn('320.webp', post.image_variants)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,)))
+        self.assertContains(response, 'type="image/webp"')
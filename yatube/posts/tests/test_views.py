@@ -1,4 +1,7 @@
+import base64
+import json
 from http import HTTPStatus
+from io import StringIO
 import shutil
 import tempfile
 
@@ -9,9 +12,13 @@ from django.urls import reverse
 from django import forms
 from django.core.paginator import Page
 from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from posts.models import Post, Group, User, Follow
+from posts.models import Post, Group, User, Follow, FeedEntry
 from posts.forms import PostForm, Comment
+from posts.paginators import CursorPage
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -170,10 +177,21 @@ class PostPagesTests(TestCase):
     def test_check_cache(self):
         """Тестирование работы кеша."""
         res2 = self.authorized_client.get(reverse('posts:index')).content
-        self.assertEqual(self.res1, res2)
-        cache.clear()
+        self.assertNotEqual(self.res1, res2)
+        Post.objects.filter(group=self.group_cash).update(
+            text='Изменено в обход сигналов')
         res3 = self.authorized_client.get(reverse('posts:index')).content
-        self.assertNotEqual(res2, res3)
+        self.assertEqual(res2, res3)
+        cache.clear()
+        res4 = self.authorized_client.get(reverse('posts:index')).content
+        self.assertNotEqual(res3, res4)
+
+    def test_cache_invalidated_on_delete(self):
+        """Удаление поста сразу убирает его из закешированной ленты."""
+        self.authorized_client.get(reverse('posts:index'))
+        Post.objects.filter(group=self.group_cash).delete()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Тестовый пост для кеша')
 
 
 class PaginatorViewsTest(TestCase):
@@ -231,6 +249,96 @@ class PaginatorViewsTest(TestCase):
                     len(page_obj2), self.POSTS_ON_SECOND_PAGE
                 )
 
+    def test_pages_cached_separately(self):
+        """Каждая страница ленты кешируется отдельно."""
+        for url in self.urls_expected_post_number:
+            with self.subTest(url=url):
+                first = self.authorized_client.get(url).content
+                second = self.authorized_client.get(url + '?page=2').content
+                self.assertNotEqual(first, second)
+
+    def test_extra_params_share_fragment(self):
+        """Посторонние параметры адреса не создают новых фрагментов."""
+        url = reverse('posts:index')
+        self.authorized_client.get(url + '?page=2')
+        Post.objects.update(text='Изменено в обход сигналов')
+        response = self.authorized_client.get(url + '?page=2&utm_source=x')
+        self.assertContains(response, 'Тестовый текст для тестирования')
+
+    def test_cursor_pages(self):
+        """Курсорная пагинация отдаёт все посты без повторов."""
+        for url in self.urls_expected_post_number:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url + '?cursor=')
+                first = response.context['page_obj']
+                self.assertEqual(len(first), self.POSTS_ON_FIRST_PAGE)
+                self.assertFalse(first.has_previous())
+                response = self.authorized_client.get(
+                    url + '?cursor=' + first.next_cursor)
+                second = response.context['page_obj']
+                self.assertEqual(len(second), self.POSTS_ON_SECOND_PAGE)
+                self.assertFalse(second.has_next())
+                self.assertEqual(
+                    set(first) | set(second),
+                    set(Post.objects.filter(author=self.author)))
+                response = self.authorized_client.get(
+                    url + '?cursor=' + second.previous_cursor)
+                self.assertEqual(
+                    list(response.context['page_obj']), list(first))
+
+    def test_cursor_page_without_offset_and_count(self):
+        """Страница по курсору не использует OFFSET и COUNT."""
+        url = reverse('posts:index')
+        first = self.authorized_client.get(url + '?cursor=')
+        cursor = first.context['page_obj'].next_cursor
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url + '?cursor=' + cursor)
+        for query in queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('OFFSET', query['sql'])
+                self.assertNotIn('COUNT(*)', query['sql'])
+
+    @override_settings(POSTS_CURSOR_PAGINATION=True)
+    def test_cursor_pagination_setting(self):
+        """Настройка включает курсорную пагинацию без параметра."""
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertIsInstance(response.context['page_obj'], CursorPage)
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор отдаёт первую страницу."""
+        response = self.authorized_client.get(
+            reverse('posts:index') + '?cursor=broken')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            len(response.context['page_obj']), self.POSTS_ON_FIRST_PAGE)
+
+    def test_malformed_cursor_payloads(self):
+        """Курсор правильного base64 с чужими данными не роняет
+        страницы: отдаётся первая страница."""
+        post = Post.objects.first()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=['Anya']),
+            reverse('posts:post_detail', args=[post.pk]),
+            reverse('api:post_list'),
+        )
+        payloads = (
+            [False, ['garbage', '1']],
+            [False, {'a': 1}],
+            [False, [None, None]],
+            [False, ['2020-01-01 00:00:00']],
+            ['yes', ['2020-01-01 00:00:00', '1']],
+        )
+        for payload in payloads:
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(payload).encode()).decode()
+            for url in urls:
+                with self.subTest(url=url, payload=payload):
+                    response = self.authorized_client.get(
+                        url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class ImageTests(TestCase):
@@ -304,10 +412,12 @@ class ImageTests(TestCase):
 
     def test_image_in_page(self):
         """Проверяем что пост с картинкой создается в БД"""
+        # Имя файла — хеш содержимого (core.storage).
+        self.assertRegex(self.post.image.name, r'^posts/.+\.gif$')
         self.assertTrue(
             Post.objects.filter(
                 text="Тестовый пост",
-                image="posts/small.gif").exists()
+                image=self.post.image.name).exists()
         )
 
 
@@ -424,3 +534,33 @@ class FollowTests(TestCase):
         появляется у его неподписчиков"""
         response = self.not_following.get(self.follow_index)
         self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_unfollow_removes_posts_from_feed(self):
+        """После отписки посты автора пропадают из ленты."""
+        self.authorized_client.get(self.unfollow)
+        response = self.authorized_client.get(self.follow_index)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_follow_adds_existing_posts_to_feed(self):
+        """После подписки в ленте появляются уже опубликованные посты."""
+        self.not_following.get(self.follow)
+        response = self.not_following.get(self.follow_index)
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_deleted_post_disappears_from_feed(self):
+        """Удалённый пост пропадает из ленты подписчика."""
+        self.post.delete()
+        response = self.authorized_client.get(self.follow_index)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_follow_index_cursor_pagination(self):
+        """Лента подписок листается по курсору."""
+        response = self.authorized_client.get(self.follow_index + '?cursor=')
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_backfill_feed_command(self):
+        """Команда backfill_feed восстанавливает ленты по подпискам."""
+        FeedEntry.objects.all().delete()
+        call_command('backfill_feed', stdout=StringIO())
+        response = self.authorized_client.get(self.follow_index)
+        self.assertEqual(list(response.context['page_obj']), [self.post])
@@ -0,0 +1,54 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+
+
+def image_bytes(size=(40, 20), mode='RGB', fmt='JPEG', **save_options):
+    """Одноцветная картинка в заданном формате."""
+    buffer = BytesIO()
+    Image.new(mode, size, 'red').save(buffer, fmt, **save_options)
+    return buffer.getvalue()
+
+
+def make_upload(name=None, size=(40, 20), mode='RGB', fmt='JPEG',
+                **save_options):
+    """Загруженный файл с картинкой, как из формы."""
+    if name is None:
+        name = f'image.{fmt.lower()}'
+    return SimpleUploadedFile(
+        name, image_bytes(size, mode, fmt, **save_options))
+
+
+class TempMediaMixin:
+    """Временные каталоги вместо настроек из temp_dirs на время
+    тестов класса; после них каталоги удаляются."""
+    temp_dirs = ('MEDIA_ROOT',)
+
+    @classmethod
+    def setUpClass(cls):
+        paths = {
+            name: tempfile.mkdtemp(dir=settings.BASE_DIR)
+            for name in cls.temp_dirs}
+        cls._temp_dirs = override_settings(**paths)
+        cls._temp_dirs.enable()
+        try:
+            super().setUpClass()
+        except Exception:
+            cls._remove_temp_dirs()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._remove_temp_dirs()
+
+    @classmethod
+    def _remove_temp_dirs(cls):
+        cls._temp_dirs.disable()
+        for path in cls._temp_dirs.options.values():
+            shutil.rmtree(path, ignore_errors=True)
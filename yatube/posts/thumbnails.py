@@ -0,0 +1,86 @@
+"""Фоновая генерация миниатюр sorl-thumbnail.
+
+DeferredThumbnailBackend не ресайзит картинку в запросе: если миниатюры
+ещё нет в хранилище ключей, он ставит её генерацию в очередь задач
+(posts.tasks.make_thumbnail) и отдаёт шаблону исходное изображение.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import serialize, tokey
+from sorl.thumbnail.images import ImageFile
+
+from . import tasks
+
+logger = logging.getLogger(__name__)
+
+# Размеры, которые запрашивают шаблоны постов.
+THUMBNAIL_PRESETS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+SCHEDULED_KEY = 'thumbnails:scheduled:{}'
+# Пока миниатюра в очереди, показы страницы не ставят её заново.
+SCHEDULED_TIMEOUT = 60
+
+
+def _generate(file_, geometry, options):
+    try:
+        ThumbnailBackend().get_thumbnail(file_, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', file_)
+
+
+def schedule(file_, geometry, options):
+    """Ставит миниатюру в очередь задач."""
+    source = ImageFile(file_)
+    key = tokey(source.key, geometry, serialize(options))
+    if not cache.add(SCHEDULED_KEY.format(key), True, SCHEDULED_TIMEOUT):
+        return
+    # Хранилище передаётся путём к классу, как в хранилище ключей
+    # sorl: от него зависит имя миниатюры.
+    tasks.make_thumbnail.delay(
+        source.name, source.serialize_storage(), geometry, options,
+        key=f'make_thumbnail:{key}')
+
+
+def schedule_presets(image):
+    if not image:
+        return
+    for geometry, options in THUMBNAIL_PRESETS:
+        schedule(image, geometry, options)
+
+
+def warm(image):
+    """Синхронно создаёт все миниатюры изображения."""
+    for geometry, options in THUMBNAIL_PRESETS:
+        _generate(image, geometry, options)
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not settings.THUMBNAIL_ASYNC or not file_:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        cached = self.get_cached(file_, geometry_string, dict(options))
+        if cached:
+            return cached
+        schedule(file_, geometry_string, options)
+        return ImageFile(file_)
+
+    def get_cached(self, file_, geometry_string, options):
+        """Миниатюра из хранилища ключей без генерации."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
@@ -0,0 +1,116 @@
+"""Загрузка картинок частями с продолжением после обрыва.
+
+Клиент создаёт загрузку (POST /api/v1/uploads/ с именем и размером
+файла) и отправляет файл частями: PATCH с заголовком Content-Range и
+байтами части в теле. Часть переписывается из тела запроса во
+временный файл в POSTS_UPLOAD_DIR кусками по CHUNK_SIZE, поэтому в
+памяти не больше одного куска, сколько бы ни весила часть. После
+обрыва клиент узнаёт GET-запросом, сколько байт принято (offset), и
+продолжает с этого места, а не с начала.
+
+Готовая загрузка указывается в поле upload формы поста вместо файла и
+удаляется после сохранения поста. Брошенные загрузки старше
+POSTS_UPLOAD_EXPIRE секунд удаляет manage.py purge_uploads.
+"""
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Upload
+
+CHUNK_SIZE = 64 * 1024
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class OffsetMismatch(Exception):
+    """Часть начинается не с того байта, который ожидает сервер."""
+
+    def __init__(self, offset):
+        super().__init__(offset)
+        self.offset = offset
+
+
+def part_path(upload):
+    return os.path.join(settings.POSTS_UPLOAD_DIR, f'{upload.pk.hex}.part')
+
+
+def create(user, filename, size):
+    upload = Upload.objects.create(
+        user=user, filename=os.path.basename(filename)[:255], size=size)
+    os.makedirs(settings.POSTS_UPLOAD_DIR, exist_ok=True)
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+def parse_range(header, upload):
+    """Начало и длина части из Content-Range: bytes start-end/size."""
+    match = CONTENT_RANGE.match(header or '')
+    if not match:
+        raise ValidationError(
+            'Ожидается заголовок Content-Range: bytes начало-конец/размер.')
+    start, end, size = map(int, match.groups())
+    if size != upload.size or start > end or end >= size:
+        raise ValidationError('Диапазон не соответствует размеру файла.')
+    return start, end - start + 1
+
+
+def append(upload, stream, start, length):
+    """Дописывает часть из stream с байта start; возвращает новый
+    offset. Оборванная часть засчитывается до последнего байта."""
+    if start != upload.offset:
+        raise OffsetMismatch(upload.offset)
+    written = 0
+    with open(part_path(upload), 'r+b') as part:
+        # Хвост прошлой попытки, не дошедший до базы, отбрасывается.
+        part.seek(start)
+        part.truncate()
+        while written < length:
+            chunk = stream.read(min(CHUNK_SIZE, length - written))
+            if not chunk:
+                break
+            part.write(chunk)
+            written += len(chunk)
+    # Условие по offset: из двух параллельных частей засчитается одна.
+    updated = Upload.objects.filter(pk=upload.pk, offset=start).update(
+        offset=start + written, updated=timezone.now())
+    if not updated:
+        upload.refresh_from_db(fields=['offset'])
+        raise OffsetMismatch(upload.offset)
+    upload.offset = start + written
+    return upload.offset
+
+
+def open_complete(upload):
+    """Собранный файл для posts.images.process()."""
+    return File(open(part_path(upload), 'rb'), name=upload.filename)
+
+
+def _remove_part(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def discard(upload):
+    """Удаляет загрузку; файл — после фиксации транзакции."""
+    path = part_path(upload)
+    upload.delete()
+    transaction.on_commit(lambda: _remove_part(path))
+
+
+def purge():
+    """Удаляет загрузки, не менявшиеся POSTS_UPLOAD_EXPIRE секунд."""
+    border = timezone.now() - timedelta(seconds=settings.POSTS_UPLOAD_EXPIRE)
+    expired = Upload.objects.filter(updated__lt=border)
+    count = 0
+    for upload in expired.iterator():
+        discard(upload)
+        count += 1
+    return count
@@ -1,9 +1,13 @@
 from django.urls import path
 
+from posts.feeds import (
+    AuthorPostsAtomFeed, AuthorPostsFeed, GroupPostsAtomFeed, GroupPostsFeed,
+    LatestPostsAtomFeed, LatestPostsFeed
+)
 from posts.views import (
     group_posts, index, post_create, post_detail, post_edit,
-    profile, add_comment, profile_follow, profile_unfollow,
-    follow_index
+    profile, add_comment, comment_list, profile_follow, profile_unfollow,
+    follow_index, search
 )
 
 app_name = 'posts'
@@ -16,7 +20,31 @@ urlpatterns = [
     path('create/', post_create, name='post_create'),
     path('posts/<post_id>/edit/', post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/', add_comment, name='add_comment'),
+    path(
+        'posts/<int:post_id>/comments/',
+        comment_list,
+        name='comment_list'
+    ),
     path('follow/', follow_index, name='follow_index'),
+    path('search/', search, name='search'),
+    path('rss/', LatestPostsFeed(), name='index_rss'),
+    path('atom/', LatestPostsAtomFeed(), name='index_atom'),
+    path('group/<slug:slug>/rss/', GroupPostsFeed(), name='group_rss'),
+    path(
+        'group/<slug:slug>/atom/',
+        GroupPostsAtomFeed(),
+        name='group_atom'
+    ),
+    path(
+        'profile/<str:username>/rss/',
+        AuthorPostsFeed(),
+        name='profile_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        AuthorPostsAtomFeed(),
+        name='profile_atom'
+    ),
     path(
         'profile/<str:username>/follow/',
         profile_follow,
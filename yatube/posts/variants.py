@@ -0,0 +1,149 @@
+"""Адаптивные варианты картинок постов для srcset.
+
+Шаблоны показывают картинку поста кадром 960x339. Для каждой картинки
+заранее создаётся набор таких кадров шириной из
+POSTS_IMAGE_VARIANT_WIDTHS в исходном формате (JPEG или PNG) и, если
+Pillow собран с libwebp, ещё и в WebP. Браузер по srcset и sizes
+выбирает ширину под экран, поэтому телефон не скачивает кадр 960px.
+
+Картинка декодируется один раз: кадр вырезается из исходника, и каждая
+следующая ширина уменьшается из предыдущей, а не из оригинала.
+Варианты лежат рядом в каталоге по имени исходника, поэтому у
+одинаковых картинок они общие. Список готовых вариантов хранится в
+Post.image_variants: шаблону не нужны лишние запросы и обращения к
+диску.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'variants'
+# Пропорции кадра из шаблонов постов (960x339).
+FRAME = (960, 339)
+MIME_TYPES = {'jpg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp'}
+
+
+def variant_dir(name):
+    return f'{VARIANT_DIR}/{os.path.splitext(name)[0]}'
+
+
+def variant_name(name, token):
+    """token — «ширина.расширение», например 480.jpg."""
+    return f'{variant_dir(name)}/{token}'
+
+
+def parse(tokens):
+    """Разбирает Post.image_variants в [(ширина, расширение, токен)]."""
+    parsed = []
+    for token in tokens.split():
+        width, extension = token.split('.')
+        parsed.append((int(width), extension, token))
+    return parsed
+
+
+def _formats(image):
+    base = 'png' if 'A' in image.getbands() else 'jpg'
+    if features.check('webp'):
+        return (base, 'webp')
+    return (base,)
+
+
+def _encode(frame, extension):
+    output = BytesIO()
+    if extension == 'png':
+        frame.save(output, 'PNG', optimize=True)
+    elif extension == 'webp':
+        frame.save(output, 'WEBP', quality=settings.POSTS_IMAGE_QUALITY,
+                   method=4)
+    else:
+        frame.convert('RGB').save(
+            output, 'JPEG', quality=settings.POSTS_IMAGE_QUALITY,
+            optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def _frame(image):
+    """Кадр пропорций FRAME из центра картинки."""
+    width, height = image.size
+    frame_width = min(width, round(height * FRAME[0] / FRAME[1]))
+    frame_height = min(height, round(frame_width * FRAME[1] / FRAME[0]))
+    left = (width - frame_width) // 2
+    top = (height - frame_height) // 2
+    frame = image.crop(
+        (left, top, left + frame_width, top + frame_height))
+    # Без метаданных исходника: запись PNG взяла бы EXIF из info.
+    frame.info = {}
+    return frame
+
+
+def _widths(frame_width):
+    # Увеличивать кадр бессмысленно: узкая картинка даёт один вариант.
+    widths = [width for width in settings.POSTS_IMAGE_VARIANT_WIDTHS
+              if width <= frame_width]
+    return sorted(widths, reverse=True) or [frame_width]
+
+
+def _load_frame(name, source_storage):
+    """Декодирует картинку и вырезает кадр; None — вариантов не будет."""
+    try:
+        with source_storage.open(name) as source:
+            image = Image.open(source)
+            if getattr(image, 'is_animated', False):
+                # Кадр анимации потерял бы движение: остаётся sorl.
+                return None
+            largest = max(settings.POSTS_IMAGE_VARIANT_WIDTHS)
+            if image.format == 'JPEG':
+                image.draft('RGB', (largest, largest))
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert(
+                    'RGBA' if 'transparency' in image.info
+                    or image.mode in ('LA', 'PA') else 'RGB')
+            return _frame(image)
+    except (OSError, SuspiciousFileOperation, Image.DecompressionBombError):
+        logger.warning('Не удалось прочитать картинку %s', name)
+        return None
+
+
+def generate(name, source_storage, storage=default_storage):
+    """Создаёт недостающие варианты картинки name из source_storage и
+    возвращает строку для Post.image_variants (пустую, если вариантов
+    не будет)."""
+    frame = _load_frame(name, source_storage)
+    if frame is None:
+        return ''
+    formats = _formats(frame)
+    tokens = []
+    for width in _widths(frame.width):
+        height = max(1, round(width * FRAME[1] / FRAME[0]))
+        if frame.size != (width, height):
+            frame = frame.resize((width, height), Image.LANCZOS)
+        for extension in formats:
+            token = f'{width}.{extension}'
+            target = variant_name(name, token)
+            if not storage.exists(target):
+                storage.save(target, ContentFile(_encode(frame, extension)))
+            tokens.append(token)
+    return ' '.join(reversed(tokens))
+
+
+def delete(name, storage=default_storage):
+    """Удаляет все варианты картинки name."""
+    directory = variant_dir(name)
+    if not storage.exists(directory):
+        return
+    for filename in storage.listdir(directory)[1]:
+        storage.delete(f'{directory}/{filename}')
+    # Каталог на каждую картинку: пустые не оставляем.
+    try:
+        os.rmdir(storage.path(directory))
+    except (NotImplementedError, OSError):
+        pass
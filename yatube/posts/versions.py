@@ -0,0 +1,103 @@
+"""Версии страниц поста, группы и профиля для условных GET-запросов.
+
+Версия — время последнего изменения объекта, хранится в кеше и
+обновляется сигналами. Если ключ вытеснен, версией становится текущее
+время, и клиенты просто получат страницу заново. Такой ключ, созданный
+чтением, а не сигналом, живёт VERSION_TIMEOUT: запросы к
+несуществующим профилям и группам не оставляют вечных ключей.
+
+Страница может зависеть и от других объектов (depends): у страницы
+поста это число постов автора. Версией тогда считается самая поздняя.
+
+Last-Modified точен до секунды, поэтому это начало секунды, следующей
+за версией, и отдаётся он только после её окончания: изменение в ту
+же секунду не получит 304 по If-Modified-Since. Он один для всех
+пользователей, поэтому у личных страниц (personal) вошедшему
+пользователю его нет — сверка идёт только по ETag.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+
+from core.db_router import replica_may_lag
+
+VERSION_KEY = 'posts:version:{}:{}'
+VERSION_TIMEOUT = 60 * 60 * 24
+AUTHOR_KEY = 'posts:author:{}'
+
+
+def touch(kind, key):
+    cache.set(VERSION_KEY.format(kind, key), time.time(), None)
+
+
+def changed_at(kind, key, depends=None):
+    version = cache.get_or_set(
+        VERSION_KEY.format(kind, key), time.time, VERSION_TIMEOUT)
+    if depends is not None:
+        version = max(version, depends(key))
+    return version
+
+
+def remember_author(post):
+    # Автор поста не меняется.
+    cache.set(AUTHOR_KEY.format(post.pk), post.author_id, VERSION_TIMEOUT)
+
+
+def author_changed_at(post_id):
+    """Версия автора поста: страница поста показывает число его постов.
+    Автора запоминают сигнал и страница поста; пока он неизвестен,
+    версия — текущее время, и страница отдаётся заново без запроса к
+    базе."""
+    author_id = cache.get(AUTHOR_KEY.format(post_id))
+    if author_id is None:
+        return time.time()
+    return changed_at('author', author_id)
+
+
+def last_modified(kind, key, depends=None):
+    version = changed_at(kind, key, depends)
+    if replica_may_lag(version):
+        return None
+    second = int(version) + 1
+    if time.time() < second:
+        return None
+    return datetime.fromtimestamp(second, timezone.utc)
+
+
+def _shared_response(request, personal):
+    """Ответ одинаков для всех, кто может прислать его дату."""
+    return not personal or not request.user.is_authenticated
+
+
+def etag(request, kind, key, personal=True, depends=None):
+    """ETag зависит от версии объекта, адреса страницы (номер
+    страницы, курсор) и пользователя с его CSRF-токеном, которые
+    попадают в разметку. Для документов, одинаковых для всех
+    (personal=False), пользователь не учитывается. Пока реплика может
+    отставать от версии, ETag нет."""
+    version = changed_at(kind, key, depends)
+    if replica_may_lag(version):
+        return None
+    user = ''
+    if personal and request.user.is_authenticated:
+        user = request.user.pk
+    token = get_token(request) if user else ''
+    raw = (
+        f'{version}:{request.get_full_path()}:'
+        f'{user}:{token}'
+    )
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def condition_kwargs(kind, url_kwarg, depends=None, personal=True):
+    """Аргументы для django.views.decorators.http.condition."""
+    return {
+        'etag_func': lambda request, **kwargs: etag(
+            request, kind, kwargs[url_kwarg], personal, depends),
+        'last_modified_func': lambda request, **kwargs: (
+            last_modified(kind, kwargs[url_kwarg], depends)
+            if _shared_response(request, personal) else None),
+    }
@@ -1,45 +1,71 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.views.decorators.http import condition, require_GET
+
+from core.db_router import read_your_writes
 
+from . import api, counters, feed, listing_cache, thumbnails, versions
 from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow
+from .models import Comment, Post, Group, User, Follow
+from .paginators import CursorPaginator
+from .search import search as search_posts
 
 
 NUM_OF_SHOWED_POSTS = 10
+NUM_OF_SHOWED_COMMENTS = 20
 
 
 def paginate(posts, request):
+    cursor = request.GET.get('cursor')
+    if cursor is not None or settings.POSTS_CURSOR_PAGINATION:
+        return CursorPaginator(posts, NUM_OF_SHOWED_POSTS).get_page(cursor)
     paginator = Paginator(posts, NUM_OF_SHOWED_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
+def comments_page(post_id, cursor):
+    """Страница комментариев поста, новые сверху."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author').only('post', 'text', 'created', 'author__username')
+    return CursorPaginator(comments, NUM_OF_SHOWED_COMMENTS).get_page(cursor)
+
+
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_listing()
     page_obj = paginate(post_list, request)
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'listing_cache': listing_cache.listing_context('index', request),
     }
     return render(request, 'posts/index.html', context)
 
 
+@condition(**versions.condition_kwargs('group', 'slug'))
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_listing()
     page_obj = paginate(posts, request)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'listing_cache': listing_cache.listing_context(
+            f'group:{group.pk}', request),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(**versions.condition_kwargs('profile', 'username'))
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    posts = author.posts.for_listing()
     page_obj = paginate(posts, request)
     following = (request.user.is_authenticated
                  and Follow.objects.filter(
@@ -47,30 +73,68 @@ def profile(request, username):
     context = {
         'page_obj': page_obj,
         'author': author,
-        'following': following
+        'stats': counters.stats_for(author),
+        'following': following,
+        'listing_cache': listing_cache.listing_context(
+            f'profile:{author.pk}', request),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@condition(**versions.condition_kwargs(
+    'post', 'post_id', versions.author_changed_at))
 def post_detail(request, post_id):
     form = CommentForm(request.POST or None)
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(Post.objects.for_listing(), id=post_id)
+    versions.remember_author(post)
     context = {
         'post': post,
+        'post_count': counters.stats_for(post.author).posts_count,
         "form": form,
-        "comments": comments
+        "comments": comments_page(post.pk, request.GET.get('cursor')),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@require_GET
+@condition(**versions.condition_kwargs('post', 'post_id'))
+def comment_list(request, post_id):
+    """Следующие страницы комментариев для кнопки «Показать ещё»:
+    фрагмент HTML, с ?format=json — ответ API."""
+    if request.GET.get('format') == 'json':
+        return api.comment_list(request, post_id)
+    context = {
+        'post_id': post_id,
+        'comments': comments_page(post_id, request.GET.get('cursor')),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results = search_posts(query) if query else []
+    page_obj = Paginator(results, NUM_OF_SHOWED_POSTS).get_page(
+        request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'pagination_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@read_your_writes
+@transaction.atomic
 def post_create(request):
-    form = PostForm(request.POST or None, files=request.FILES or None)
+    form = PostForm(
+        request.POST or None, files=request.FILES or None,
+        user=request.user)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         form.save()
+        thumbnails.schedule_presets(post.image)
         return redirect('posts:profile', username=request.user)
     context = {
         'form': form
@@ -79,6 +143,7 @@ def post_create(request):
 
 
 @login_required
+@read_your_writes
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     is_edit = True
@@ -87,7 +152,8 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post)
+        instance=post,
+        user=request.user)
     context = {
         'form': form,
         'post': post,
@@ -95,11 +161,15 @@ def post_edit(request, post_id):
     }
     if form.is_valid():
         form.save()
+        if form.image_changed:
+            thumbnails.schedule_presets(post.image)
         return redirect('posts:post_detail', post.pk)
     return render(request, 'posts/create_post.html', context)
 
 
 @login_required
+@read_your_writes
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -113,13 +183,19 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginate(posts, request)
-    context = {'page_obj': page_obj}
+    page_obj = paginate(feed.feed_entries(request.user), request)
+    page_obj.object_list = feed.posts_for_entries(page_obj.object_list)
+    context = {
+        'page_obj': page_obj,
+        'listing_cache': listing_cache.listing_context(
+            f'follow:{request.user.pk}', request),
+    }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@read_your_writes
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -129,6 +205,8 @@ def profile_follow(request, username):
 
 
 @login_required
+@read_your_writes
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     followers = Follow.objects.filter(
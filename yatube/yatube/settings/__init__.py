@@ -0,0 +1,18 @@
+"""Настройки проекта.
+
+Профиль выбирается переменной окружения DJANGO_ENV: dev (по умолчанию)
+или prod. DJANGO_SETTINGS_MODULE остаётся yatube.settings.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'dev')
+
+if DJANGO_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+elif DJANGO_ENV == 'prod':
+    from .prod import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f'Неизвестный профиль DJANGO_ENV={DJANGO_ENV!r}: нужен dev или prod')
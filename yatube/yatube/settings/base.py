@@ -0,0 +1,251 @@
+"""Общие настройки всех профилей.
+
+Значения, которые отличаются между окружениями, читаются из
+переменных окружения; профили dev и prod задают свои умолчания.
+"""
+import os
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return default if value in (None, '') else int(value)
+
+
+def env_list(name, default):
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+
+# Курсорная пагинация лент вместо постраничной (?cursor= вместо ?page=)
+POSTS_CURSOR_PAGINATION = False
+
+# Бэкенд полнотекстового поиска; для баз кроме SQLite —
+# posts.search.SimpleSearchBackend
+POSTS_SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', '')
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS', [])
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
+    'core.apps.CoreConfig',
+    'about.apps.AboutConfig',
+    'sorl.thumbnail',
+]
+
+MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.ReplicaPinningMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    }
+}
+
+# Реплики только для чтения (core.db_router) — псевдонимы из DATABASES.
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+DATABASE_REPLICAS = []
+# Сколько секунд после своего изменения клиент читает из основной базы
+DATABASE_PIN_SECONDS = env_int('DATABASE_PIN_SECONDS', 10)
+# Приложения, которые всегда читаются из основной базы
+DATABASE_PRIMARY_APPS = ['auth', 'sessions', 'core']
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = '/static/'
+
+STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+
+STATIC_ROOT = os.environ.get(
+    'DJANGO_STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+DEFAULT_FROM_EMAIL = os.environ.get(
+    'DJANGO_DEFAULT_FROM_EMAIL', 'noreply@yatube.local')
+
+# Адрес сайта для ссылок в письмах
+SITE_URL = os.environ.get('SITE_URL', 'http://127.0.0.1:8000')
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.environ.get(
+    'DJANGO_MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+# Сколько секунд файл без ссылок хранится до удаления (core.storage)
+MEDIA_GC_GRACE = env_int('MEDIA_GC_GRACE', 60 * 60)
+
+
+def tiered_caches(url):
+    """Общий кеш воркеров: сервер с протоколом Redis, перед ним LRU
+    процесса (core.cache.TieredCache)."""
+    return {
+        'default': {
+            'BACKEND': 'core.cache.TieredCache',
+            'LOCATION': 'default',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'MAX_ENTRIES': 500,
+                'LOCAL_TIMEOUT': 60,
+                'SYNC_INTERVAL': 1.0,
+            },
+        },
+        'shared': {
+            'BACKEND': 'core.cache.RedisCache',
+            'LOCATION': url,
+            'KEY_PREFIX': 'yatube',
+        },
+    }
+
+
+# Без CACHE_REDIS_URL у каждого процесса собственный LocMemCache.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+
+if CACHE_REDIS_URL:
+    CACHES = tiered_caches(CACHE_REDIS_URL)
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Загрузка картинок постов (posts.images): предел файла и числа
+# пикселей, длинная сторона после уменьшения, качество JPEG.
+POSTS_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+POSTS_IMAGE_MAX_PIXELS = 50_000_000
+POSTS_IMAGE_MAX_SIZE = 1920
+POSTS_IMAGE_QUALITY = 85
+# Ширины кадров для srcset (posts.variants)
+POSTS_IMAGE_VARIANT_WIDTHS = (320, 480, 640, 960, 1440)
+# Загрузка частями (posts.uploads): каталог недогруженных файлов,
+# общий для всех воркеров, и сколько секунд хранить брошенную загрузку.
+POSTS_UPLOAD_DIR = os.environ.get(
+    'POSTS_UPLOAD_DIR', os.path.join(BASE_DIR, 'uploads'))
+POSTS_UPLOAD_EXPIRE = 60 * 60 * 24
+
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+
+# Миниатюры создаются в очереди задач, пока их нет — шаблоны
+# показывают исходное изображение.
+THUMBNAIL_ASYNC = True
+
+# Очередь фоновых задач (core.taskqueue). С TASKS_EAGER задачи
+# выполняются сразу, без него нужны воркеры manage.py run_tasks.
+# Отложенные задачи (удаление картинок через MEDIA_GC_GRACE) ждут
+# воркера и с TASKS_EAGER.
+TASKS_EAGER = env_bool('TASKS_EAGER', False)
+# Через сколько секунд задача упавшего воркера возвращается в очередь
+TASKS_LOCK_TIMEOUT = 60 * 10
+# Сколько дней хранить выполненные задачи
+TASKS_KEEP_DAYS = 7
+
+# Метрики запросов (core.middleware.PerformanceMiddleware)
+PERF_BUDGET_MS = 500
+PERF_QUERY_BUDGET = 20
+PERF_DUPLICATE_THRESHOLD = 3
+PERF_BUFFER_SIZE = 1000
@@ -0,0 +1,19 @@
+"""Профиль разработки и тестов."""
+from .base import *  # noqa: F401,F403
+from .base import SECRET_KEY, env_bool, env_list
+
+SECRET_KEY = SECRET_KEY or '0(gz$%*lx+io@#xq-@=q(a^z0ubruakdve4h@bxn3=&#tjqnj7'
+
+DEBUG = env_bool('DJANGO_DEBUG', True)
+
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS', [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+])
+
+# Задачи выполняются сразу, воркеры не нужны. Отложенные задачи
+# (удаление картинок без ссылок) копятся в очереди: их выполнит
+# manage.py run_tasks --once, а файлы удалит и manage.py collect_media.
+TASKS_EAGER = env_bool('TASKS_EAGER', True)
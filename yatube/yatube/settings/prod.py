@@ -0,0 +1,89 @@
+"""Профиль боевого окружения.
+
+Отличия от dev, влияющие на скорость ответа: соединения с базой
+переиспользуются между запросами (CONN_MAX_AGE), скомпилированные
+шаблоны кешируются в процессе, кеш общий для всех воркеров, статика
+раздаётся с хешем содержимого в имени. Сравнение с текущими
+настройками — manage.py benchmark_views --profile prod.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import (
+    CACHE_REDIS_URL, DATABASES, MIDDLEWARE, TEMPLATES, env_bool, env_int,
+    env_list, tiered_caches
+)
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Для профиля prod задайте DJANGO_SECRET_KEY')
+
+DEBUG = env_bool('DJANGO_DEBUG', False)
+
+# Сколько секунд держать соединение с базой открытым; 0 — закрывать
+# после каждого запроса, как в dev.
+CONN_MAX_AGE = env_int('DB_CONN_MAX_AGE', 600)
+
+if os.environ.get('POSTGRES_DB'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ['POSTGRES_DB'],
+            'USER': os.environ.get('POSTGRES_USER', ''),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+        }
+    }
+    # Реплики: хосты через запятую, с той же базой и учётной записью.
+    for number, host in enumerate(
+            env_list('POSTGRES_REPLICA_HOSTS', []), start=1):
+        DATABASES[f'replica{number}'] = {
+            **DATABASES['default'],
+            'HOST': host,
+            'TEST': {'MIRROR': 'default'},
+        }
+    DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+    # Поиск FTS5 есть только в SQLite.
+    POSTS_SEARCH_BACKEND = 'posts.search.SimpleSearchBackend'
+else:
+    DATABASES = {
+        'default': {**DATABASES['default'], 'CONN_MAX_AGE': CONN_MAX_AGE},
+    }
+
+# Явный кеширующий загрузчик вместо APP_DIRS. Словари собираются
+# заново: объекты из base общие для всех профилей.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+# collectstatic: имена с хешем и сжатые копии .gz/.br; отдаёт их
+# StaticFilesMiddleware сразу после SecurityMiddleware.
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+
+MIDDLEWARE = list(MIDDLEWARE)
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+    'core.middleware.StaticFilesMiddleware')
+
+CACHES = tiered_caches(CACHE_REDIS_URL or 'redis://127.0.0.1:6379/0')
+
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = env_int('EMAIL_PORT', 25)
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = env_bool('EMAIL_USE_TLS', False)